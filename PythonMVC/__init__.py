@@ -1,8 +1,14 @@
 """PythonMVC — Rails-inspired conventions on top of Starlette + SQLAlchemy."""
 
-from .app import create_app
-from .router import resource
-from .model import BaseModel, db_session
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .app import create_app
+    from .model import BaseModel, async_db_session, db_session
+    from .router import resource
 
 # SPDX-License-Identifier: Apache-2.0
 __version__ = "0.0.1"
@@ -12,5 +18,28 @@ __all__ = [
     "resource",
     "BaseModel",
     "db_session",
+    "async_db_session",
 ]
 
+# Public name -> submodule. Resolved on first access so `import PythonMVC` (and the CLI,
+# which lives inside the package) does not pay for Starlette, SQLAlchemy and Jinja.
+_LAZY_ATTRIBUTES = {
+    "create_app": ".app",
+    "resource": ".router",
+    "BaseModel": ".model",
+    "db_session": ".model",
+    "async_db_session": ".model",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
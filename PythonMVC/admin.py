@@ -1,25 +1,391 @@
-"""Minimal admin surface for inspecting registered models."""
+"""Admin surface: model index, CRUD with keyset pagination and streaming exports."""
 
 from __future__ import annotations
 
+import base64
+import csv
+import functools
+import inspect
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, and_, func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapper
 from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
 from starlette.requests import Request
-from starlette.responses import HTMLResponse
+from starlette.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
 from starlette.routing import Route
-from starlette.templating import Jinja2Templates
 
-from .model import BaseModel
+from .body import read_form
+from .model import BaseModel, async_db_session
+from .sessions import load_session
+from .templating import get_templates
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH = 1000
+# Columns filled in by the database; never shown in admin forms.
+READONLY_COLUMNS = {"created_at", "updated_at"}
 
-templates = Jinja2Templates(directory="app/views")
+DEFAULT_ADMIN_CONFIG: Dict[str, Any] = {
+    # Called with the request before every admin route; return (or await) True to allow.
+    # Without it every admin request is refused.
+    "authorize": None,
+}
 
 
 async def admin_index(request: Request) -> HTMLResponse:
     models = [mapper for mapper in BaseModel.registry.mappers]
-    return templates.TemplateResponse("admin/index.html", {"request": request, "models": models})
+    return get_templates().TemplateResponse(request, "admin/index.html", {"models": models})
+
+
+async def admin_list(request: Request) -> Response:
+    """Keyset-paginated list over the primary key or an indexed sort column.
+
+    ``?sort=`` picks the column, ``?dir=asc|desc`` the order and ``?after=`` is the opaque
+    cursor from the previous page. Totals are estimated unless ``?count=exact``.
+    """
+    mapper = _mapper_or_404(request)
+    table = mapper.local_table
+    pk = _primary_key(mapper)
+    sort = _sort_column(mapper, request.query_params.get("sort"))
+    descending = request.query_params.get("dir", "desc") != "asc"
+    limit = min(_int_param(request, "limit", PAGE_SIZE), MAX_PAGE_SIZE)
+    columns = list_columns(mapper)
+    columns += [column for column in (pk, sort) if not any(column is c for c in columns)]
+
+    statement = select(*columns)
+    cursor = request.query_params.get("after")
+    if cursor:
+        statement = statement.where(_after(sort, pk, _decode_cursor(sort, pk, cursor), descending))
+    order = (sort.desc(), pk.desc()) if descending else (sort.asc(), pk.asc())
+    statement = statement.order_by(*(order[:1] if sort is pk else order)).limit(limit + 1)
+
+    async with async_db_session() as session:
+        rows = (await session.execute(statement)).mappings().all()
+        total = None
+        if request.query_params.get("count") != "exact":
+            total = await estimated_count(session, table)
+        is_estimate = total is not None
+        if total is None:
+            total = await exact_count(session, table)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last[sort.key], last[pk.key])
+
+    context = {
+        "mapper": mapper,
+        "table": table.name,
+        "columns": [column.key for column in columns],
+        "rows": rows,
+        "pk": pk.key,
+        "sort": sort.key,
+        "direction": "desc" if descending else "asc",
+        "next_cursor": next_cursor,
+        "total": total,
+        "total_is_estimate": is_estimate,
+    }
+    return get_templates().TemplateResponse(request, "admin/list.html", context)
+
+
+async def admin_new(request: Request) -> Response:
+    mapper = _mapper_or_404(request)
+    return _render_form(request, mapper, None)
+
+
+async def admin_create(request: Request) -> Response:
+    mapper = _mapper_or_404(request)
+    values = _form_values(mapper, await read_form(request))
+    async with async_db_session() as session:
+        record = mapper.class_(**values)
+        session.add(record)
+        await session.commit()
+    return RedirectResponse(f"/admin/{mapper.local_table.name}", status_code=303)
+
+
+async def admin_edit(request: Request) -> Response:
+    mapper = _mapper_or_404(request)
+    async with async_db_session() as session:
+        record = await _get_or_404(session, mapper, request)
+    return _render_form(request, mapper, record)
+
 
+async def admin_update(request: Request) -> Response:
+    mapper = _mapper_or_404(request)
+    values = _form_values(mapper, await read_form(request))
+    async with async_db_session() as session:
+        record = await _get_or_404(session, mapper, request)
+        for key, value in values.items():
+            setattr(record, key, value)
+        await session.commit()
+    return RedirectResponse(f"/admin/{mapper.local_table.name}", status_code=303)
 
-def mount_admin(app: Starlette) -> None:
-    """Register the admin route if not already mounted."""
+
+async def admin_delete(request: Request) -> Response:
+    mapper = _mapper_or_404(request)
+    async with async_db_session() as session:
+        record = await _get_or_404(session, mapper, request)
+        await session.delete(record)
+        await session.commit()
+    return RedirectResponse(f"/admin/{mapper.local_table.name}", status_code=303)
+
+
+async def admin_export(request: Request) -> StreamingResponse:
+    """Stream every row as CSV or NDJSON from a server-side cursor in constant memory."""
+    mapper = _mapper_or_404(request)
+    fmt = request.path_params["format"]
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=404)
+    columns = [column for column in mapper.local_table.columns]
+    statement = select(*columns).order_by(_primary_key(mapper)).execution_options(yield_per=EXPORT_BATCH)
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"{mapper.local_table.name}.{fmt}"
+    return StreamingResponse(
+        _export_rows(statement, [column.key for column in columns], fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def list_columns(mapper: Mapper[Any]) -> List[Column[Any]]:
+    """Columns shown on list pages: ``__admin_list__`` or the key plus indexed columns.
+
+    Keeping the projection to indexed columns lets the database answer list pages from
+    the index alone on large tables.
+    """
+    table = mapper.local_table
+    explicit = getattr(mapper.class_, "__admin_list__", None)
+    if explicit:
+        return [table.c[name] for name in explicit]
+    return [column for column in table.columns if column.primary_key or column.index or column.unique]
+
+
+async def estimated_count(session: AsyncSession, table: Any) -> Optional[int]:
+    """Row estimate from catalog statistics (Postgres ``reltuples``, MySQL
+    ``information_schema``), or ``None`` when the dialect or table has no statistics."""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        result = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": table.fullname},
+        )
+        estimate = result.scalar()
+        # reltuples is -1 (PG14+) or 0 for tables never vacuumed/analyzed.
+        if estimate is not None and estimate > 0:
+            return int(estimate)
+    elif dialect in ("mysql", "mariadb"):
+        result = await session.execute(
+            text(
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = :name"
+            ),
+            {"name": table.name},
+        )
+        estimate = result.scalar()
+        if estimate is not None:
+            return int(estimate)
+    return None
+
+
+async def exact_count(session: AsyncSession, table: Any) -> int:
+    return int((await session.execute(select(func.count()).select_from(table))).scalar_one())
+
+
+def mount_admin(app: Starlette, config: Optional[dict] = None) -> None:
+    """Register the admin routes if not already mounted.
+
+    Every route first calls ``config["authorize"](request)``; a falsy result is a 403,
+    and so is every request when no ``authorize`` callable is configured.
+    """
+    options = config or {}
+    unknown = set(options) - set(DEFAULT_ADMIN_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown ADMIN option(s): {', '.join(sorted(unknown))}")
+    authorize = {**DEFAULT_ADMIN_CONFIG, **options}["authorize"]
+    if authorize is not None and not callable(authorize):
+        raise ValueError("ADMIN['authorize'] must be a callable taking the request")
     if any(getattr(route, "path", "").startswith("/admin") for route in app.router.routes):
         return
-    app.router.routes.append(Route("/admin", admin_index, name="admin.index"))
+
+    def guarded(endpoint: Callable[[Request], Awaitable[Response]]) -> Callable[[Request], Awaitable[Response]]:
+        return _authorized(endpoint, authorize)
+
+    app.router.routes.extend(
+        [
+            Route("/admin", guarded(admin_index), name="admin.index"),
+            Route("/admin/{table}", guarded(admin_list), methods=["GET"], name="admin.list"),
+            Route("/admin/{table}", guarded(admin_create), methods=["POST"], name="admin.create"),
+            Route("/admin/{table}/new", guarded(admin_new), methods=["GET"], name="admin.new"),
+            Route("/admin/{table}/export.{format}", guarded(admin_export), methods=["GET"], name="admin.export"),
+            Route("/admin/{table}/{id}", guarded(admin_edit), methods=["GET"], name="admin.edit"),
+            Route("/admin/{table}/{id}", guarded(admin_update), methods=["POST"], name="admin.update"),
+            Route("/admin/{table}/{id}/delete", guarded(admin_delete), methods=["POST"], name="admin.delete"),
+        ]
+    )
+
+
+def _authorized(
+    endpoint: Callable[[Request], Awaitable[Response]], authorize: Optional[Callable[[Request], Any]]
+) -> Callable[[Request], Awaitable[Response]]:
+    @functools.wraps(endpoint)
+    async def wrapper(request: Request) -> Response:
+        if "session" in request.scope:
+            # Server-side sessions are fetched on demand; authorize may read request.session.
+            await load_session(request)
+        allowed = authorize(request) if authorize is not None else False
+        if inspect.isawaitable(allowed):
+            allowed = await allowed
+        if not allowed:
+            raise HTTPException(status_code=403)
+        return await endpoint(request)
+
+    return wrapper
+
+
+def _mapper_or_404(request: Request) -> Mapper[Any]:
+    name = request.path_params["table"]
+    for mapper in BaseModel.registry.mappers:
+        if mapper.local_table is not None and mapper.local_table.name == name:
+            return mapper
+    raise HTTPException(status_code=404, detail=f"Unknown model table {name!r}")
+
+
+def _primary_key(mapper: Mapper[Any]) -> Column[Any]:
+    return mapper.local_table.primary_key.columns.values()[0]
+
+
+def _sort_column(mapper: Mapper[Any], name: Optional[str]) -> Column[Any]:
+    pk = _primary_key(mapper)
+    if not name or name == pk.key:
+        return pk
+    column = mapper.local_table.columns.get(name)
+    if column is None or not (column.index or column.unique) or column.nullable:
+        raise HTTPException(status_code=400, detail="Sort by the primary key or a non-null indexed column")
+    return column
+
+
+def _after(sort: Column[Any], pk: Column[Any], cursor: Tuple[Any, Any], descending: bool) -> Any:
+    sort_value, pk_value = cursor
+    if sort is pk:
+        return pk < pk_value if descending else pk > pk_value
+    if descending:
+        return or_(sort < sort_value, and_(sort == sort_value, pk < pk_value))
+    return or_(sort > sort_value, and_(sort == sort_value, pk > pk_value))
+
+
+def _encode_cursor(sort_value: Any, pk_value: Any) -> str:
+    raw = json.dumps([_jsonable(sort_value), _jsonable(pk_value)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(sort: Column[Any], pk: Column[Any], cursor: str) -> Tuple[Any, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, pk_value = json.loads(raw)
+        return _coerce(sort, sort_value), _coerce(pk, pk_value)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def _int_param(request: Request, name: str, default: int) -> int:
+    try:
+        return max(int(request.query_params.get(name, default)), 1)
+    except ValueError:
+        return default
+
+
+def _coerce(column: Column[Any], value: Any) -> Any:
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if value is None or value == "":
+        if column.nullable:
+            return None
+        if python_type is str:
+            return ""
+        raise ValueError(f"{column.key} is required")
+    if isinstance(value, python_type):
+        return value
+    if python_type is bool:
+        return str(value).lower() in ("1", "true", "on", "yes")
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _editable_columns(mapper: Mapper[Any]) -> List[Column[Any]]:
+    return [
+        column
+        for column in mapper.local_table.columns
+        if not column.primary_key and column.key not in READONLY_COLUMNS
+    ]
+
+
+def _form_values(mapper: Mapper[Any], form: Any) -> Dict[str, Any]:
+    values: Dict[str, Any] = {}
+    for column in _editable_columns(mapper):
+        if column.key in form:
+            try:
+                values[column.key] = _coerce(column, form[column.key])
+            except (TypeError, ValueError) as exc:
+                raise HTTPException(status_code=400, detail=f"Invalid value for {column.key}") from exc
+    return values
+
+
+async def _get_or_404(session: AsyncSession, mapper: Mapper[Any], request: Request) -> Any:
+    try:
+        pk_value = _coerce(_primary_key(mapper), request.path_params["id"])
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=404) from exc
+    record = await session.get(mapper.class_, pk_value)
+    if record is None:
+        raise HTTPException(status_code=404)
+    return record
+
+
+def _render_form(request: Request, mapper: Mapper[Any], record: Any) -> Response:
+    context = {
+        "table": mapper.local_table.name,
+        "fields": [column.key for column in _editable_columns(mapper)],
+        "record": record,
+        "pk": _primary_key(mapper).key,
+    }
+    return get_templates().TemplateResponse(request, "admin/form.html", context)
+
+
+async def _export_rows(statement: Any, keys: List[str], fmt: str) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(keys)
+    async with async_db_session() as session:
+        result = await session.stream(statement)
+        async for partition in result.partitions(EXPORT_BATCH):
+            for row in partition:
+                if fmt == "csv":
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(keys, map(_jsonable, row)))) + "\n")
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
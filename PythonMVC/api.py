@@ -0,0 +1,165 @@
+"""JSON API mode: content negotiation and compiled model serializers."""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Mapper
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+try:  # orjson is optional: `pip install pmvc[orjson]`
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+HTML = "text/html"
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+# Offered in this order; on equal quality the earlier type wins, so `*/*` still gets HTML.
+NEGOTIABLE_TYPES = (HTML, JSON, NDJSON)
+# Distinct (model, ?fields=) projections kept compiled; the oldest is dropped beyond this.
+SERIALIZER_CACHE_SIZE = 256
+
+# Built once: json.dumps() with non-default options constructs a new encoder per call.
+_json_encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+_serializers: Dict[Tuple[Mapper[Any], Tuple[str, ...]], "Serializer"] = {}
+
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON bytes, through orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return _json_encode(value).encode("utf-8")
+
+
+class APIResponse(Response):
+    """``JSONResponse`` that encodes with :func:`dumps`."""
+
+    media_type = JSON
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def negotiate(request: Request, offered: Sequence[str] = NEGOTIABLE_TYPES) -> str:
+    """The ``offered`` media type the ``Accept`` header ranks highest."""
+    ranges = []
+    for item in request.headers.get("accept", "*/*").split(","):
+        media_range, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((media_range.strip().lower(), quality))
+
+    best, best_quality = offered[0], 0.0
+    for candidate in offered:
+        # The most specific matching range decides the candidate's quality.
+        patterns = {candidate: 2, candidate.split("/", 1)[0] + "/*": 1, "*/*": 0}
+        matches = [(patterns[media_range], quality) for media_range, quality in ranges if media_range in patterns]
+        if matches and max(matches)[1] > best_quality:
+            best, best_quality = candidate, max(matches)[1]
+    return best
+
+
+class Serializer:
+    """Turns rows of a fixed column projection of one model into dicts.
+
+    Built once per (mapper, fields) by :func:`serializer_for`, which compiles two small
+    functions (one for selected rows, one for loaded instances) that build the dict in a
+    single literal, with the few conversions JSON needs (decimals, and dates and UUIDs
+    without orjson) inlined per column.
+    """
+
+    def __init__(self, mapper: Mapper[Any], fields: Sequence[str]) -> None:
+        self.mapper = mapper
+        self.fields = tuple(fields)
+        self.columns = [mapper.attrs[field].class_attribute for field in self.fields]
+        converters = [_converter(mapper.columns[field]) for field in self.fields]
+        # row(r) takes a row from `select(*serializer.columns)`; instance(obj) a loaded model.
+        self.row: Callable[[Sequence[Any]], Dict[str, Any]] = _compile(
+            "row", [f"source[{index}]" for index in range(len(self.fields))], self.fields, converters
+        )
+        self.instance: Callable[[Any], Dict[str, Any]] = _compile(
+            "instance", [f"source.{field}" for field in self.fields], self.fields, converters
+        )
+
+
+def serializer_for(model: Any, fields: Optional[Sequence[str]] = None) -> Serializer:
+    """The cached :class:`Serializer` for ``model``'s ``fields`` (every column by default)."""
+    mapper = sa_inspect(model)
+    key = (mapper, tuple(fields) if fields else tuple(column.key for column in mapper.column_attrs))
+    serializer = _serializers.get(key)
+    if serializer is None:
+        if len(_serializers) >= SERIALIZER_CACHE_SIZE:
+            del _serializers[next(iter(_serializers))]
+        serializer = _serializers[key] = Serializer(mapper, key[1])
+    return serializer
+
+
+def requested_fields(request: Request, model: Any, allowed: Optional[Sequence[str]] = None) -> List[str]:
+    """Columns named by ``?fields=a,b`` (primary key always included), else ``allowed``/all.
+
+    Unknown or disallowed names are a 400 rather than silently dropped. Fields come back
+    in model order, so ``?fields=b,a`` and ``?fields=a,b`` share one serializer.
+    """
+    mapper = sa_inspect(model)
+    available = list(allowed) if allowed else [column.key for column in mapper.column_attrs]
+    primary_key = [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+    raw = request.query_params.get("fields")
+    if not raw:
+        return available
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    wanted = {*primary_key, *names}
+    return [key for key in available if key in wanted]
+
+
+def _compile(
+    name: str, accessors: Sequence[str], fields: Sequence[str], converters: Sequence[Optional[Callable[[Any], Any]]]
+) -> Callable[[Any], Dict[str, Any]]:
+    namespace: Dict[str, Any] = {}
+    items = []
+    for index, (accessor, field, converter) in enumerate(zip(accessors, fields, converters)):
+        if converter is None:
+            items.append(f"{field!r}: {accessor}")
+        else:
+            namespace[f"convert{index}"] = converter
+            items.append(f"{field!r}: None if {accessor} is None else convert{index}({accessor})")
+    source = f"def {name}(source):\n    return {{{', '.join(items)}}}\n"
+    exec(compile(source, f"<serializer {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def _converter(column: Any) -> Optional[Callable[[Any], Any]]:
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    if issubclass(python_type, Decimal):
+        return str
+    if orjson is None:
+        if issubclass(python_type, (datetime, date, time)):
+            return _isoformat
+        if issubclass(python_type, UUID):
+            return str
+    return None
+
+
+def _isoformat(value: Any) -> str:
+    return value.isoformat()
+
@@ -9,10 +9,18 @@ from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.responses import JSONResponse
 from starlette.routing import BaseRoute, Route
-from starlette.staticfiles import StaticFiles
 
+from . import assets, body, cache, instrumentation, jobs, model, query_cache, replicas, sessions, templating
 from .admin import mount_admin
+from .assets import PrecompressedStaticFiles
+from .body import RequestBodyMiddleware
+from .compression import CompressionMiddleware
+from .db import DBSessionMiddleware
+from .instrumentation import SQLInstrumentationMiddleware
+from .metrics import mount_metrics
+from .router import CompiledRouter
 from .security import SecurityMiddleware
+from .sessions import ServerSessionMiddleware
 
 
 def _iter_routes(routes: Sequence[BaseRoute] | None) -> Iterable[BaseRoute]:
@@ -27,12 +35,38 @@ def create_app(settings: Any) -> Starlette:
     # Collect routes before Starlette consumes the iterable so we can append fallback routes.
     routes = list(_iter_routes(getattr(settings, "ROUTES", ())))
     app = Starlette(debug=getattr(settings, "DEBUG", False), routes=routes)
+    if getattr(settings, "COMPILED_ROUTES", False):
+        # Trie dispatch; routes appended below are picked up on the next request.
+        app.router = CompiledRouter.from_router(app.router)
+
+    # Database engines are built lazily from DATABASE_URL / DATABASE_POOL / DATABASE_REPLICA_URLS.
+    replicas.configure(settings)
+    model.configure(settings)
+    cache.configure(settings)
+    query_cache.configure(settings)
+    templating.configure(settings)
+    instrumentation.configure(settings)
+    body.configure(settings)
+    assets.configure(settings)
+    jobs.configure(settings)
+    sessions.configure(settings)
+
+    # One lazily-opened session per request at `request.state.db`.
+    app.add_middleware(DBSessionMiddleware)
+    if instrumentation.enabled():
+        # Outside the session middleware so the commit is part of the numbers.
+        app.add_middleware(SQLInstrumentationMiddleware)
 
     # Security hardening.
     app.add_middleware(SecurityMiddleware, config=getattr(settings, "SECURITY", {}))
+    # Outside the CSRF check so its body read is size-limited too (REQUEST_BODY).
+    app.add_middleware(RequestBodyMiddleware)
 
-    # Session handling.
-    app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
+    # Session handling: a signed cookie, or only an id in it with SESSIONS["backend"] = "memory"/"redis".
+    if sessions.server_side():
+        app.add_middleware(ServerSessionMiddleware, **sessions.middleware_options())
+    else:
+        app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
 
     # Basic CORS setup (localhost-friendly by default).
     app.add_middleware(
@@ -43,11 +77,24 @@ def create_app(settings: Any) -> Starlette:
         allow_headers=["*"],
     )
 
+    compression = getattr(settings, "COMPRESSION", None) or {}
+    if compression.get("enabled"):
+        app.add_middleware(CompressionMiddleware, **CompressionMiddleware.options(compression))
+
     static_dir = getattr(settings, "STATIC_DIR", None)
     if static_dir:
-        app.mount("/static", StaticFiles(directory=static_dir), name="static")
-
-    mount_admin(app)
+        # Serves `pmvc assets precompile` output (.br/.gz, immutable) as well as plain files.
+        app.mount("/static", PrecompressedStaticFiles(directory=static_dir), name="static")
+
+    # Opt-in: ADMIN = {"authorize": callable(request) -> bool} guards every admin route.
+    admin_config = getattr(settings, "ADMIN", None)
+    if admin_config:
+        mount_admin(app, admin_config if isinstance(admin_config, dict) else None)
+
+    # Added last so the outermost middleware times the whole stack.
+    metrics_config = getattr(settings, "METRICS", None)
+    if metrics_config:
+        mount_metrics(app, metrics_config if isinstance(metrics_config, dict) else None)
 
     if not any(getattr(route, "path", "") == "/health" for route in app.router.routes):
         async def health(_: object) -> JSONResponse:
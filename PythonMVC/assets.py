@@ -0,0 +1,162 @@
+"""Fingerprinted, precompressed static assets and the handler that serves them."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .compression import DEFAULT_COMPRESSIBLE_TYPES, accepted_codings, brotli
+
+DEFAULT_STATIC_DIR = "public"
+STATIC_URL_PREFIX = "/static"
+# Fingerprinted copies live in `<STATIC_DIR>/assets`, next to their manifest.
+ASSETS_DIR = "assets"
+MANIFEST_NAME = "manifest.json"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Preferred first; a variant is only served when the client accepts its coding.
+PRECOMPRESSED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+_options: Dict[str, Any] = {"static_dir": DEFAULT_STATIC_DIR, "reload": True}
+# (manifest mtime, logical name -> fingerprinted path)
+_manifest: Optional[Tuple[float, Dict[str, str]]] = None
+
+
+def configure(settings: Any) -> None:
+    """Read ``STATIC_DIR``; with ``DEBUG`` off the manifest is loaded once and kept."""
+    global _manifest
+    _options["static_dir"] = getattr(settings, "STATIC_DIR", None) or DEFAULT_STATIC_DIR
+    _options["reload"] = bool(getattr(settings, "DEBUG", False))
+    _manifest = None
+
+
+def precompile(static_dir: str = DEFAULT_STATIC_DIR, gzip_level: int = 9, brotli_quality: int = 11) -> Dict[str, str]:
+    """Write content-hashed copies of ``static_dir`` into its ``assets`` folder.
+
+    Compressible files also get ``.gz`` (and, with the ``brotli`` package, ``.br``)
+    siblings when those are smaller. Older fingerprinted files are kept so pages
+    rendered before a deploy can still load theirs. Returns the manifest, which maps
+    each source path to its fingerprinted path and is written to ``manifest.json``.
+    """
+    source = Path(static_dir)
+    output = source / ASSETS_DIR
+    output.mkdir(parents=True, exist_ok=True)
+    manifest: Dict[str, str] = {}
+    for path in sorted(source.rglob("*")):
+        if not path.is_file() or output in path.parents:
+            continue
+        relative = path.relative_to(source)
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        fingerprinted = relative.with_name(f"{path.stem}-{digest}{path.suffix}")
+        target = output / fingerprinted
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not target.exists():
+            target.write_bytes(data)
+            if (guess_type(path.name)[0] or "") in DEFAULT_COMPRESSIBLE_TYPES:
+                _write_smaller(target.with_name(target.name + ".gz"), gzip.compress(data, gzip_level, mtime=0), data)
+                if brotli is not None:
+                    _write_smaller(target.with_name(target.name + ".br"), brotli.compress(data, quality=brotli_quality), data)
+        manifest[relative.as_posix()] = fingerprinted.as_posix()
+
+    staging = output / f".{MANIFEST_NAME}.tmp"
+    staging.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(staging, output / MANIFEST_NAME)
+    return manifest
+
+
+def asset_url(name: str) -> str:
+    """URL of a file in ``STATIC_DIR``, fingerprinted when ``pmvc assets precompile`` ran.
+
+    Registered as a template global: ``<link href="{{ asset_url('app.css') }}">``.
+    """
+    name = name.lstrip("/")
+    fingerprinted = _load_manifest().get(name)
+    if fingerprinted is None:
+        return f"{STATIC_URL_PREFIX}/{name}"
+    return f"{STATIC_URL_PREFIX}/{ASSETS_DIR}/{fingerprinted}"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """``StaticFiles`` that prefers ``.br``/``.gz`` siblings and caches fingerprints forever.
+
+    Files under ``assets/`` are content-addressed, so they are sent with
+    ``Cache-Control: immutable`` and a year's ``max-age``; everything else keeps the
+    usual ETag/Last-Modified revalidation.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # Same normalisation lookup_path applies to the paths it hands to file_response.
+        resolve = os.path.abspath if self.follow_symlink else os.path.realpath
+        self.assets_dir = resolve(os.path.join(str(self.directory), ASSETS_DIR)) if self.directory else None
+
+    def file_response(
+        self,
+        full_path: Any,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        fingerprinted = self._fingerprinted(str(full_path))
+        response: Optional[Response] = None
+        if fingerprinted:
+            accepted = accepted_codings(request_headers.get("accept-encoding", ""))
+            for encoding, suffix in PRECOMPRESSED_VARIANTS:
+                if encoding not in accepted:
+                    continue
+                try:
+                    variant_stat = os.stat(f"{full_path}{suffix}")
+                except OSError:
+                    continue
+                response = FileResponse(
+                    f"{full_path}{suffix}",
+                    status_code=status_code,
+                    stat_result=variant_stat,
+                    media_type=guess_type(str(full_path))[0] or "text/plain",
+                    headers={"content-encoding": encoding},
+                )
+                break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        if fingerprinted:
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            response.headers.add_vary_header("Accept-Encoding")
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _fingerprinted(self, full_path: str) -> bool:
+        if self.assets_dir is None or os.path.basename(full_path) == MANIFEST_NAME:
+            return False
+        return os.path.commonpath([full_path, self.assets_dir]) == self.assets_dir
+
+
+def _write_smaller(path: Path, compressed: bytes, original: bytes) -> None:
+    if len(compressed) < len(original):
+        path.write_bytes(compressed)
+
+
+def _load_manifest() -> Dict[str, str]:
+    global _manifest
+    path = Path(_options["static_dir"]) / ASSETS_DIR / MANIFEST_NAME
+    if _manifest is not None and not _options["reload"]:
+        return _manifest[1]
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        _manifest = (0.0, {})
+        return _manifest[1]
+    if _manifest is None or _manifest[0] != mtime:
+        _manifest = (mtime, json.loads(path.read_text()))
+    return _manifest[1]
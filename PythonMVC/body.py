@@ -0,0 +1,240 @@
+"""Request body limits and single-pass form/JSON parsing shared by middleware and controllers."""
+
+from __future__ import annotations
+
+import inspect
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.datastructures import FormData, Headers
+from starlette.exceptions import HTTPException
+from starlette.formparsers import FormParser, MultiPartException, MultiPartParser
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BODY_CONFIG = {
+    # Whole request body, uploads included; larger requests get a 413.
+    "max_body_size": 10 * 1024 * 1024,
+    # Any single non-file form field.
+    "max_field_size": 1024 * 1024,
+    "max_fields": 1000,
+    "max_files": 1000,
+    # Uploaded files larger than this are spooled to a temporary file on disk.
+    "spool_max_size": 1024 * 1024,
+}
+
+FORM_CONTENT_TYPES = ("application/x-www-form-urlencoded", "multipart/form-data")
+
+# Parsed bodies live in the ASGI scope state so every Request object for it shares them.
+FORM_STATE_KEY = "pmvc_form"
+JSON_STATE_KEY = "pmvc_json"
+
+# FormParser takes max_fields/max_part_size only in newer Starlette releases; on older
+# ones _limit_urlencoded enforces the same limits on the stream before it is parsed.
+_FORM_PARSER_LIMITS = "max_part_size" in inspect.signature(FormParser.__init__).parameters
+
+_config: Dict[str, Any] = dict(DEFAULT_BODY_CONFIG)
+
+
+class RequestBodyError(HTTPException):
+    """A body that is too large (413) or malformed (400)."""
+
+
+def configure(settings: Any) -> None:
+    """Read ``REQUEST_BODY`` (keys of :data:`DEFAULT_BODY_CONFIG`) from the app settings."""
+    options = getattr(settings, "REQUEST_BODY", None) or {}
+    unknown = set(options) - set(DEFAULT_BODY_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown REQUEST_BODY option(s): {', '.join(sorted(unknown))}")
+    _config.clear()
+    _config.update(DEFAULT_BODY_CONFIG)
+    _config.update(options)
+
+
+class RequestBodyMiddleware:
+    """Enforce ``max_body_size`` and clean up the parsed form after the response.
+
+    A ``Content-Length`` over the limit is refused before any byte is read; chunked
+    bodies are counted as they arrive. The cached form (and its spooled uploads) is
+    closed once the app returns.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: Optional[int] = None) -> None:
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.max_body_size if self.max_body_size is not None else _config["max_body_size"]
+        length = Headers(scope=scope).get("content-length", "")
+        if limit and length.isdigit() and int(length) > limit:
+            await PlainTextResponse("Request Entity Too Large", status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise RequestBodyError(413, "Request Entity Too Large")
+            return message
+
+        async def send_tracking(message: Message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive if limit else receive, send_tracking)
+        except RequestBodyError as exc:
+            # Raised while a middleware (CSRF) was reading the body, outside Starlette's
+            # exception handling; inside an endpoint it is already a response.
+            if started:
+                raise
+            await PlainTextResponse(exc.detail, status_code=exc.status_code)(scope, receive, send)
+        finally:
+            parsed = scope.get("state", {}).get(FORM_STATE_KEY)
+            if parsed is not None:
+                await parsed.close()
+
+
+async def read_form(request: Request) -> FormData:
+    """The request's form, parsed at most once per request whoever asks first."""
+    state = request.scope.setdefault("state", {})
+    parsed = state.get(FORM_STATE_KEY)
+    if parsed is None:
+        parsed = state[FORM_STATE_KEY] = await _parse_form(request.headers, request.stream())
+    return parsed
+
+
+async def read_json(request: Request) -> Any:
+    """The request's JSON body, decoded at most once per request."""
+    state = request.scope.setdefault("state", {})
+    if JSON_STATE_KEY not in state:
+        try:
+            state[JSON_STATE_KEY] = json.loads(await request.body())
+        except ValueError as exc:
+            raise RequestBodyError(400, f"Malformed JSON body: {exc}") from exc
+    return state[JSON_STATE_KEY]
+
+
+async def preload_form(scope: Scope, receive: Receive) -> Tuple[FormData, Receive]:
+    """Parse the form for a middleware and return the ``receive`` to pass downstream.
+
+    URL-encoded bodies are small and already in memory, so downstream gets them replayed
+    (raw ``request.body()`` keeps working). Multipart bodies are streamed straight into
+    the parser, uploads spooling to disk, and are not replayed: downstream reads them
+    through :func:`read_form`, which returns the cached result.
+    """
+    headers = Headers(scope=scope)
+    state = scope.setdefault("state", {})
+    if headers.get("content-type", "").startswith("multipart/form-data"):
+        parsed = state[FORM_STATE_KEY] = await _parse_form(headers, _stream(receive))
+        return parsed, _consumed(receive)
+    raw, receive = await buffer_body(receive)
+    parsed = state[FORM_STATE_KEY] = await _parse_form(headers, _once(raw))
+    return parsed, receive
+
+
+async def buffer_body(receive: Receive) -> Tuple[bytes, Receive]:
+    """Read the request body and return a ``receive`` that replays it downstream."""
+    chunks: List[bytes] = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+
+async def _parse_form(headers: Headers, stream: AsyncIterator[bytes]) -> FormData:
+    content_type = headers.get("content-type", "")
+    parser: Any
+    if content_type.startswith("multipart/form-data"):
+        parser = MultiPartParser(headers, stream, max_files=_config["max_files"], max_fields=_config["max_fields"])
+        # Attributes rather than arguments: every supported Starlette release reads them
+        # (older releases call the spooling threshold ``max_file_size``).
+        parser.max_part_size = _config["max_field_size"]
+        parser.spool_max_size = parser.max_file_size = _config["spool_max_size"]
+    elif content_type.startswith("application/x-www-form-urlencoded"):
+        if _FORM_PARSER_LIMITS:
+            parser = FormParser(headers, stream, max_fields=_config["max_fields"], max_part_size=_config["max_field_size"])
+        else:
+            parser = FormParser(headers, _limit_urlencoded(stream, _config["max_fields"], _config["max_field_size"]))
+    else:
+        return FormData()
+    try:
+        return await parser.parse()
+    except MultiPartException as exc:
+        raise RequestBodyError(400, exc.message) from exc
+
+
+async def _limit_urlencoded(stream: AsyncIterator[bytes], max_fields: int, max_field_size: int) -> AsyncIterator[bytes]:
+    # Same checks and messages as FormParser's own: bytes of one name plus its value, and
+    # non-empty "&"-separated fields counted as they end.
+    fields = 0
+    size = 0
+    async for chunk in stream:
+        for index, piece in enumerate(chunk.split(b"&")):
+            if index:
+                fields, size = fields + (size > 0), 0
+            size += len(piece) - piece.count(b"=")
+            if size > max_field_size:
+                raise MultiPartException(f"Field exceeded maximum size of {int(max_field_size / 1024)}KB.")
+        if not chunk:
+            fields += size > 0
+        if fields > max_fields:
+            raise MultiPartException(f"Too many fields. Maximum number of fields is {max_fields}.")
+        yield chunk
+
+
+async def _stream(receive: Receive) -> AsyncIterator[bytes]:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnect()
+        body = message.get("body", b"")
+        if body:
+            yield body
+        if not message.get("more_body", False):
+            break
+    yield b""
+
+
+async def _once(body: bytes) -> AsyncIterator[bytes]:
+    yield body
+    yield b""
+
+
+def _consumed(receive: Receive) -> Receive:
+    delivered = False
+
+    async def empty() -> Message:
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return await receive()
+
+    return empty
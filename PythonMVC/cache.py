@@ -1,11 +1,34 @@
-"""Cache adapters built on Redis."""
+"""Cache adapters built on Redis, plus cache-aside helpers."""
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import inspect
+import logging
 import os
-from typing import Optional
+import pickle
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from redis import asyncio as aioredis
+from starlette.requests import Request
+from starlette.responses import Response
+
+KEY_PREFIX = "pmvc:cache:"
+INVALIDATION_CHANNEL = "pmvc:cache:invalidate"
+
+# Deletes KEYS[1] only while it still holds ARGV[1]: a lock is released by its owner only.
+COMPARE_AND_DELETE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+logger = logging.getLogger(__name__)
 
 
 class Cache:
@@ -14,9 +37,497 @@ class Cache:
     def __init__(self, url: Optional[str] = None) -> None:
         self.url = url or os.getenv("CACHE_URL", "redis://localhost:6379/0")
         self._client: aioredis.Redis | None = None
+        self._compare_and_delete: Any = None
 
     async def client(self) -> aioredis.Redis:
         if self._client is None:
             self._client = aioredis.from_url(self.url)
         return self._client
 
+    async def get(self, key: str) -> Optional[bytes]:
+        return await (await self.client()).get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        px = int(ttl * 1000) if ttl else None
+        return bool(await (await self.client()).set(key, value, px=px, nx=nx))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await (await self.client()).delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        return int(await (await self.client()).incr(key))
+
+    async def compare_and_delete(self, key: str, value: bytes) -> bool:
+        """Delete ``key`` only if it still holds ``value``, atomically."""
+        client = await self.client()
+        if self._compare_and_delete is None:
+            self._compare_and_delete = client.register_script(COMPARE_AND_DELETE_LUA)
+        return bool(await self._compare_and_delete(keys=[key], args=[value]))
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        await (await self.client()).publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        pubsub = (await self.client()).pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.aclose()
+
+
+class MemoryCache:
+    """In-process stand-in for :class:`Cache` with the same get/set/delete/incr surface.
+
+    Expired entries go when read, and writes sweep out the rest at most every
+    ``sweep_interval`` seconds, so keys nobody asks for again (abandoned sessions,
+    rate-limit windows) do not pile up.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, sweep_interval: float = 60.0) -> None:
+        self.clock = clock
+        self.sweep_interval = sweep_interval
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._subscribers: Dict[str, List["asyncio.Queue[bytes]"]] = {}
+        self._next_sweep = clock() + sweep_interval
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        if nx and await self.get(key) is not None:
+            return False
+        now = self.clock()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            expired = [name for name, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+            for name in expired:
+                del self._data[name]
+        self._data[key] = (value, now + ttl if ttl else None)
+        return True
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        current = int(await self.get(key) or 0) + 1
+        expires_at = self._data[key][1] if key in self._data else None
+        self._data[key] = (str(current).encode(), expires_at)
+        return current
+
+    async def compare_and_delete(self, key: str, value: bytes) -> bool:
+        if await self.get(key) != value:
+            return False
+        del self._data[key]
+        return True
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        queue: "asyncio.Queue[bytes]" = asyncio.Queue()
+        self._subscribers.setdefault(channel, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].remove(queue)
+
+
+class LRUCache:
+    """Per-process LRU with per-entry TTL, bounded by the total size of keys and values."""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= self.clock():
+            self.discard(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, size: Optional[int] = None) -> None:
+        """Store ``value``; pass ``size`` when it is not ``bytes`` (e.g. its pickled length)."""
+        cost = len(key) + (len(value) if size is None else size)
+        self.discard(key)
+        if cost > self.max_bytes:
+            return
+        self._entries[key] = (value, self.clock() + ttl, cost)
+        self.size += cost
+        while self.size > self.max_bytes:
+            _, (_, _, old_cost) = self._entries.popitem(last=False)
+            self.size -= old_cost
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
+
+
+class TieredCache:
+    """In-process L1 (:class:`LRUCache`) in front of a shared L2 (:class:`Cache`).
+
+    Reads hit L1 first and fill it from L2. Writes and deletes go to L2 and are
+    broadcast on ``channel`` so every other worker drops its L1 copy; ``l1_ttl`` caps
+    staleness should an invalidation message be lost.
+    """
+
+    def __init__(
+        self,
+        l2: Optional["CacheBackend"] = None,
+        max_bytes: int = 16 * 1024 * 1024,
+        l1_ttl: float = 5.0,
+        channel: str = INVALIDATION_CHANNEL,
+    ) -> None:
+        self.l2 = l2 or Cache()
+        self.l1 = LRUCache(max_bytes)
+        self.l1_ttl = l1_ttl
+        self.channel = channel
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self._origin = uuid.uuid4().hex
+        self._listener: Optional["asyncio.Task[None]"] = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self._ensure_listener()
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        value = await self.l2.get(key)
+        if value is None:
+            self.l2_misses += 1
+            return None
+        self.l2_hits += 1
+        self.l1.set(key, value, self.l1_ttl)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        self._ensure_listener()
+        stored = await self.l2.set(key, value, ttl=ttl, nx=nx)
+        if stored:
+            self.l1.set(key, value, min(ttl, self.l1_ttl) if ttl else self.l1_ttl)
+            await self._broadcast(key)
+        return stored
+
+    async def delete(self, *keys: str) -> None:
+        await self.l2.delete(*keys)
+        for key in keys:
+            self.l1.discard(key)
+            await self._broadcast(key)
+
+    async def incr(self, key: str) -> int:
+        value = await self.l2.incr(key)
+        self.l1.discard(key)
+        await self._broadcast(key)
+        return value
+
+    async def compare_and_delete(self, key: str, value: bytes) -> bool:
+        deleted = await self.l2.compare_and_delete(key, value)
+        if deleted:
+            self.l1.discard(key)
+            await self._broadcast(key)
+        return deleted
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"l1": self.l1.stats(), "l2": {"hits": self.l2_hits, "misses": self.l2_misses}}
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _broadcast(self, key: str) -> None:
+        try:
+            await self.l2.publish(self.channel, f"{self._origin} {key}".encode())
+        except Exception:  # pragma: no cover - peers fall back to l1_ttl expiry
+            logger.warning("Could not publish cache invalidation for %s", key, exc_info=True)
+
+    def _ensure_listener(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self) -> None:
+        try:
+            async for message in self.l2.subscribe(self.channel):
+                origin, _, key = message.decode().partition(" ")
+                if origin != self._origin:
+                    self.l1.discard(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # pragma: no cover - resubscribe on next access
+            logger.warning("Cache invalidation listener stopped; flushing L1", exc_info=True)
+            self.l1.clear()
+
+
+CacheBackend = Union[Cache, MemoryCache, TieredCache]
+
+_default_backend: Optional[CacheBackend] = None
+_inflight: Dict[str, "asyncio.Future[Any]"] = {}
+# Resolves an in-flight future whose leader produced a value that must not be shared.
+_UNCACHEABLE = object()
+
+
+def configure(settings: Any) -> None:
+    """Pick the default backend for :func:`cached` from ``CACHE_BACKEND``/``CACHE_URL``.
+
+    ``CACHE_BACKEND`` is ``"redis"`` (default), ``"tiered"`` (L1 in front of Redis, sized
+    by ``CACHE_L1_MAX_BYTES``/``CACHE_L1_TTL``) or ``"memory"``.
+    """
+    global _default_backend
+    kind = getattr(settings, "CACHE_BACKEND", "redis")
+    if kind == "memory":
+        _default_backend = MemoryCache()
+    elif kind == "tiered":
+        _default_backend = TieredCache(
+            Cache(getattr(settings, "CACHE_URL", None)),
+            max_bytes=getattr(settings, "CACHE_L1_MAX_BYTES", 16 * 1024 * 1024),
+            l1_ttl=getattr(settings, "CACHE_L1_TTL", 5.0),
+        )
+    else:
+        _default_backend = Cache(getattr(settings, "CACHE_URL", None))
+
+
+def default_backend() -> CacheBackend:
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = Cache()
+    return _default_backend
+
+
+async def namespace_version(namespace: str, backend: Optional[CacheBackend] = None) -> int:
+    value = await (backend or default_backend()).get(f"{KEY_PREFIX}ns:{namespace}")
+    return int(value or 0)
+
+
+async def invalidate(namespace: str, backend: Optional[CacheBackend] = None) -> int:
+    """Retire every key in ``namespace`` in O(1) by bumping its version.
+
+    Old entries are never read again and simply age out through their TTL.
+    """
+    return await (backend or default_backend()).incr(f"{KEY_PREFIX}ns:{namespace}")
+
+
+async def get_or_compute(
+    backend: CacheBackend,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: float,
+    lock_timeout: float = 10.0,
+) -> Any:
+    """Return the cached value for ``key`` or compute it exactly once.
+
+    Concurrent callers in this process share one in-flight computation; across processes
+    a short-lived ``SET NX`` lock elects a single recomputer while the others poll for its
+    result (and compute themselves if the lock holder does not deliver in time).
+
+    ``compute`` raises :class:`Uncacheable` for a result that belongs to its caller alone
+    (an error page, a streaming response): that caller gets it, nothing is stored, and
+    callers that were waiting on it run ``compute`` themselves.
+    """
+    cached_value = await backend.get(key)
+    if cached_value is not None:
+        return pickle.loads(cached_value)
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        value = await asyncio.shield(pending)
+        if value is _UNCACHEABLE:
+            return await compute()
+        return value
+
+    future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        value = await _compute_with_lock(backend, key, compute, ttl, lock_timeout)
+    except Uncacheable:
+        future.set_result(_UNCACHEABLE)
+        raise
+    except BaseException as exc:
+        future.set_exception(exc)
+        future.exception()  # mark retrieved so lone callers don't log "never retrieved"
+        raise
+    else:
+        future.set_result(value)
+        return value
+    finally:
+        _inflight.pop(key, None)
+
+
+async def _compute_with_lock(
+    backend: CacheBackend,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: float,
+    lock_timeout: float,
+) -> Any:
+    lock_key = f"{key}:lock"
+    # The token proves ownership: a holder that outlived lock_timeout must not release
+    # the lock another process has taken since.
+    token = uuid.uuid4().hex.encode()
+    if not await backend.set(lock_key, token, ttl=lock_timeout, nx=True):
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            cached_value = await backend.get(key)
+            if cached_value is not None:
+                return pickle.loads(cached_value)
+        return await compute()
+
+    try:
+        value = await compute()
+        await backend.set(key, pickle.dumps(value), ttl=ttl)
+        return value
+    finally:
+        await backend.compare_and_delete(lock_key, token)
+
+
+class _CachedResponse:
+    """Picklable snapshot of a buffered response."""
+
+    __slots__ = ("status_code", "body", "headers")
+
+    def __init__(self, response: Response) -> None:
+        self.status_code = response.status_code
+        self.body = response.body
+        # Cookies are per-visitor and must never be replayed to someone else.
+        self.headers = [(k, v) for k, v in response.raw_headers if k != b"set-cookie"]
+
+    def __getstate__(self) -> Tuple[int, bytes, list]:
+        return self.status_code, self.body, self.headers
+
+    def __setstate__(self, state: Tuple[int, bytes, list]) -> None:
+        self.status_code, self.body, self.headers = state
+
+    def to_response(self) -> Response:
+        response = Response(self.body, status_code=self.status_code)
+        response.raw_headers = list(self.headers)
+        return response
+
+
+class Uncacheable(Exception):
+    """Raised by a ``get_or_compute`` callable to hand ``value`` to its own caller only."""
+
+    def __init__(self, value: Any) -> None:
+        super().__init__(value)
+        self.value = value
+
+
+def _find_request(args: Iterable[Any]) -> Optional[Request]:
+    return next((arg for arg in args if isinstance(arg, Request)), None)
+
+
+def _request_key(func: Callable[..., Any], request: Request, query: Iterable[str]) -> str:
+    route = request.scope.get("route")
+    name = getattr(route, "name", None) or func.__qualname__
+    params = ",".join(f"{k}={v}" for k, v in sorted(request.path_params.items()))
+    selected = ",".join(f"{k}={request.query_params.get(k, '')}" for k in query)
+    return f"{name}|{params}|{selected}"
+
+
+def cached(
+    ttl: float = 60,
+    key: Union[str, Callable[..., str], None] = None,
+    namespace: str = "default",
+    query: Iterable[str] = (),
+    backend: Optional[CacheBackend] = None,
+    lock_timeout: float = 10.0,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """Cache-aside decorator for controller actions and plain async functions.
+
+    For actions the key is built from the route name, the path params and the query
+    params listed in ``query``; only successful buffered responses are stored. For plain
+    functions the key is built from the call arguments. ``key`` may be a format string
+    (filled from path/query params or bound arguments) or a callable returning the key.
+    Call :func:`invalidate` with the same ``namespace`` to drop the whole group.
+    """
+    query = tuple(query)
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func)
+
+        def build_key(args: Tuple[Any, ...], kwargs: Dict[str, Any], request: Optional[Request]) -> str:
+            if callable(key):
+                return key(*args, **kwargs)
+            if request is not None:
+                if key is None:
+                    return _request_key(func, request, query)
+                return key.format(**{**dict(request.query_params), **request.path_params})
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {k: v for k, v in bound.arguments.items() if k not in ("self", "cls")}
+            if key is None:
+                return f"{func.__module__}.{func.__qualname__}|{sorted(arguments.items())!r}"
+            return key.format(**arguments)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            store = backend or default_backend()
+            request = _find_request(args)
+            version = await namespace_version(namespace, store)
+            full_key = f"{KEY_PREFIX}{namespace}:v{version}:{build_key(args, kwargs, request)}"
+
+            if request is None:
+                return await get_or_compute(store, full_key, lambda: func(*args, **kwargs), ttl, lock_timeout)
+
+            async def compute_response() -> _CachedResponse:
+                response = await func(*args, **kwargs)
+                if response.status_code != 200 or not hasattr(response, "body"):
+                    raise Uncacheable(response)
+                return _CachedResponse(response)
+
+            try:
+                snapshot = await get_or_compute(store, full_key, compute_response, ttl, lock_timeout)
+            except Uncacheable as exc:
+                return exc.value
+            return snapshot.to_response()
+
+        return wrapper
+
+    return decorator
@@ -1,12 +1,14 @@
-"""PythonMVC CLI entrypoint."""
+"""PythonMVC CLI entrypoint.
+
+Commands only declare their options here; each imports its implementation module when
+it runs, so `pmvc --help` or `pmvc db upgrade` never load the web stack.
+"""
 
 from __future__ import annotations
 
-import typer
+from typing import Optional
 
-from .database import db as db_command
-from .generate import generate as generate_command
-from .new import new as new_command
+import typer
 
 app = typer.Typer(help="PythonMVC CLI — generators and dev tasks")
 
@@ -16,15 +18,50 @@ def new(
     name: str = typer.Argument(..., help="App folder name"),
     database: str = typer.Option("sqlite", help="Database backend", case_sensitive=False),
 ):
+    from .new import new as new_command
+
     new_command(name, database)
 
 
 @app.command("server")
-def server(host: str = "127.0.0.1", port: int = 8000, reload: bool = True):
-    """Run the development server (Uvicorn)."""
+def server(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    reload: bool = True,
+    workers: int = typer.Option(1, help="Pre-forked worker processes (production mode when > 1)"),
+    preload: bool = typer.Option(False, "--preload", help="Import the app once in the master before forking"),
+    max_requests: int = typer.Option(0, help="Recycle a worker after this many requests (0 = never)"),
+    max_requests_jitter: int = typer.Option(0, help="Random extra requests per worker so they don't recycle together"),
+    graceful_timeout: float = typer.Option(30.0, help="Seconds a stopping worker gets to finish in-flight requests"),
+    app_path: str = typer.Option("app.main:app", "--app", help="ASGI app as module:attribute"),
+    metrics_dir: str = typer.Option(
+        "", help="Where workers share METRICS (default: $PMVC_METRICS_DIR or a temporary directory)"
+    ),
+):
+    """Run the development server (Uvicorn), or a pre-forking production server.
+
+    With --workers/--preload/--max-requests the master forks workers that share one socket;
+    send SIGHUP for a graceful reload, SIGTERM to stop.
+    """
+    if workers > 1 or preload or max_requests:
+        from ..server import PreforkServer
+
+        PreforkServer(
+            app_path,
+            host,
+            port,
+            workers=workers,
+            preload=preload,
+            max_requests=max_requests,
+            max_requests_jitter=max_requests_jitter,
+            graceful_timeout=graceful_timeout,
+            metrics_dir=metrics_dir or None,
+        ).run()
+        return
+
     import subprocess
 
-    command = ["uvicorn", "app.main:app", "--host", host, "--port", str(port)]
+    command = ["uvicorn", app_path, "--host", host, "--port", str(port)]
     if reload:
         command.append("--reload")
     subprocess.run(command, check=False)
@@ -32,15 +69,74 @@ def server(host: str = "127.0.0.1", port: int = 8000, reload: bool = True):
 
 @app.command("db")
 def db(cmd: str = typer.Argument(..., help="init|migrate|upgrade|downgrade|revision"), message: str = ""):
+    from .database import db as db_command
+
     db_command(cmd, message)
 
 
+@app.command("templates")
+def templates(
+    cmd: str = typer.Argument(..., help="compile"),
+    views: Optional[str] = typer.Option(None, help="Templates directory [default: app/views]"),
+    cache_dir: Optional[str] = typer.Option(None, help="Bytecode cache directory (TEMPLATE_CACHE_DIR) [default: tmp/templates]"),
+):
+    from ..templating import DEFAULT_TEMPLATE_CACHE_DIR, DEFAULT_TEMPLATES_DIR
+    from .templates import templates as templates_command
+
+    templates_command(cmd, views or DEFAULT_TEMPLATES_DIR, cache_dir or DEFAULT_TEMPLATE_CACHE_DIR)
+
+
+@app.command("assets")
+def assets(
+    cmd: str = typer.Argument(..., help="precompile"),
+    static_dir: Optional[str] = typer.Option(None, help="Static files directory (STATIC_DIR) [default: public]"),
+):
+    from ..assets import DEFAULT_STATIC_DIR
+    from .assets import assets as assets_command
+
+    assets_command(cmd, static_dir or DEFAULT_STATIC_DIR)
+
+
+@app.command("worker")
+def worker(
+    concurrency: Optional[int] = typer.Option(None, help="Jobs run at once [default: JOBS concurrency, 4]"),
+    pool: Optional[str] = typer.Option(None, help="asyncio (coroutines on the loop, functions in threads) or process"),
+    batch_size: Optional[int] = typer.Option(None, help="Jobs reserved per round trip to the queue"),
+    burst: bool = typer.Option(False, "--burst", help="Exit once no job is due instead of polling"),
+    app_path: str = typer.Option("app.main:app", "--app", help="ASGI app as module:attribute; importing it configures JOBS"),
+):
+    """Run background jobs queued with `PythonMVC.jobs.enqueue`. SIGTERM stops gracefully."""
+    from .worker import worker as worker_command
+
+    worker_command(app_path, burst, {"concurrency": concurrency, "pool": pool, "batch_size": batch_size})
+
+
+@app.command("bench")
+def bench(
+    output: str = typer.Option("", help="Write results as JSON to this file"),
+    baseline: str = typer.Option("", help="Fail when results regress against this JSON file"),
+    requests: int = typer.Option(1000, help="Measured requests per scenario"),
+    concurrency: int = typer.Option(10, help="Concurrent clients"),
+    seed: int = typer.Option(200, help="Posts inserted before measuring"),
+    threshold: float = typer.Option(0.15, help="Allowed slowdown before a scenario counts as a regression"),
+    uvicorn: bool = typer.Option(False, "--uvicorn", help="Drive a real uvicorn server instead of the in-process ASGI transport"),
+    scenario: list[str] = typer.Option([], help="Scenarios to run, repeatable: health, index, show, create, admin [default: all]"),
+):
+    """Load-test a generated app and compare against a saved baseline."""
+    from .bench import SCENARIOS
+    from .bench import bench as bench_command
+
+    bench_command(output or None, baseline or None, requests, concurrency, seed, threshold, uvicorn, scenario or SCENARIOS)
+
+
 @app.command("generate")
 def generate(
     kind: str,
     name: str,
     fields: list[str] = typer.Argument((), help="Field declarations e.g. title:str body:text"),
 ):
+    from .generate import generate as generate_command
+
     joined = " ".join(fields)
     generate_command(kind, name, joined)
 
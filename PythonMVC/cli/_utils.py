@@ -11,6 +11,10 @@ def snake_case(name: str) -> str:
     return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
 
 
+def camel_case(name: str) -> str:
+    return "".join(part[:1].upper() + part[1:] for part in snake_case(name).split("_"))
+
+
 def write_files(root: Path, files: Mapping[str, str]) -> None:
     for relative, content in files.items():
         path = root / relative
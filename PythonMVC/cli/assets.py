@@ -0,0 +1,17 @@
+"""`pmvc assets` command implementation."""
+
+from __future__ import annotations
+
+import typer
+
+from ..assets import ASSETS_DIR, MANIFEST_NAME, precompile
+
+
+def assets(cmd: str, static_dir: str) -> None:
+    """Asset tasks: fingerprint and precompress ``static_dir`` for far-future caching."""
+    if cmd == "precompile":
+        manifest = precompile(static_dir)
+        typer.echo(f"✔ Precompiled {len(manifest)} assets into {static_dir}/{ASSETS_DIR} ({MANIFEST_NAME})")
+        return
+
+    typer.echo("Unknown assets command")
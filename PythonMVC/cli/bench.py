@@ -0,0 +1,293 @@
+"""`pmvc bench` command implementation."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import importlib
+import io
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+import typer
+
+from .new import new as new_command
+
+SCENARIOS = ("health", "index", "show", "create", "admin")
+# Environment variables that would point the throwaway app at a real database.
+DATABASE_ENVIRONMENT = ("DATABASE_URL", "DATABASE_ASYNC_URL", "DATABASE_REPLICA_URLS")
+
+# Written next to the generated app: same settings, minus the dev-only knobs.
+BENCH_APP = """import logging
+
+from PythonMVC import create_app
+from app.main import settings
+
+# Concurrent SQLite writes queue on the file lock; that is measured, not worth logging.
+logging.getLogger("PythonMVC.sql").setLevel(logging.ERROR)
+settings.DEBUG = False
+settings.SECURITY = {**settings.SECURITY, "rate_limit": 0}
+settings.ADMIN = {"authorize": lambda request: True}  # local throwaway app only
+app = create_app(settings)
+"""
+
+Scenario = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+def bench(
+    output: Optional[str] = None,
+    baseline: Optional[str] = None,
+    requests: int = 1000,
+    concurrency: int = 10,
+    seed: int = 200,
+    threshold: float = 0.15,
+    use_uvicorn: bool = False,
+    scenarios: Sequence[str] = SCENARIOS,
+) -> None:
+    """Benchmark a freshly generated app and optionally gate on a baseline."""
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise typer.BadParameter(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    results = run_suite(requests, concurrency, seed, use_uvicorn, scenarios)
+    for name, stats in results["scenarios"].items():
+        typer.echo(
+            f"{name:<8} {stats['rps']:>9.1f} req/s  p50 {stats['p50_ms']:.2f} ms  "
+            f"p95 {stats['p95_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms  errors {stats['errors']}"
+        )
+    if output:
+        Path(output).write_text(json.dumps(results, indent=2) + "\n")
+        typer.echo(f"✔ Wrote {output}")
+
+    if baseline:
+        regressions = compare(results, json.loads(Path(baseline).read_text()), threshold)
+        for line in regressions:
+            typer.echo(f"✘ {line}")
+        if regressions:
+            raise typer.Exit(1)
+        typer.echo(f"✔ No regressions beyond {threshold:.0%} against {baseline}")
+
+
+def run_suite(
+    requests: int = 1000,
+    concurrency: int = 10,
+    seed: int = 200,
+    use_uvicorn: bool = False,
+    scenarios: Sequence[str] = SCENARIOS,
+) -> Dict[str, Any]:
+    """Generate a throwaway app, seed it and measure each scenario."""
+    with tempfile.TemporaryDirectory(prefix="pmvc-bench-") as workdir, _inside(Path(workdir)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            new_command("benchapp", "sqlite")
+        root = Path(workdir) / "benchapp"
+        (root / "bench_app.py").write_text(BENCH_APP)
+        database = f"sqlite:///{root / 'db' / 'app.db'}"
+        with _database_environment(database), _inside(root), _generated_modules(root):
+            _seed(seed)
+            if use_uvicorn:
+                with _uvicorn(root) as base_url:
+                    measured = asyncio.run(_run_all(httpx.AsyncHTTPTransport(), base_url, requests, concurrency, seed, scenarios))
+            else:
+                app = importlib.import_module("bench_app").app
+                transport = httpx.ASGITransport(app=app)
+                measured = asyncio.run(_run_all(transport, "http://bench", requests, concurrency, seed, scenarios))
+
+    return {
+        "meta": {
+            "transport": "uvicorn" if use_uvicorn else "asgi",
+            "requests": requests,
+            "concurrency": concurrency,
+            "seed": seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": measured,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.15) -> List[str]:
+    """Describe every scenario whose throughput or p95 is worse than ``threshold`` allows."""
+    regressions: List[str] = []
+    for name, before in baseline.get("scenarios", {}).items():
+        after = results["scenarios"].get(name)
+        if after is None:
+            continue
+        if after["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{name}: {after['rps']:.1f} req/s vs {before['rps']:.1f} baseline")
+        if after["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {after['p95_ms']:.2f} ms vs {before['p95_ms']:.2f} ms baseline")
+        if after["errors"] > before.get("errors", 0):
+            regressions.append(f"{name}: {after['errors']} errors vs {before.get('errors', 0)} baseline")
+    return regressions
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted ``samples``."""
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, math.ceil(fraction * len(samples)) - 1))
+    return samples[index]
+
+
+async def measure(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Run ``requests`` calls of ``scenario`` over ``concurrency`` concurrent workers."""
+    for _ in range(min(50, requests)):
+        await scenario(client)
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await scenario(client)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "rps": requests / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": errors,
+    }
+
+
+def _scenarios(seed: int) -> Dict[str, Scenario]:
+    counter = iter(range(10**9))
+
+    async def health(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/health")
+
+    async def index(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/posts")
+
+    async def show(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(f"/posts/{next(counter) % seed + 1}")
+
+    async def create(client: httpx.AsyncClient) -> httpx.Response:
+        token = client.cookies.get("csrf")
+        data = {"title": f"Bench {next(counter)}", "body": "Created by pmvc bench.", "_csrf": token}
+        return await client.post("/posts", data=data)
+
+    async def admin(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/admin/posts")
+
+    return {"health": health, "index": index, "show": show, "create": create, "admin": admin}
+
+
+async def _run_all(
+    transport: httpx.AsyncBaseTransport,
+    base_url: str,
+    requests: int,
+    concurrency: int,
+    seed: int,
+    names: Sequence[str],
+) -> Dict[str, Dict[str, Any]]:
+    scenarios = _scenarios(max(seed, 1))
+    results: Dict[str, Dict[str, Any]] = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url) as client:
+        # Any page sets the CSRF cookie the create scenario echoes back.
+        await client.get("/posts/new")
+        # Writes go last so the read scenarios always see the seeded table.
+        for name in sorted(names, key=lambda name: name == "create"):
+            results[name] = await measure(client, scenarios[name], requests, concurrency)
+    return {name: results[name] for name in SCENARIOS if name in results}
+
+
+def _seed(rows: int) -> None:
+    from ..model import BaseModel
+
+    post = importlib.import_module("app.models.post").Post
+    BaseModel.metadata.create_all(BaseModel.engine())
+    post.bulk_insert({"title": f"Post {number}", "body": "Lorem ipsum " * 20} for number in range(rows))
+
+
+@contextlib.contextmanager
+def _database_environment(url: str) -> Iterator[None]:
+    """Pin ``DATABASE_URL`` to ``url`` (it beats Settings) and drop the other overrides.
+
+    Otherwise a host with ``DATABASE_URL`` exported would seed and write to that database.
+    """
+    previous = {name: os.environ.get(name) for name in DATABASE_ENVIRONMENT}
+    for name in DATABASE_ENVIRONMENT:
+        os.environ.pop(name, None)
+    os.environ["DATABASE_URL"] = url
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@contextlib.contextmanager
+def _inside(path: Path) -> Iterator[None]:
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+@contextlib.contextmanager
+def _generated_modules(root: Path) -> Iterator[None]:
+    """Make the generated ``app`` package importable, then forget it again."""
+    before = set(sys.modules)
+    sys.path.insert(0, str(root))
+    try:
+        importlib.import_module("bench_app")
+        yield
+    finally:
+        sys.path.remove(str(root))
+        for name in set(sys.modules) - before:
+            if name == "app" or name.startswith("app.") or name == "bench_app":
+                del sys.modules[name]
+
+
+@contextlib.contextmanager
+def _uvicorn(root: Path) -> Iterator[str]:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench_app:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=root,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                httpx.get(f"{base_url}/health")
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise typer.Exit(1)
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
@@ -3,39 +3,114 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 import typer
 
-from ._utils import snake_case
-
-FIELD_SQL_TYPES: Dict[str, str] = {
-    "str": "String(255)",
-    "text": "Text()",
-    "int": "Integer()",
+from ._utils import camel_case, snake_case
+
+# field type -> (SQLAlchemy type, Mapped[] hint, module the hint comes from)
+FIELD_TYPES: Dict[str, Tuple[str, str, Optional[str]]] = {
+    "str": ("String(255)", "str", None),
+    "text": ("Text()", "str", None),
+    "int": ("Integer()", "int", None),
+    "bigint": ("BigInteger()", "int", None),
+    "float": ("Float()", "float", None),
+    "decimal": ("Numeric(12, 2)", "Decimal", "decimal"),
+    "bool": ("Boolean()", "bool", None),
+    "date": ("Date()", "date", "datetime"),
+    "datetime": ("DateTime(timezone=True)", "datetime", "datetime"),
 }
+FIELD_MODIFIERS = ("index", "unique")
+REFERENCES = "references"
+# Large columns the generated index page does not select.
+UNLISTED_TYPES = ("text",)
+
+
+class Field:
+    """One ``name:type[:index|:unique]`` declaration from the command line."""
+
+    def __init__(self, declaration: str) -> None:
+        name, _, rest = declaration.partition(":")
+        parts = rest.split(":") if rest else ["str"]
+        self.name = snake_case(name)
+        self.type = parts[0]
+        self.modifiers = parts[1:]
+        if not self.name.isidentifier():
+            raise typer.BadParameter(f"{name!r} is not a valid field name")
+        if self.type not in FIELD_TYPES and self.type != REFERENCES:
+            known = ", ".join([*FIELD_TYPES, REFERENCES])
+            raise typer.BadParameter(f"Unknown type {self.type!r} in {declaration!r}; use one of: {known}")
+        unknown = [modifier for modifier in self.modifiers if modifier not in FIELD_MODIFIERS]
+        if unknown:
+            raise typer.BadParameter(f"Unknown modifier {unknown[0]!r} in {declaration!r}; use index or unique")
+
+    @property
+    def is_reference(self) -> bool:
+        return self.type == REFERENCES
+
+    @property
+    def column(self) -> str:
+        """The attribute holding the stored value (``author_id`` for ``author:references``)."""
+        return f"{self.name}_id" if self.is_reference else self.name
+
+    @property
+    def target(self) -> str:
+        return camel_case(self.name)
+
+    def model_lines(self) -> List[str]:
+        options = []
+        if "unique" in self.modifiers:
+            options.append("unique=True")
+        elif "index" in self.modifiers or self.is_reference:
+            # Foreign keys are indexed too: joins and "rows of this parent" look-ups need it.
+            options.append("index=True")
+        if self.is_reference:
+            column = ", ".join([f"ForeignKey('{self.name}s.id')", *options])
+            return [
+                f"    {self.column}: Mapped[int] = mapped_column({column})",
+                "    # Never loaded behind your back: add joinedload()/selectinload() to the query.",
+                f"    {self.name}: Mapped['{self.target}'] = relationship(lazy='raise_on_sql')",
+            ]
+        sqlalchemy_type, hint, _ = FIELD_TYPES[self.type]
+        column = ", ".join([sqlalchemy_type, *options])
+        return [f"    {self.name}: Mapped[{hint}] = mapped_column({column})"]
+
+
+def _parse_fields(fields: str) -> List[Field]:
+    return [Field(declaration) for declaration in fields.split()]
 
 
 def _build_model_columns(fields: str) -> str:
-    if not fields:
-        return "    pass"
+    lines = [line for field in _parse_fields(fields) for line in field.model_lines()]
+    return "\n".join(lines) if lines else "    pass"
 
-    lines: list[str] = []
-    for field in fields.split():
-        if ":" not in field:
+
+def _model_imports(parsed: List[Field]) -> str:
+    sqlalchemy_names = set()
+    hint_imports: Dict[str, List[str]] = {}
+    for field in parsed:
+        if field.is_reference:
+            sqlalchemy_names.add("ForeignKey")
             continue
-        name, ftype = field.split(":", 1)
-        sqlalchemy_type = FIELD_SQL_TYPES.get(ftype, "String(255)")
-        hint = "int" if ftype == "int" else "str"
-        lines.append(f"    {name}: Mapped[{hint}] = mapped_column({sqlalchemy_type})")
-    return "\n".join(lines) if lines else "    pass"
+        sqlalchemy_type, hint, module = FIELD_TYPES[field.type]
+        sqlalchemy_names.add(sqlalchemy_type.split("(", 1)[0])
+        if module and hint not in hint_imports.setdefault(module, []):
+            hint_imports[module].append(hint)
+    orm_names = ["Mapped", "mapped_column"]
+    if any(field.is_reference for field in parsed):
+        orm_names.append("relationship")
+    lines = [f"from {module} import {', '.join(sorted(names))}" for module, names in sorted(hint_imports.items())]
+    lines.append(f"from sqlalchemy.orm import {', '.join(orm_names)}")
+    if sqlalchemy_names:
+        lines.append(f"from sqlalchemy import {', '.join(sorted(sqlalchemy_names))}")
+    lines.append("from PythonMVC.model import BaseModel")
+    return "\n".join(lines)
 
 
 def _generate_model(class_name: str, name_snake: str, fields: str) -> None:
     model_path = Path(f"app/models/{name_snake}.py")
-    model_template = f"""from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Text, Integer
-from PythonMVC.model import BaseModel
+    model_template = f"""{_model_imports(_parse_fields(fields))}
 
 
 class {class_name}(BaseModel):
@@ -47,9 +122,41 @@ class {class_name}(BaseModel):
     typer.echo(f"✔ Generated model at {model_path}")
 
 
-def _generate_controller(class_name: str, name_snake: str) -> None:
+def _index_query(class_name: str, parsed: List[Field]) -> Tuple[str, str]:
+    """The index action's statement (listed columns only, references joined) and its imports."""
+    listed = ["id", *[field.column for field in parsed if field.type not in UNLISTED_TYPES]]
+    options = [f"load_only({', '.join(f'{class_name}.{column}' for column in listed)})"]
+    options += [f"joinedload({class_name}.{field.name})" for field in parsed if field.is_reference]
+    orm_names = "joinedload, load_only" if len(options) > 1 else "load_only"
+    arguments = "".join(f"\n            {option}," for option in options)
+    return f"select({class_name}).options({arguments}\n        )", orm_names
+
+
+def _generate_controller(class_name: str, name_snake: str, with_model: bool = False, fields: str = "") -> None:
     controller_path = Path(f"app/controllers/{name_snake}s_controller.py")
-    controller_template = f"""from PythonMVC.controller import BaseController
+    if with_model:
+        parsed = _parse_fields(fields)
+        statement, orm_names = _index_query(class_name, parsed)
+        api_fields = ", ".join(repr(column) for column in ["id", *[field.column for field in parsed]])
+        controller_template = f"""from PythonMVC.controller import BaseController
+from sqlalchemy import select
+from sqlalchemy.orm import {orm_names}
+from starlette.requests import Request
+from ..models.{name_snake} import {class_name}
+
+
+class {class_name}sController(BaseController):
+    model = {class_name}  # also served as JSON/NDJSON to clients that Accept it; guard that in api_statement()
+    api_fields = [{api_fields}]  # the only columns the JSON API exposes; keep secrets out
+
+    async def index(self, request: Request):
+        # One keyset page (?after=, ?per_page= up to 100) of the columns the page shows.
+        statement = {statement}
+        records, next_after = await self.paginate(request, statement, {class_name}.id)
+        return self.render(request, '{name_snake}s/index.html', {{'records': records, 'next_after': next_after}})
+"""
+    else:
+        controller_template = f"""from PythonMVC.controller import BaseController
 from starlette.requests import Request
 
 
@@ -62,19 +169,38 @@ class {class_name}sController(BaseController):
     typer.echo(f"✔ Generated controller at {controller_path}")
 
 
-def _generate_views(name_snake: str) -> None:
+def _generate_views(name_snake: str, fields: str = "") -> None:
     view_dir = Path(f"app/views/{name_snake}s")
     view_dir.mkdir(parents=True, exist_ok=True)
-    index_view = """{% extends 'shared/layout.html' %}{% block body %}
+    cells = ["#{{ record.id }}"]
+    for field in _parse_fields(fields):
+        if field.is_reference:
+            cells.append(f"{field.target} #{{{{ record.{field.name}.id }}}}")
+        elif field.type not in UNLISTED_TYPES:
+            cells.append(f"{{{{ record.{field.name} }}}}")
+    index_view = f"""{{% extends 'shared/layout.html' %}}{{% block body %}}
 <h1>Index</h1>
-{% endblock %}"""
+<ul>
+  {{% for record in records %}}
+  <li>{' · '.join(cells)}</li>
+  {{% endfor %}}
+</ul>
+<p><a href="?">First page</a>{{% if next_after %}} · <a href="?after={{{{ next_after }}}}">Next →</a>{{% endif %}}</p>
+{{% endblock %}}"""
     (view_dir / "index.html").write_text(index_view)
     typer.echo("✔ Generated scaffold views")
 
 
 def generate(kind: str, name: str, fields: str = "") -> None:
-    """Generate code: model/controller/scaffold."""
+    """Generate code: model/controller/scaffold.
+
+    Fields are ``name:type`` with type ``str`` (default), ``text``, ``int``, ``bigint``,
+    ``float``, ``decimal``, ``bool``, ``date`` or ``datetime``, optionally followed by
+    ``:index`` or ``:unique``; ``author:references`` adds an indexed ``author_id``
+    foreign key to ``authors`` and an ``author`` relationship.
+    """
     name_snake = snake_case(name)
+    _parse_fields(fields)  # reject bad declarations before writing anything
 
     if kind == "model":
         _generate_model(name, name_snake, fields)
@@ -82,7 +208,7 @@ def generate(kind: str, name: str, fields: str = "") -> None:
         _generate_controller(name, name_snake)
     elif kind == "scaffold":
         _generate_model(name, name_snake, fields)
-        _generate_controller(name, name_snake)
-        _generate_views(name_snake)
+        _generate_controller(name, name_snake, with_model=True, fields=fields)
+        _generate_views(name_snake, fields)
     else:
         typer.echo("Unknown kind. Use: model | controller | scaffold")
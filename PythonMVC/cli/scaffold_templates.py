@@ -13,7 +13,7 @@ PROJECT_SKELETON = {
   <head>
     <meta charset="utf-8" />
     <title>{{ title or 'PythonMVC' }}</title>
-    <link rel="stylesheet" href="/static/app.css" />
+    <link rel="stylesheet" href="{{ asset_url('app.css') }}" />
   </head>
   <body>
     <main class="container">{% block body %}{% endblock %}</main>
@@ -27,10 +27,23 @@ from .controllers.posts_controller import PostsController
 class Settings:
     DEBUG = True
     SECRET_KEY = 'dev-secret-change-me'
-    STATIC_DIR = 'public'
+    STATIC_DIR = 'public'  # `pmvc assets precompile` fingerprints it for far-future caching
+    COMPRESSION = {"enabled": True, "minimum_size": 500}  # gzip (brotli with pmvc[brotli])
+    TEMPLATE_CACHE_DIR = 'tmp/templates'  # warm with `pmvc templates compile`
     DATABASE_URL = 'sqlite:///db/app.db'  # swap to postgresql+psycopg://, mysql+pymysql://, or mongodb://
+    DATABASE_POOL = {"size": 5, "max_overflow": 10, "recycle": 1800, "pre_ping": True, "timeout": 30}
+    DATABASE_REPLICA_URLS = []  # read replicas, e.g. {"postgresql+psycopg://ro@replica1/app": 2}
+    DATABASE_REPLICAS = {"read_your_writes": 2.0, "retry_after": 30}
+    REQUEST_BODY = {"max_body_size": 10 * 1024 * 1024, "max_field_size": 1024 * 1024, "spool_max_size": 1024 * 1024}
     CACHE_URL = 'redis://localhost:6379/0'
+    SESSIONS = {"backend": "cookie"}  # "redis": id-only cookie, data in CACHE_URL; read with `await self.session(request)`
+    JOBS = {"backend": "database", "concurrency": 4, "max_attempts": 5}  # `pmvc worker` runs jobs.enqueue(...) calls
+    QUERY_CACHE = {"backend": "memory", "ttl": 300}  # opt in per query with .execution_options(query_cache=True)
+    SQL_INSTRUMENTATION = {"enabled": True, "slow_ms": 100, "n_plus_one": 5}  # Server-Timing + slow/N+1 log
+    METRICS = {"path": "/metrics", "multiprocess_dir": None}  # Prometheus; set a dir when running several workers
     SECURITY = {"secret": "dev-secret-change-me", "rate_limit": 120}
+    ADMIN = None  # {"authorize": callable(request) -> bool} mounts /admin CRUD behind that check
+    COMPILED_ROUTES = False  # trie dispatch for apps with many resources
     ROUTES = []
 
 
@@ -45,59 +58,64 @@ app = create_app(settings)
 }
 
 POSTS_CONTROLLER = """from PythonMVC.controller import BaseController
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
 from starlette.requests import Request
-from PythonMVC.model import db_session
+from PythonMVC.model import async_db_session
 from .schemas import PostCreate
 from ..models.post import Post
 
 
 class PostsController(BaseController):
+    model = Post  # also served as JSON/NDJSON to clients that Accept it; guard that in api_statement()
+    api_fields = ['id', 'title', 'body']  # the only columns the JSON API exposes; keep secrets out
+
     async def index(self, request: Request):
-        with db_session() as s:
-            posts = s.query(Post).order_by(Post.id.desc()).all()
-        return self.render(request, 'posts/index.html', { 'posts': posts })
+        # One keyset page (?after=, ?per_page= up to 100); bodies stay in the database.
+        statement = select(Post).options(load_only(Post.id, Post.title))
+        posts, next_after = await self.paginate(request, statement, Post.id)
+        return self.render(request, 'posts/index.html', { 'posts': posts, 'next_after': next_after })
 
     async def new(self, request: Request):
         return self.render(request, 'posts/new.html')
 
     async def create(self, request: Request):
-        form = dict(await request.form())
+        form = dict(await self.form(request))
         data = PostCreate(**form)
-        with db_session() as s:
+        async with async_db_session() as s:
             post = Post(title=data.title, body=data.body)
             s.add(post)
-            s.commit()
+            await s.commit()
         return self.redirect('/posts')
 
     async def show(self, request: Request):
         pid = int(request.path_params['id'])
-        with db_session() as s:
-            post = s.get(Post, pid)
-        return self.render(request, 'posts/show.html', { 'post': post })
+        async with async_db_session() as s:
+            post = await s.get(Post, pid)
+        return self.render(request, 'posts/show.html', { 'post': post }, fresh_when=post)
 
     async def edit(self, request: Request):
         pid = int(request.path_params['id'])
-        with db_session() as s:
-            post = s.get(Post, pid)
+        async with async_db_session() as s:
+            post = await s.get(Post, pid)
         return self.render(request, 'posts/edit.html', { 'post': post })
 
     async def update(self, request: Request):
         pid = int(request.path_params['id'])
-        form = dict(await request.form())
-        with db_session() as s:
-            post = s.get(Post, pid)
+        form = dict(await self.form(request))
+        async with async_db_session() as s:
+            post = await s.get(Post, pid)
             post.title = form.get('title', post.title)
             post.body = form.get('body', post.body)
-            s.add(post)
-            s.commit()
+            await s.commit()
         return self.redirect(f'/posts/{pid}')
 
     async def destroy(self, request: Request):
         pid = int(request.path_params['id'])
-        with db_session() as s:
-            post = s.get(Post, pid)
-            s.delete(post)
-            s.commit()
+        async with async_db_session() as s:
+            post = await s.get(Post, pid)
+            await s.delete(post)
+            await s.commit()
         return self.redirect('/posts')
 """
 
@@ -125,9 +143,49 @@ POSTS_VIEWS = {
 <h1>Admin</h1>
 <ul>
   {% for m in models %}
-    <li>{{ m.class_.__name__ }} (table: {{ m.local_table.name if m.local_table else 'n/a' }})</li>
+    {% if m.local_table is not none %}
+    <li><a href="/admin/{{ m.local_table.name }}">{{ m.class_.__name__ }}</a> (table: {{ m.local_table.name }})</li>
+    {% endif %}
   {% endfor %}
 </ul>
+{% endblock %}""",
+    "app/views/admin/list.html": """{% extends 'shared/layout.html' %}{% block body %}
+<h1>{{ mapper.class_.__name__ }}</h1>
+<p>
+  {{ '~' if total_is_estimate }}{{ total }} rows
+  {% if total_is_estimate %}(<a href="?sort={{ sort }}&dir={{ direction }}&count=exact">exact count</a>){% endif %}
+  · <a href="/admin/{{ table }}/new">+ New</a>
+  · Export <a href="/admin/{{ table }}/export.csv">CSV</a> / <a href="/admin/{{ table }}/export.ndjson">NDJSON</a>
+  · <a href="/admin">Admin</a>
+</p>
+<table>
+  <thead><tr>{% for c in columns %}<th><a href="?sort={{ c }}&dir={{ 'asc' if sort == c and direction == 'desc' else 'desc' }}">{{ c }}</a></th>{% endfor %}</tr></thead>
+  <tbody>
+  {% for row in rows %}
+    <tr>{% for c in columns %}<td>{% if c == pk %}<a href="/admin/{{ table }}/{{ row[c] }}">{{ row[c] }}</a>{% else %}{{ row[c] }}{% endif %}</td>{% endfor %}</tr>
+  {% else %}
+    <tr><td colspan="{{ columns|length }}">No rows.</td></tr>
+  {% endfor %}
+  </tbody>
+</table>
+<p><a href="?sort={{ sort }}&dir={{ direction }}">First page</a>{% if next_cursor %} · <a href="?sort={{ sort }}&dir={{ direction }}&after={{ next_cursor }}">Next →</a>{% endif %}</p>
+{% endblock %}""",
+    "app/views/admin/form.html": """{% extends 'shared/layout.html' %}{% block body %}
+<h1>{{ 'Edit' if record else 'New' }} {{ table }}{{ ' #' ~ record[pk] if record }}</h1>
+<form method="post" action="/admin/{{ table }}{{ '/' ~ record[pk] if record }}">
+  <input type="hidden" name="_csrf" value="{{ request.state.csrf_token }}">
+  {% for f in fields %}
+  <p><label>{{ f }} <input name="{{ f }}" value="{{ record[f] if record and record[f] is not none else '' }}"></label></p>
+  {% endfor %}
+  <button type="submit">Save</button>
+</form>
+{% if record %}
+<form method="post" action="/admin/{{ table }}/{{ record[pk] }}/delete">
+  <input type="hidden" name="_csrf" value="{{ request.state.csrf_token }}">
+  <button type="submit">Delete</button>
+</form>
+{% endif %}
+<p><a href="/admin/{{ table }}">Back</a></p>
 {% endblock %}""",
     "app/views/posts/index.html": """{% extends 'shared/layout.html' %}{% block body %}
 <h1>Posts</h1>
@@ -139,10 +197,12 @@ POSTS_VIEWS = {
   <li>No posts yet.</li>
   {% endfor %}
 </ul>
+{% if next_after %}<p><a href="/posts?after={{ next_after }}">Older posts →</a></p>{% endif %}
 {% endblock %}""",
     "app/views/posts/new.html": """{% extends 'shared/layout.html' %}{% block body %}
 <h1>New Post</h1>
 <form method="post" action="/posts">
+  <input type="hidden" name="_csrf" value="{{ request.state.csrf_token }}">
   <p><label>Title <input name="title"></label></p>
   <p><label>Body <textarea name="body"></textarea></label></p>
   <button type="submit">Create</button>
@@ -159,6 +219,7 @@ POSTS_VIEWS = {
 <h1>Edit Post</h1>
 <form method="post" action="/posts/{{ post.id }}">
   <input type="hidden" name="_method" value="patch">
+  <input type="hidden" name="_csrf" value="{{ request.state.csrf_token }}">
   <p><label>Title <input name="title" value="{{ post.title }}"></label></p>
   <p><label>Body <textarea name="body">{{ post.body }}</textarea></label></p>
   <button type="submit">Save</button>
@@ -175,7 +236,8 @@ requires-python = ">=3.11"
 dependencies = [
   "starlette>=0.40",
   "uvicorn[standard]>=0.30",
-  "SQLAlchemy>=2.0",
+  "SQLAlchemy[asyncio]>=2.0",
+  "aiosqlite>=0.20",
   "alembic>=1.13",
   "jinja2>=3.1",
   "typer>=0.12",
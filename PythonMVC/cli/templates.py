@@ -0,0 +1,17 @@
+"""`pmvc templates` command implementation."""
+
+from __future__ import annotations
+
+import typer
+
+from ..templating import compile_templates
+
+
+def templates(cmd: str, views: str, cache_dir: str) -> None:
+    """Template tasks: precompile views into the shared bytecode cache."""
+    if cmd == "compile":
+        count = compile_templates(views, cache_dir)
+        typer.echo(f"✔ Compiled {count} templates from {views} into {cache_dir}")
+        return
+
+    typer.echo("Unknown templates command")
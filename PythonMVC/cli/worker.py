@@ -0,0 +1,36 @@
+"""`pmvc worker` command implementation."""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import os
+import signal
+import sys
+from typing import Any, Dict
+
+import typer
+
+
+def worker(app_path: str, burst: bool, options: Dict[str, Any]) -> None:
+    """Import the app (so its settings configure the queue and database) and run jobs."""
+    from ..jobs import Worker
+
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    module_name, _, attribute = app_path.partition(":")
+    getattr(importlib.import_module(module_name), attribute or "app")
+
+    runner = Worker(**{key: value for key, value in options.items() if value is not None})
+
+    async def main() -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            # Jobs in hand finish; anything still reserved reappears after its visibility timeout.
+            loop.add_signal_handler(signum, runner.stop)
+        await runner.run(burst=burst)
+
+    mode = "burst" if burst else "until stopped"
+    typer.echo(f"✔ Worker running ({runner.options['backend']}, {runner.options['pool']} pool x{runner.options['concurrency']}, {mode})")
+    asyncio.run(main())
+    typer.echo(f"✔ Worker stopped: {runner.processed} done, {runner.failed} failed for good")
@@ -0,0 +1,190 @@
+"""Streaming-safe gzip/brotli response compression."""
+
+from __future__ import annotations
+
+import zlib
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # brotli is optional: `pip install pmvc[brotli]`
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+DEFAULT_COMPRESSIBLE_TYPES = frozenset(
+    {
+        "text/html",
+        "text/css",
+        "text/plain",
+        "text/csv",
+        "text/xml",
+        "text/javascript",
+        "application/javascript",
+        "application/json",
+        "application/x-ndjson",
+        "application/xml",
+        "application/manifest+json",
+        "image/svg+xml",
+    }
+)
+
+DEFAULT_COMPRESSION_CONFIG = {
+    "enabled": False,
+    # Complete bodies smaller than this go out as they are; gzip would barely help.
+    "minimum_size": 500,
+    "gzip_level": 6,
+    # Used when the client accepts it and the `brotli` package is installed.
+    "brotli": True,
+    "brotli_quality": 4,
+    "content_types": DEFAULT_COMPRESSIBLE_TYPES,
+}
+
+# Statuses whose body must not (or cannot usefully) be re-encoded.
+UNCOMPRESSED_STATUSES = frozenset({204, 206, 304})
+
+
+class CompressionMiddleware:
+    """Compress responses whose content type is on the allowlist.
+
+    Complete responses below ``minimum_size`` pass through untouched. Streaming responses
+    (``more_body``) are compressed chunk by chunk with a sync flush after each one, so
+    streamed templates and NDJSON exports still reach the client as they are produced.
+    Responses that already carry a ``Content-Encoding`` (precompressed assets) or ask for
+    ``no-transform`` are left alone.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli: bool = True,
+        brotli_quality: int = 4,
+        content_types: Iterable[str] = DEFAULT_COMPRESSIBLE_TYPES,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli = brotli and _brotli_available()
+        self.brotli_quality = brotli_quality
+        self.content_types: FrozenSet[str] = frozenset(content_types)
+
+    @classmethod
+    def options(cls, config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """``COMPRESSION`` settings as constructor keyword arguments."""
+        merged = dict(DEFAULT_COMPRESSION_CONFIG)
+        merged.update(config or {})
+        merged.pop("enabled")
+        return merged
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+
+        async def compressing_send(message: Message) -> None:
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether compression pays.
+                start = message
+                return
+            if start is None:
+                if encoder is not None and message["type"] == "http.response.body":
+                    more_body = message.get("more_body", False)
+                    data = encoder.compress(message.get("body", b""), final=not more_body)
+                    message = {"type": "http.response.body", "body": data, "more_body": more_body}
+                await send(message)
+                return
+
+            pending, start = start, None
+            headers = MutableHeaders(raw=list(pending.get("headers", ())))
+            pending["headers"] = headers.raw
+            if message["type"] != "http.response.body" or not self._compressible(pending["status"], headers):
+                await send(pending)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if not more_body and len(body) < self.minimum_size:
+                await send(pending)
+                await send(message)
+                return
+
+            encoder = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+            data = encoder.compress(body, final=not more_body)
+            headers["content-encoding"] = encoding
+            if more_body:
+                del headers["content-length"]
+            else:
+                headers["content-length"] = str(len(data))
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                # The bytes differ from the identity representation the ETag names.
+                headers["etag"] = "W/" + headers["etag"]
+            await send(pending)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
+
+    def _negotiate(self, accept_encoding: str) -> Optional[str]:
+        accepted = accepted_codings(accept_encoding)
+        if self.brotli and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compressible(self, status: int, headers: MutableHeaders) -> bool:
+        if status < 200 or status in UNCOMPRESSED_STATUSES or "content-encoding" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        content_type = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        return content_type in self.content_types
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gzip = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            output = self._brotli.process(data)
+            return output + (self._brotli.finish() if final else self._brotli.flush())
+        output = self._gzip.compress(data)
+        return output + self._gzip.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def accepted_codings(header: str) -> FrozenSet[str]:
+    """Content codings an ``Accept-Encoding`` header allows (``q=0`` excluded)."""
+    codings = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            codings.add(name.strip().lower())
+    return frozenset(codings)
+
+
+def _brotli_available() -> bool:
+    return brotli is not None
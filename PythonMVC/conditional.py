@@ -0,0 +1,144 @@
+"""Conditional GET helpers: ETag/Last-Modified validators and Cache-Control policies."""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import NoInspectionAvailable
+from starlette.requests import Request
+from starlette.responses import Response
+
+TIMESTAMP_COLUMNS = ("updated_at", "created_at")
+
+Action = Callable[..., Awaitable[Response]]
+
+
+class Validators:
+    """ETag and Last-Modified values computed for a response."""
+
+    __slots__ = ("etag", "last_modified")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[datetime]) -> None:
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def apply(self, response: Response) -> Response:
+        if self.etag:
+            response.headers.setdefault("ETag", self.etag)
+        if self.last_modified:
+            response.headers.setdefault("Last-Modified", format_datetime(self.last_modified, usegmt=True))
+        return response
+
+    def not_modified(self, request: Request) -> bool:
+        """Evaluate ``If-None-Match`` / ``If-Modified-Since`` for a GET or HEAD request."""
+        if request.method not in ("GET", "HEAD"):
+            return False
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if not self.etag:
+                return False
+            candidates = {_strong(tag.strip()) for tag in if_none_match.split(",")}
+            return "*" in candidates or _strong(self.etag) in candidates
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return self.last_modified.replace(microsecond=0) <= _as_utc(since)
+        return False
+
+    def not_modified_response(self) -> Response:
+        return self.apply(Response(status_code=304))
+
+
+def validators_for(source: Any, salt: str = "") -> Validators:
+    """Derive validators from a model instance, an iterable of instances or a callable.
+
+    The ETag hashes every loaded column value, so it changes whenever the rendered data
+    can. Only attributes already loaded are read, so detached instances never lazy-load.
+    """
+    if callable(source):
+        source = source()
+    if source is None:
+        items: List[Any] = []
+    elif isinstance(source, (list, tuple, set, frozenset)) or _is_iterable(source):
+        items = list(source)
+    else:
+        items = [source]
+
+    digest = hashlib.sha1(salt.encode())
+    last_modified: Optional[datetime] = None
+    for item in items:
+        values, stamp = _fingerprint(item)
+        digest.update(repr(values).encode())
+        if stamp and (last_modified is None or stamp > last_modified):
+            last_modified = stamp
+    return Validators(f'W/"{digest.hexdigest()}"', last_modified)
+
+
+def cache_control(directives: Optional[str] = None, **options: Any) -> Callable[[Action], Action]:
+    """Set a Cache-Control policy on every response an action returns.
+
+    ``@cache_control(max_age=60, public=True)`` renders ``public, max-age=60``; pass a raw
+    string for anything else. Responses that already carry the header are left alone.
+    """
+    parts = [directives] if directives else []
+    for name, value in options.items():
+        directive = name.replace("_", "-")
+        if value is True:
+            parts.append(directive)
+        elif value is not False and value is not None:
+            parts.append(f"{directive}={value}")
+    header = ", ".join(parts)
+
+    def decorator(action: Action) -> Action:
+        @functools.wraps(action)
+        async def wrapper(*args: Any, **kwargs: Any) -> Response:
+            response = await action(*args, **kwargs)
+            response.headers.setdefault("Cache-Control", header)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _strong(tag: str) -> str:
+    # Weak comparison (RFC 9110 8.8.3.2); not str.removeprefix, which needs Python 3.9.
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _is_iterable(value: Any) -> bool:
+    if isinstance(value, (str, bytes, dict)):
+        return False
+    try:
+        sa_inspect(value)
+        return False
+    except NoInspectionAvailable:
+        return hasattr(value, "__iter__")
+
+
+def _fingerprint(item: Any) -> Tuple[Any, Optional[datetime]]:
+    try:
+        state = sa_inspect(item)
+    except NoInspectionAvailable:
+        return repr(item), None
+    loaded = state.dict
+    values = (type(item).__name__, [(attr.key, loaded.get(attr.key)) for attr in state.mapper.column_attrs])
+    for column in TIMESTAMP_COLUMNS:
+        value = loaded.get(column)
+        if isinstance(value, datetime):
+            return values, _as_utc(value).replace(microsecond=0)
+    return values, None
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
@@ -2,18 +2,48 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy import Select, select
+from starlette.datastructures import FormData
+from starlette.exceptions import HTTPException
 from starlette.requests import Request
-from starlette.responses import RedirectResponse, Response
+from starlette.responses import RedirectResponse, Response, StreamingResponse
 from starlette.templating import Jinja2Templates
 
+from .api import JSON, NDJSON, APIResponse, dumps, negotiate, requested_fields, serializer_for
+from .body import read_form, read_json
+from .conditional import validators_for
+from .model import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, async_db_session, keyset_page
+from .sessions import load_session
+from .templating import DEFAULT_TEMPLATES_DIR, get_async_environment, get_templates
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
 
 class BaseController:
-    """Base controller with Rails-inspired conventions for template rendering."""
+    """Base controller with Rails-inspired conventions for template rendering.
+
+    Set ``model`` to serve the resource as JSON too: ``resource()`` routes requests
+    that prefer ``application/json`` (or ``application/x-ndjson``) to :meth:`api_index`
+    and :meth:`api_show`, which bypass ``index``/``show``: guard and scope them in
+    :meth:`api_statement`. ``api_fields`` lists the columns exposed (``resource()``
+    requires it with a ``model``; unset, only the primary key is); ``api_per_page`` is
+    the default page size of :meth:`api_index`.
+    """
+
+    model: Any = None
+    api_fields: Optional[List[str]] = None
+    api_per_page: int = DEFAULT_PAGE_SIZE
 
-    def __init__(self, templates_dir: str = "app/views") -> None:
-        self.templates = Jinja2Templates(directory=templates_dir)
+    def __init__(self, templates_dir: str = DEFAULT_TEMPLATES_DIR) -> None:
+        self.templates_dir = templates_dir
+
+    @property
+    def templates(self) -> Jinja2Templates:
+        """The app-wide environment for ``templates_dir``, shared by every controller."""
+        return get_templates(self.templates_dir)
 
     async def before_action(self, request: Request) -> None:  # pragma: no cover - hooks are user-defined
         """Override for per-request setup."""
@@ -22,15 +52,132 @@ class BaseController:
         """Override for teardown/response decoration."""
         return response
 
-    def render(self, request: Request, template: str, context: Optional[Dict[str, Any]] = None) -> Response:
+    def render(
+        self,
+        request: Request,
+        template: str,
+        context: Optional[Dict[str, Any]] = None,
+        fresh_when: Any = None,
+    ) -> Response:
+        """Render ``template``; with ``fresh_when`` answer conditional GETs with a 304.
+
+        ``fresh_when`` is a model instance, a list of instances or a callable returning
+        either. Its ETag/Last-Modified are compared with ``If-None-Match`` and
+        ``If-Modified-Since`` before the template is rendered.
+        """
+        validators = None
+        if fresh_when is not None:
+            validators = validators_for(fresh_when, salt=template)
+            if validators.not_modified(request):
+                return validators.not_modified_response()
+
         payload = {"request": request}
         if context:
             payload.update(context)
-        return self.templates.TemplateResponse(template, payload)
+        response = self.templates.TemplateResponse(request, template, payload)
+        return validators.apply(response) if validators else response
+
+    def render_stream(
+        self,
+        request: Request,
+        template: str,
+        context: Optional[Dict[str, Any]] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> StreamingResponse:
+        """Render ``template`` incrementally and send it as it is produced.
+
+        Context values may be async iterables (e.g. :func:`PythonMVC.model.stream_query`),
+        which templates loop over with a plain ``{% for %}``. Output is coalesced into
+        ``chunk_size`` byte chunks. Template lookup errors raise before any byte is sent;
+        errors raised mid-render abort the connection.
+        """
+        payload = {"request": request}
+        if context:
+            payload.update(context)
+        compiled = get_async_environment(self.templates_dir).get_template(template)
+        return StreamingResponse(_coalesce(compiled.generate_async(payload), chunk_size), media_type="text/html")
 
     def redirect(self, url: str, status_code: int = 302) -> RedirectResponse:
         return RedirectResponse(url=url, status_code=status_code)
 
+    async def form(self, request: Request) -> FormData:
+        """The submitted form, parsed once per request (the CSRF check may already have)."""
+        return await read_form(request)
+
+    async def json(self, request: Request) -> Any:
+        """The decoded JSON body, cached for the rest of the request."""
+        return await read_json(request)
+
+    async def paginate(
+        self, request: Request, statement: Any, key: Any, per_page: int = DEFAULT_PAGE_SIZE
+    ) -> Tuple[List[Any], Any]:
+        """A :func:`~PythonMVC.model.keyset_page` of ``statement`` for ``?after=``/``?per_page=``."""
+        after, per_page = _page_params(request, key, per_page)
+        return await keyset_page(statement, key, after, per_page)
+
+    async def session(self, request: Request) -> Any:
+        """``request.session``, fetched from the store first when sessions are server-side."""
+        return await load_session(request)
+
+    async def api_statement(self, request: Request, statement: Select[Any]) -> Select[Any]:
+        """The SELECT the JSON API runs, to scope (``statement.where(...)``) or refuse.
+
+        Checks made in ``index``/``show`` do not apply to JSON clients; repeat them here
+        and raise ``HTTPException`` to deny. Returns ``statement`` unchanged by default.
+        """
+        return statement
+
+    async def api_index(self, request: Request) -> Response:
+        """One keyset page of the collection in primary-key order.
+
+        ``?after=<id>`` and ``?per_page=`` (``api_per_page`` by default, at most
+        :data:`~PythonMVC.model.MAX_PAGE_SIZE`) select the page, and a ``Link`` header with
+        ``rel="next"`` points at the following one. The page is encoded in one buffer: one
+        object per line when the client asks for ``application/x-ndjson``, else a JSON
+        array. ``?fields=a,b`` selects only those columns in SQL.
+        """
+        serializer = serializer_for(self.model, requested_fields(request, self.model, self._exposed_fields()))
+        key = sa_inspect(self.model).primary_key[0]
+        after, per_page = _page_params(request, key, self.api_per_page)
+        per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+        # The key goes last as well, so the cursor is known whichever fields were asked for.
+        statement = await self.api_statement(request, select(*serializer.columns, key))
+        statement = statement.order_by(key).limit(per_page + 1)
+        if after is not None:
+            statement = statement.where(key > after)
+        async with async_db_session() as session:
+            rows = (await session.execute(statement)).all()
+        records = [serializer.row(row) for row in rows[:per_page]]
+        if negotiate(request, (JSON, NDJSON)) == NDJSON:
+            response: Response = Response(b"".join(dumps(record) + b"\n" for record in records), media_type=NDJSON)
+        else:
+            response = APIResponse(records)
+        if len(rows) > per_page:
+            next_page = request.url.include_query_params(after=rows[per_page - 1][-1])
+            response.headers["link"] = f'<{next_page}>; rel="next"'
+        return response
+
+    async def api_show(self, request: Request) -> Response:
+        """One record as a JSON object (``?fields=`` as for :meth:`api_index`)."""
+        serializer = serializer_for(self.model, requested_fields(request, self.model, self._exposed_fields()))
+        primary_key = sa_inspect(self.model).primary_key[0]
+        try:
+            ident = primary_key.type.python_type(request.path_params["id"])
+        except (TypeError, ValueError) as exc:
+            raise HTTPException(status_code=404) from exc
+        statement = await self.api_statement(request, select(*serializer.columns).where(primary_key == ident))
+        async with async_db_session() as session:
+            row = (await session.execute(statement)).first()
+        if row is None:
+            raise HTTPException(status_code=404)
+        return APIResponse(serializer.row(row))
+
+    def _exposed_fields(self) -> List[str]:
+        if self.api_fields:
+            return self.api_fields
+        mapper = sa_inspect(self.model)
+        return [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+
     # Default REST actions (override as needed)
     async def index(self, request: Request) -> Response:
         return self.render(request, "shared/placeholder.html", {"action": "index"})
@@ -53,3 +200,24 @@ class BaseController:
     async def destroy(self, request: Request) -> Response:
         return self.redirect("/")
 
+
+def _page_params(request: Request, key: Any, per_page: int) -> Tuple[Any, int]:
+    try:
+        after = request.query_params.get("after")
+        after = key.type.python_type(after) if after else None
+        return after, int(request.query_params.get("per_page", per_page))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid pagination parameters") from exc
+
+
+async def _coalesce(fragments: AsyncIterator[str], chunk_size: int) -> AsyncIterator[bytes]:
+    buffer: List[str] = []
+    size = 0
+    async for fragment in fragments:
+        buffer.append(fragment)
+        size += len(fragment)
+        if size >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
@@ -1,8 +1,22 @@
 """Database adapter helpers."""
 
+from __future__ import annotations
+
+import math
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import replicas
+from .model import async_db_session, db_session
 
-from .model import db_session
+_current: ContextVar[Optional["RequestSession"]] = ContextVar("pmvc_request_session", default=None)
 
 
 class Database:
@@ -11,3 +25,105 @@ class Database:
     def sql(self) -> Session:
         return db_session()
 
+
+class RequestSession:
+    """Proxy for the request's AsyncSession, created on first attribute access."""
+
+    def __init__(self, factory: Callable[[], AsyncSession]) -> None:
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+        self._after_commit: List[Callable[[], Awaitable[Any]]] = []
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def after_commit(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        """Await ``callback()`` once the request's transaction commits; dropped on rollback."""
+        self._after_commit.append(callback)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+
+def current_session() -> Optional[RequestSession]:
+    """The session holder of the request being handled by :class:`DBSessionMiddleware`."""
+    return _current.get()
+
+
+class DBSessionMiddleware:
+    """Expose one lazily-opened AsyncSession per request as ``request.state.db``.
+
+    The session is committed just before the response starts when the status is below
+    400 (so a failed commit still surfaces as a 500), rolled back otherwise or on error,
+    and always closed so its connection returns to the pool. Callbacks registered with
+    :meth:`RequestSession.after_commit` run right after a successful commit.
+
+    With read replicas configured, the time of the client's last write travels in its own
+    small cookie so the read-your-writes window holds across requests and workers without
+    loading a server-side session. The cookie can only pin its own client's reads to the
+    primary, and times in the future are clamped to now.
+    """
+
+    def __init__(self, app: ASGIApp, factory: Callable[[], AsyncSession] = async_db_session) -> None:
+        self.app = app
+        self.factory = factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        holder = RequestSession(self.factory)
+        scope.setdefault("state", {})["db"] = holder
+        token = _current.set(holder)
+        finished = False
+        tracked = bool(replicas.urls())
+        written_at = _last_write_cookie(scope) if tracked else 0.0
+        if tracked:
+            replicas.record_write(written_at)
+
+        async def send_after_commit(message: Message) -> None:
+            nonlocal finished
+            if message["type"] == "http.response.start" and holder.opened and not finished:
+                finished = True
+                if message["status"] < 400:
+                    await holder.session.commit()
+                    for callback in holder._after_commit:
+                        await callback()
+                else:
+                    await holder.session.rollback()
+                holder._after_commit.clear()
+            if message["type"] == "http.response.start" and tracked and replicas.last_write() > written_at:
+                # Covers commits made here and by sessions the controller opened itself.
+                window = math.ceil(replicas.read_your_writes())
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{replicas.LAST_WRITE_COOKIE}={replicas.last_write():.3f}; path=/; max-age={window}; httponly; samesite=lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_after_commit)
+        except BaseException:
+            if holder.opened and not finished:
+                await holder.session.rollback()
+            raise
+        finally:
+            _current.reset(token)
+            if holder.opened:
+                await holder.session.close()
+
+
+def _last_write_cookie(scope: Scope) -> float:
+    try:
+        value = float(HTTPConnection(scope).cookies.get(replicas.LAST_WRITE_COOKIE, 0.0))
+    except ValueError:
+        return 0.0
+    return min(value, time.time()) if math.isfinite(value) else 0.0
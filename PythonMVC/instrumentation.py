@@ -0,0 +1,188 @@
+"""Per-request SQL instrumentation: query counts, timings, N+1 hints and Server-Timing."""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("PythonMVC.sql")
+
+DEFAULT_INSTRUMENTATION_CONFIG = {
+    "enabled": False,
+    # Statements slower than this are logged individually.
+    "slow_ms": 100.0,
+    # The same SQL run this many times with different parameters is reported as a likely N+1.
+    "n_plus_one": 5,
+    # How many of the slowest statements a request keeps.
+    "top": 3,
+}
+
+_config: Dict[str, Any] = dict(DEFAULT_INSTRUMENTATION_CONFIG)
+_current: ContextVar[Optional["QueryLog"]] = ContextVar("pmvc_query_log", default=None)
+_installed = False
+
+
+class QueryLog:
+    """What one request (or :func:`track` block) did against the database."""
+
+    def __init__(self, top: int = 3) -> None:
+        self.top = top
+        self.count = 0
+        self.total = 0.0
+        # (duration, sql) of the slowest statements, longest first.
+        self.slowest: List[Tuple[float, str]] = []
+        self.statements: Dict[str, int] = {}
+        self._parameters: Dict[str, set] = {}
+
+    def record(self, statement: str, parameters: Any, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        try:
+            key = hash(repr(parameters))
+        except Exception:  # pragma: no cover - exotic parameter objects
+            key = id(parameters)
+        self._parameters.setdefault(statement, set()).add(key)
+        if len(self.slowest) < self.top or duration > self.slowest[-1][0]:
+            self.slowest.append((duration, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self.top :]
+
+    def n_plus_one(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements repeated at least ``threshold`` times with differing parameters."""
+        return [
+            (statement, count)
+            for statement, count in self.statements.items()
+            if count >= threshold and len(self._parameters[statement]) > 1
+        ]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total * 1000:.2f};desc="{self.count} queries"'
+
+
+def configure(settings: Any) -> None:
+    """Read ``SQL_INSTRUMENTATION`` and (un)install the engine hooks accordingly.
+
+    When disabled no listener is attached at all, so queries pay nothing.
+    """
+    _config.clear()
+    _config.update(DEFAULT_INSTRUMENTATION_CONFIG)
+    _config.update(getattr(settings, "SQL_INSTRUMENTATION", None) or {})
+    if _config["enabled"]:
+        _install()
+    else:
+        _uninstall()
+
+
+def enabled() -> bool:
+    return _installed
+
+
+def current() -> Optional[QueryLog]:
+    """The log for the request being served, if instrumentation is on."""
+    return _current.get()
+
+
+@contextmanager
+def track() -> Iterator[QueryLog]:
+    """Record the statements run inside the block (installs the hooks if needed)."""
+    _install()
+    log = QueryLog(_config["top"])
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+
+class SQLInstrumentationMiddleware:
+    """Give each request a :class:`QueryLog`, report it and log what looks wrong.
+
+    Adds ``Server-Timing: db;dur=<ms>;desc="<n> queries"`` to the response. It must wrap
+    :class:`~PythonMVC.db.DBSessionMiddleware` so the commit is counted before the
+    header is sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _installed:
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog(_config["top"])
+        token = _current.set(log)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"server-timing", log.server_timing().encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _report(scope, log)
+
+
+def _report(scope: Scope, log: QueryLog) -> None:
+    request = f"{scope.get('method', '')} {scope.get('path', '')}"
+    slow = _config["slow_ms"] / 1000
+    for duration, statement in log.slowest:
+        if duration >= slow:
+            logger.warning(
+                "Slow query (%.1f ms) during %s: %s",
+                duration * 1000,
+                request,
+                statement,
+                extra={"request": request, "sql": statement, "duration_ms": round(duration * 1000, 3)},
+            )
+    for statement, count in log.n_plus_one(_config["n_plus_one"]):
+        logger.warning(
+            "Possible N+1: %d executions of the same statement during %s: %s",
+            count,
+            request,
+            statement,
+            extra={"request": request, "sql": statement, "count": count},
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("pmvc_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    log = _current.get()
+    if log is None:
+        return
+    starts = conn.info.get("pmvc_query_start")
+    if starts:
+        log.record(statement, parameters, time.perf_counter() - starts.pop())
+
+
+def _install() -> None:
+    global _installed
+    if not _installed:
+        # Listening on the Engine class covers every engine, including async ones.
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = True
+
+
+def _uninstall() -> None:
+    global _installed
+    if _installed:
+        event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+        _installed = False
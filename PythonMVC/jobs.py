@@ -0,0 +1,557 @@
+"""Background jobs: ``enqueue`` from a request, run them in ``pmvc worker``."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib
+import inspect
+import logging
+import pickle
+import random
+import time
+import traceback
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Union
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+    bindparam,
+    delete,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import Cache
+from .db import current_session
+
+logger = logging.getLogger("PythonMVC.jobs")
+
+DEFAULT_JOBS_CONFIG = {
+    # "database" (the app's DATABASE_URL, no extra service) or "redis" (CACHE_URL).
+    "backend": "database",
+    # Jobs one worker runs at once, and how many it reserves per round trip.
+    "concurrency": 4,
+    "batch_size": 10,
+    # "asyncio": coroutines on the loop, plain functions in threads; "process": a process pool.
+    "pool": "asyncio",
+    # Seconds a reserved job stays invisible; unfinished by then, another worker may take it.
+    "visibility_timeout": 300.0,
+    "max_attempts": 5,
+    # Retry n waits about backoff * 2 ** (n - 1) seconds, capped at max_backoff.
+    "backoff": 2.0,
+    "max_backoff": 3600.0,
+    "poll_interval": 1.0,
+}
+
+_config: Dict[str, Any] = dict(DEFAULT_JOBS_CONFIG)
+_backend: Optional["JobBackend"] = None
+_cache_url: Optional[str] = None
+
+
+class Job:
+    """One call to run later: ``path`` names an importable function as ``module:qualname``."""
+
+    __slots__ = ("id", "path", "args", "kwargs", "priority", "run_at", "attempts", "max_attempts", "last_error")
+
+    def __init__(
+        self,
+        path: str,
+        args: Sequence[Any] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+        run_at: Optional[float] = None,
+        max_attempts: int = 5,
+        id: Optional[str] = None,
+        attempts: int = 0,
+        last_error: Optional[str] = None,
+    ) -> None:
+        self.id = id or uuid.uuid4().hex
+        self.path = path
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+        self.priority = priority
+        self.run_at = time.time() if run_at is None else run_at
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.last_error = last_error
+
+    def payload(self) -> bytes:
+        return pickle.dumps((self.args, self.kwargs), pickle.HIGHEST_PROTOCOL)
+
+    def __repr__(self) -> str:
+        return f"<Job {self.id} {self.path} attempt {self.attempts}/{self.max_attempts}>"
+
+
+class DatabaseJobBackend:
+    """Jobs in a ``pmvc_jobs`` table reached through ``BaseModel.engine()``.
+
+    Reserving claims rows with a conditional ``UPDATE`` tagged with a per-call token, so
+    two workers never take the same job even on SQLite; Postgres and MySQL also skip
+    rows another worker has locked. Jobs that exhaust their attempts stay in the table
+    with ``failed`` set, for inspection. Built without an engine, the backend uses the
+    app's database and can insert through a request's session (see :func:`enqueue`).
+    """
+
+    metadata = MetaData()
+    table = Table(
+        "pmvc_jobs",
+        metadata,
+        Column("id", String(32), primary_key=True),
+        Column("path", String(255), nullable=False),
+        Column("payload", LargeBinary, nullable=False),
+        Column("priority", Integer, nullable=False, default=0),
+        Column("run_at", Float, nullable=False),
+        Column("attempts", Integer, nullable=False, default=0),
+        Column("max_attempts", Integer, nullable=False),
+        Column("locked_until", Float, nullable=True),
+        Column("lock_token", String(32), nullable=True),
+        Column("failed", Integer, nullable=False, default=0),
+        Column("last_error", Text, nullable=True),
+        Index("ix_pmvc_jobs_due", "failed", "run_at"),
+    )
+
+    def __init__(self, engine: Optional[Engine] = None) -> None:
+        self._engine = engine
+        self._created = False
+        self.uses_app_database = engine is None
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from .model import BaseModel
+
+            self._engine = BaseModel.engine()
+        if not self._created:
+            self.metadata.create_all(self._engine, checkfirst=True)
+            self._created = True
+        return self._engine
+
+    async def push(self, job: Job, session: Optional[AsyncSession] = None) -> None:
+        """Insert ``job``; with ``session``, inside that session's transaction."""
+        if session is None:
+            await _in_thread(self._push, job)
+            return
+        if not self._created:
+            await session.run_sync(lambda sync: self.metadata.create_all(sync.connection(), checkfirst=True))
+            self._created = True
+        await session.execute(self.table.insert().values(**self._values(job)))
+
+    async def reserve(self, limit: int, visibility_timeout: float) -> List[Job]:
+        return await _in_thread(self._reserve, limit, visibility_timeout)
+
+    async def acknowledge(self, completed: Sequence[Job], retried: Sequence[Job], failed: Sequence[Job]) -> None:
+        """Settle finished jobs in one transaction: delete, reschedule or mark failed."""
+        await _in_thread(self._acknowledge, completed, retried, failed)
+
+    async def size(self) -> int:
+        def count() -> int:
+            with self.engine.connect() as connection:
+                return connection.execute(select(func.count()).where(self.table.c.failed == 0)).scalar_one()
+
+        return await _in_thread(count)
+
+    def _push(self, job: Job) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(self.table.insert().values(**self._values(job)))
+
+    def _values(self, job: Job) -> Dict[str, Any]:
+        return {
+            "id": job.id,
+            "path": job.path,
+            "payload": job.payload(),
+            "priority": job.priority,
+            "run_at": job.run_at,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "failed": 0,
+        }
+
+    def _reserve(self, limit: int, visibility_timeout: float) -> List[Job]:
+        table = self.table
+        now = time.time()
+        token = uuid.uuid4().hex
+        available = (table.c.failed == 0) & (table.c.run_at <= now) & (
+            table.c.locked_until.is_(None) | (table.c.locked_until <= now)
+        )
+        with self.engine.begin() as connection:
+            candidates = (
+                select(table.c.id)
+                .where(available)
+                .order_by(table.c.priority.desc(), table.c.run_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            ids = connection.execute(candidates).scalars().all()
+            if not ids:
+                return []
+            connection.execute(
+                update(table).where(table.c.id.in_(ids), available).values(locked_until=now + visibility_timeout, lock_token=token)
+            )
+            rows = connection.execute(
+                select(table).where(table.c.lock_token == token).order_by(table.c.priority.desc(), table.c.run_at)
+            ).all()
+        jobs = []
+        for row in rows:
+            args, kwargs = pickle.loads(row.payload)
+            jobs.append(
+                Job(
+                    row.path,
+                    args,
+                    kwargs,
+                    priority=row.priority,
+                    run_at=row.run_at,
+                    max_attempts=row.max_attempts,
+                    id=row.id,
+                    attempts=row.attempts,
+                    last_error=row.last_error,
+                )
+            )
+        return jobs
+
+    def _acknowledge(self, completed: Sequence[Job], retried: Sequence[Job], failed: Sequence[Job]) -> None:
+        table = self.table
+        settle = (
+            update(table)
+            .where(table.c.id == bindparam("job_id"))
+            .values(
+                run_at=bindparam("next_run_at"),
+                attempts=bindparam("job_attempts"),
+                failed=bindparam("job_failed"),
+                last_error=bindparam("job_error"),
+                locked_until=None,
+                lock_token=None,
+            )
+        )
+        settled = [
+            {
+                "job_id": job.id,
+                "next_run_at": job.run_at,
+                "job_attempts": job.attempts,
+                "job_failed": dead,
+                "job_error": job.last_error,
+            }
+            for jobs, dead in ((retried, 0), (failed, 1))
+            for job in jobs
+        ]
+        with self.engine.begin() as connection:
+            if completed:
+                connection.execute(delete(table).where(table.c.id.in_([job.id for job in completed])))
+            if settled:
+                connection.execute(settle, settled)
+
+
+# Pops up to ARGV[2] due jobs, highest priority first, and hides each one until
+# ARGV[1] + ARGV[3] by pushing its score forward: the visibility timeout.
+_RESERVE_SCRIPT = """
+local reserved = {}
+local limit = tonumber(ARGV[2])
+local leased = tonumber(ARGV[1]) + tonumber(ARGV[3])
+for _, priority in ipairs(redis.call('ZREVRANGEBYSCORE', KEYS[1], '+inf', '-inf')) do
+    local queue = ARGV[4] .. priority
+    local ids = redis.call('ZRANGEBYSCORE', queue, '-inf', ARGV[1], 'LIMIT', 0, limit - #reserved)
+    for _, id in ipairs(ids) do
+        redis.call('ZADD', queue, leased, id)
+        table.insert(reserved, id)
+    end
+    if #reserved >= limit then break end
+end
+return reserved
+"""
+
+
+class RedisJobBackend:
+    """Jobs in the Redis behind a :class:`~PythonMVC.cache.Cache`.
+
+    Each priority has a sorted set scored by run time; a Lua script reserves a batch
+    atomically across them. Jobs that exhaust their attempts move to a capped
+    ``failed`` list.
+    """
+
+    PREFIX = "pmvc:jobs:"
+    FAILED_KEEP = 1000
+
+    def __init__(self, cache: Optional[Cache] = None) -> None:
+        self.cache = cache or Cache()
+        self._script: Any = None
+
+    async def push(self, job: Job) -> None:
+        client = await self.cache.client()
+        pipeline = client.pipeline(transaction=True)
+        pipeline.set(self._data_key(job.id), pickle.dumps(job, pickle.HIGHEST_PROTOCOL))
+        pipeline.zadd(self.PREFIX + "priorities", {str(job.priority): job.priority})
+        pipeline.zadd(self._queue_key(job.priority), {job.id: job.run_at})
+        await pipeline.execute()
+
+    async def reserve(self, limit: int, visibility_timeout: float) -> List[Job]:
+        client = await self.cache.client()
+        if self._script is None:
+            self._script = client.register_script(_RESERVE_SCRIPT)
+        ids = await self._script(
+            keys=[self.PREFIX + "priorities"],
+            args=[time.time(), limit, visibility_timeout, self.PREFIX + "queue:"],
+        )
+        if not ids:
+            return []
+        blobs = await client.mget([self._data_key(_text(job_id)) for job_id in ids])
+        return [pickle.loads(blob) for blob in blobs if blob is not None]
+
+    async def acknowledge(self, completed: Sequence[Job], retried: Sequence[Job], failed: Sequence[Job]) -> None:
+        """Settle finished jobs in one pipelined transaction."""
+        client = await self.cache.client()
+        pipeline = client.pipeline(transaction=True)
+        for job in [*completed, *failed]:
+            pipeline.zrem(self._queue_key(job.priority), job.id)
+            pipeline.delete(self._data_key(job.id))
+        for job in retried:
+            pipeline.set(self._data_key(job.id), pickle.dumps(job, pickle.HIGHEST_PROTOCOL))
+            pipeline.zadd(self._queue_key(job.priority), {job.id: job.run_at})
+        if failed:
+            pipeline.lpush(self.PREFIX + "failed", *[pickle.dumps(job, pickle.HIGHEST_PROTOCOL) for job in failed])
+            pipeline.ltrim(self.PREFIX + "failed", 0, self.FAILED_KEEP - 1)
+        await pipeline.execute()
+
+    async def size(self) -> int:
+        client = await self.cache.client()
+        priorities = await client.zrange(self.PREFIX + "priorities", 0, -1)
+        return sum([await client.zcard(self.PREFIX + "queue:" + _text(priority)) for priority in priorities])
+
+    def _queue_key(self, priority: int) -> str:
+        return f"{self.PREFIX}queue:{priority}"
+
+    def _data_key(self, job_id: str) -> str:
+        return f"{self.PREFIX}job:{job_id}"
+
+
+JobBackend = Union[DatabaseJobBackend, RedisJobBackend]
+
+
+def configure(settings: Any) -> None:
+    """Read ``JOBS`` (keys of :data:`DEFAULT_JOBS_CONFIG`) and ``CACHE_URL``."""
+    global _backend, _cache_url
+    options = getattr(settings, "JOBS", None) or {}
+    unknown = set(options) - set(DEFAULT_JOBS_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown JOBS option(s): {', '.join(sorted(unknown))}")
+    _config.clear()
+    _config.update(DEFAULT_JOBS_CONFIG)
+    _config.update(options)
+    _cache_url = getattr(settings, "CACHE_URL", None)
+    _backend = None
+
+
+def config() -> Dict[str, Any]:
+    return dict(_config)
+
+
+def backend() -> JobBackend:
+    """The configured backend, built on first use."""
+    global _backend
+    if _backend is None:
+        kind = _config["backend"]
+        if kind == "redis":
+            _backend = RedisJobBackend(Cache(_cache_url))
+        elif kind == "database":
+            _backend = DatabaseJobBackend()
+        else:
+            raise ValueError(f"Unknown JOBS backend {kind!r}; use 'database' or 'redis'")
+    return _backend
+
+
+async def enqueue(
+    fn: Union[Callable[..., Any], str],
+    *args: Any,
+    delay: float = 0.0,
+    priority: int = 0,
+    max_attempts: Optional[int] = None,
+    **kwargs: Any,
+) -> str:
+    """Queue ``fn(*args, **kwargs)`` for a worker and return the job id.
+
+    ``fn`` must be importable by its module and qualified name (a module-level function
+    or a static/class method), or be given as ``"module:qualname"``. Arguments are
+    pickled. Higher ``priority`` runs first; ``delay`` postpones the first attempt.
+
+    Inside a request whose ``request.state.db`` session is open, the job belongs to that
+    transaction: the database backend inserts it through the session, other backends
+    push it after the commit, and a rollback drops it. Workers therefore never see a job
+    before the rows it refers to, and SQLite never waits on the request's write lock.
+    """
+    job = Job(
+        function_path(fn),
+        args,
+        kwargs,
+        priority=priority,
+        run_at=time.time() + delay,
+        max_attempts=max_attempts or _config["max_attempts"],
+    )
+    queue = backend()
+    request = current_session()
+    if request is not None and request.opened:
+        if isinstance(queue, DatabaseJobBackend) and queue.uses_app_database:
+            await queue.push(job, session=request.session)
+        else:
+            request.after_commit(lambda: queue.push(job))
+        return job.id
+    await queue.push(job)
+    return job.id
+
+
+def function_path(fn: Union[Callable[..., Any], str]) -> str:
+    if isinstance(fn, str):
+        return fn
+    qualname = getattr(fn, "__qualname__", "")
+    if not qualname or "<" in qualname:
+        raise ValueError(f"{fn!r} cannot be imported by a worker; use a module-level function")
+    return f"{fn.__module__}:{qualname}"
+
+
+def resolve(path: str) -> Callable[..., Any]:
+    module_name, _, qualname = path.partition(":")
+    target: Any = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def backoff(attempts: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter in its upper half, so retries spread out."""
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class Worker:
+    """Reserve batches of due jobs and run up to ``concurrency`` of them at once.
+
+    Finished jobs are acknowledged in bulk on the next trip to the queue rather than one
+    write each, so a worker that crashes may run a handful of jobs twice (delivery is
+    at-least-once either way: a job outliving its visibility timeout is handed out again).
+    """
+
+    def __init__(self, backend: Optional[JobBackend] = None, **options: Any) -> None:
+        unknown = set(options) - set(DEFAULT_JOBS_CONFIG)
+        if unknown:
+            raise TypeError(f"Unknown Worker option(s): {', '.join(sorted(unknown))}")
+        self.backend = backend
+        self.options = {**_config, **options}
+        self.processed = 0
+        self.failed = 0
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._executor: Optional[Executor] = None
+        self._completed: List[Job] = []
+        self._retried: List[Job] = []
+        self._dead: List[Job] = []
+
+    def stop(self) -> None:
+        """Finish the jobs in hand, then return from :meth:`run`."""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self, burst: bool = False) -> None:
+        """Work until :meth:`stop` (or, with ``burst``, until nothing is due)."""
+        if self.backend is None:
+            self.backend = backend()
+        concurrency = max(1, int(self.options["concurrency"]))
+        batch_size = max(1, min(concurrency, int(self.options["batch_size"])))
+        if self.options["pool"] == "process":
+            self._executor = ProcessPoolExecutor(concurrency)
+        else:
+            self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix="pmvc-job")
+        self._wakeup = asyncio.Event()
+        slots = asyncio.Semaphore(concurrency)
+        running: Set["asyncio.Future[None]"] = set()
+        try:
+            while not self._stopping:
+                await slots.acquire()
+                free = 1
+                while free < batch_size and not slots.locked():
+                    await slots.acquire()
+                    free += 1
+                await self._acknowledge()
+                jobs = await self.backend.reserve(free, self.options["visibility_timeout"])
+                for _ in range(free - len(jobs)):
+                    slots.release()
+                for job in jobs:
+                    task = asyncio.ensure_future(self._run(job))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                    task.add_done_callback(lambda _: slots.release())
+                if not jobs:
+                    if burst and not running:
+                        break
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.options["poll_interval"])
+                    except asyncio.TimeoutError:
+                        pass
+            if running:
+                await asyncio.gather(*running)
+            await self._acknowledge()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._wakeup = None
+
+    async def _acknowledge(self) -> None:
+        if self._completed or self._retried or self._dead:
+            settled = self._completed, self._retried, self._dead
+            self._completed, self._retried, self._dead = [], [], []
+            await self.backend.acknowledge(*settled)
+
+    async def _run(self, job: Job) -> None:
+        job.attempts += 1
+        started = time.perf_counter()
+        try:
+            await self._call(job)
+        except Exception as exc:
+            job.last_error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+            if job.attempts >= job.max_attempts:
+                self.failed += 1
+                logger.error("Job %s failed for good after %d attempts: %s", job.path, job.attempts, job.last_error)
+                self._dead.append(job)
+            else:
+                job.run_at = time.time() + backoff(job.attempts, self.options["backoff"], self.options["max_backoff"])
+                logger.warning("Job %s failed (attempt %d), retrying: %s", job.path, job.attempts, job.last_error)
+                self._retried.append(job)
+            return
+        self.processed += 1
+        logger.info("Job %s done in %.1f ms", job.path, (time.perf_counter() - started) * 1000)
+        self._completed.append(job)
+
+    async def _call(self, job: Job) -> Any:
+        loop = asyncio.get_running_loop()
+        if self.options["pool"] == "process":
+            return await loop.run_in_executor(self._executor, _call_in_process, job.path, job.args, job.kwargs)
+        fn = resolve(job.path)
+        if inspect.iscoroutinefunction(fn):
+            return await fn(*job.args, **job.kwargs)
+        return await loop.run_in_executor(self._executor, lambda: fn(*job.args, **job.kwargs))
+
+
+def _call_in_process(path: str, args: Sequence[Any], kwargs: Dict[str, Any]) -> Any:
+    fn = resolve(path)
+    result = fn(*args, **kwargs)
+    if inspect.isawaitable(result):
+        result = asyncio.run(result)
+    return result
+
+
+async def _in_thread(fn: Callable[..., Any], *args: Any) -> Any:
+    # asyncio.to_thread needs Python 3.9.
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args))
+
+
+def _text(value: Union[str, bytes]) -> str:
+    return value.decode() if isinstance(value, bytes) else value
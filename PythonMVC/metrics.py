@@ -0,0 +1,405 @@
+"""Per-route request metrics exposed in the Prometheus text format."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import time
+import uuid
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+try:  # POSIX only; without it exited workers are folded without cross-process locking
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no pre-forking server anyway
+    fcntl = None  # type: ignore[assignment]
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import BaseRoute, Match, Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DEFAULT_METRICS_CONFIG = {
+    "path": "/metrics",
+    "buckets": DEFAULT_BUCKETS,
+    # Set (or export PMVC_METRICS_DIR) when several worker processes serve the app.
+    "multiprocess_dir": None,
+    "flush_interval": 1.0,
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED = "unmatched"
+# In multiprocess_dir: the summed counters of every worker that has exited.
+EXITED_FILE = "exited.json"
+LOCK_FILE = ".lock"
+# Scope key for the route MetricsMiddleware matched itself, on Starlette releases whose
+# router does not record ``scope["route"]``.
+RESOLVED_ROUTE_KEY = "pmvc_metrics_route"
+
+
+class RouteStats:
+    """Counters for one route: a fixed-bucket latency histogram and status classes."""
+
+    __slots__ = ("counts", "sum", "statuses")
+
+    def __init__(self, bucket_count: int) -> None:
+        # One slot per bucket plus the +Inf overflow; cumulated only when rendering.
+        self.counts = [0] * (bucket_count + 1)
+        self.sum = 0.0
+        self.statuses: Dict[str, int] = {}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts, "sum": self.sum, "statuses": self.statuses}
+
+
+class MetricsRegistry:
+    """Request metrics for one process, optionally merged with its sibling workers.
+
+    Everything is recorded from the event loop thread by :class:`MetricsMiddleware`, so
+    plain increments are safe and no lock is taken per request. In multiprocess mode
+    each worker writes its snapshot to ``<multiprocess_dir>/<pid>.json`` at most once
+    per ``flush_interval`` and once more at lifespan shutdown; a scrape merges every
+    file. A scrape that finds a worker gone folds its counters into ``exited.json`` and
+    deletes its file, so totals never go backwards while the directory stays one file
+    per live worker; in-flight gauges of exited workers are dropped.
+    """
+
+    def __init__(
+        self,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        multiprocess_dir: Optional[str] = None,
+        flush_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.multiprocess_dir = Path(multiprocess_dir) if multiprocess_dir else None
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.routes: Dict[str, RouteStats] = {}
+        self._active: Dict[int, Scope] = {}
+        self._last_flush = 0.0
+        # Identifies this process's file, so a recycled pid never overwrites a dead worker's.
+        self._instance = ""
+        self._instance_pid = 0
+        if self.multiprocess_dir:
+            self.multiprocess_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: Optional[dict] = None) -> "MetricsRegistry":
+        merged = {**DEFAULT_METRICS_CONFIG, **(config or {})}
+        return cls(
+            buckets=merged["buckets"],
+            multiprocess_dir=merged["multiprocess_dir"] or os.getenv("PMVC_METRICS_DIR"),
+            flush_interval=merged["flush_interval"],
+        )
+
+    def start(self, scope: Scope) -> None:
+        # The route is resolved lazily: in-flight requests are grouped when scraped.
+        self._active[id(scope)] = scope
+
+    def finish(self, scope: Scope, status: int, seconds: float) -> None:
+        self._active.pop(id(scope), None)
+        name = route_name(scope)
+        stats = self.routes.get(name)
+        if stats is None:
+            stats = self.routes[name] = RouteStats(len(self.buckets))
+        stats.counts[bisect_left(self.buckets, seconds)] += 1
+        stats.sum += seconds
+        status_class = f"{status // 100}xx"
+        stats.statuses[status_class] = stats.statuses.get(status_class, 0) + 1
+        if self.multiprocess_dir and self.clock() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        in_flight: Dict[str, int] = {}
+        for scope in list(self._active.values()):
+            name = route_name(scope)
+            in_flight[name] = in_flight.get(name, 0) + 1
+        if self._instance_pid != os.getpid():  # first call, or a forked child
+            self._instance, self._instance_pid = uuid.uuid4().hex, os.getpid()
+        return {
+            "pid": os.getpid(),
+            "instance": self._instance,
+            "buckets": list(self.buckets),
+            "routes": {name: stats.as_dict() for name, stats in self.routes.items()},
+            "in_flight": in_flight,
+        }
+
+    def flush(self) -> None:
+        """Publish this worker's snapshot for the other workers' scrapes."""
+        if not self.multiprocess_dir:
+            return
+        self._last_flush = self.clock()
+        snapshot = self.snapshot()
+        target = self.multiprocess_dir / f"{snapshot['pid']}.json"
+        previous = _read(target)
+        if previous is not None and previous.get("instance") != snapshot["instance"]:
+            # Our pid used to belong to a worker that has exited: keep its counters.
+            self.fold_exited([target])
+        temporary = target.with_suffix(".tmp")
+        temporary.write_text(json.dumps(snapshot))
+        os.replace(temporary, target)
+
+    def fold_exited(self, paths: Iterable[Path]) -> None:
+        """Add exited workers' snapshots into ``exited.json`` and delete their files."""
+        assert self.multiprocess_dir is not None
+        with _locked(self.multiprocess_dir / LOCK_FILE):
+            aggregate = _read(self.multiprocess_dir / EXITED_FILE)
+            if aggregate is None or aggregate.get("buckets") != list(self.buckets):
+                aggregate = {"pid": 0, "buckets": list(self.buckets), "routes": {}, "in_flight": {}}
+            folded = []
+            for path in paths:
+                snapshot = _read(path)
+                if snapshot is None:
+                    continue  # another worker folded it first
+                if snapshot.get("buckets") == aggregate["buckets"]:
+                    _add_routes(aggregate["routes"], snapshot["routes"])
+                folded.append(path)
+            if not folded:
+                return
+            target = self.multiprocess_dir / EXITED_FILE
+            temporary = target.with_suffix(".tmp")
+            temporary.write_text(json.dumps(aggregate))
+            os.replace(temporary, target)
+            for path in folded:
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Snapshots for this process and, in multiprocess mode, every other worker."""
+        own = self.snapshot()
+        if not self.multiprocess_dir:
+            return [own]
+        self.flush()
+        snapshots = [own]
+        exited = []
+        for path in self.multiprocess_dir.glob("*.json"):
+            if path.stem == str(own["pid"]) or path.name == EXITED_FILE:
+                continue
+            snapshot = _read(path)
+            if snapshot is None or snapshot.get("buckets") != own["buckets"]:
+                continue
+            if _alive(snapshot["pid"]):
+                snapshots.append(snapshot)
+            else:
+                exited.append(path)
+        if exited:
+            self.fold_exited(exited)
+        aggregate = _read(self.multiprocess_dir / EXITED_FILE)
+        if aggregate is not None and aggregate.get("buckets") == own["buckets"]:
+            snapshots.append(aggregate)
+        return snapshots
+
+    def render(self, extra: Iterable[str] = ()) -> str:
+        return render(self.buckets, self.collect(), extra)
+
+
+class MetricsMiddleware:
+    """Time every HTTP request and attribute it to the route Starlette matched.
+
+    Given the Starlette ``application``, the route is also matched here before dispatch,
+    for releases whose router does not set ``scope["route"]``; once a request comes back
+    with it set, that lookup stops.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry, application: Any = None) -> None:
+        self.app = app
+        self.registry = registry
+        self.application = application
+        self._resolve = application is not None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.app(scope, receive, self._flushing_on_shutdown(send))
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        if self._resolve:
+            scope[RESOLVED_ROUTE_KEY] = resolve_route(self.application.router.routes, scope)
+        self.registry.start(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.registry.finish(scope, status, time.perf_counter() - started)
+            if "route" in scope:
+                self._resolve = False
+
+    def _flushing_on_shutdown(self, send: Send) -> Send:
+        # The server shuts the lifespan down after its connections have closed, so this
+        # last flush holds every request the worker served (recycled workers included).
+        async def send_after_flush(message: Message) -> None:
+            if message["type"] in ("lifespan.shutdown.complete", "lifespan.shutdown.failed"):
+                self.registry.flush()
+            await send(message)
+
+        return send_after_flush
+
+
+def route_name(scope: Scope) -> str:
+    route = scope.get("route") or scope.get(RESOLVED_ROUTE_KEY)
+    if route is None:
+        return UNMATCHED
+    return getattr(route, "name", None) or getattr(route, "path", None) or UNMATCHED
+
+
+def resolve_route(routes: Sequence[BaseRoute], scope: Scope) -> Optional[BaseRoute]:
+    """The route Starlette's router would dispatch ``scope`` to, innermost for mounts."""
+    partial = None
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            inner = getattr(route, "routes", None)
+            if inner:
+                return resolve_route(inner, {**scope, **child_scope}) or route
+            return route
+        if match == Match.PARTIAL and partial is None:
+            partial = route
+    return partial
+
+
+def render(buckets: Sequence[float], snapshots: List[Dict[str, Any]], extra: Iterable[str] = ()) -> str:
+    """Merge per-process snapshots and format them as Prometheus text."""
+    counts: Dict[str, List[int]] = {}
+    sums: Dict[str, float] = {}
+    statuses: Dict[tuple, int] = {}
+    in_flight: Dict[str, int] = {}
+    for snapshot in snapshots:
+        for name, stats in snapshot["routes"].items():
+            merged = counts.setdefault(name, [0] * (len(buckets) + 1))
+            for index, value in enumerate(stats["counts"]):
+                merged[index] += value
+            sums[name] = sums.get(name, 0.0) + stats["sum"]
+            for status_class, value in stats["statuses"].items():
+                statuses[(name, status_class)] = statuses.get((name, status_class), 0) + value
+        for name, value in snapshot["in_flight"].items():
+            in_flight[name] = in_flight.get(name, 0) + value
+
+    lines = [
+        "# HELP pmvc_http_requests_total HTTP requests by route and status class.",
+        "# TYPE pmvc_http_requests_total counter",
+    ]
+    for (name, status_class), value in sorted(statuses.items()):
+        lines.append(f'pmvc_http_requests_total{{route="{_escape(name)}",status="{status_class}"}} {value}')
+
+    lines += [
+        "# HELP pmvc_http_request_duration_seconds HTTP request latency by route.",
+        "# TYPE pmvc_http_request_duration_seconds histogram",
+    ]
+    bounds = [_format_bound(bound) for bound in buckets] + ["+Inf"]
+    for name in sorted(counts):
+        label = _escape(name)
+        cumulative = 0
+        for bound, value in zip(bounds, counts[name]):
+            cumulative += value
+            lines.append(f'pmvc_http_request_duration_seconds_bucket{{route="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'pmvc_http_request_duration_seconds_sum{{route="{label}"}} {sums[name]}')
+        lines.append(f'pmvc_http_request_duration_seconds_count{{route="{label}"}} {cumulative}')
+
+    lines += [
+        "# HELP pmvc_http_requests_in_flight HTTP requests currently being served.",
+        "# TYPE pmvc_http_requests_in_flight gauge",
+    ]
+    for name in sorted(in_flight):
+        lines.append(f'pmvc_http_requests_in_flight{{route="{_escape(name)}"}} {in_flight[name]}')
+
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
+
+
+def pool_lines(stats: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Connection pool figures from :func:`PythonMVC.model.pool_metrics` (this process)."""
+    metrics = (
+        ("checkouts", "pmvc_db_pool_checkouts_total", "counter", "Connections checked out of the pool."),
+        ("timeouts", "pmvc_db_pool_timeouts_total", "counter", "Checkouts that timed out waiting."),
+        ("wait_seconds_total", "pmvc_db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection."),
+        ("checked_out", "pmvc_db_pool_checked_out", "gauge", "Connections currently in use."),
+        ("capacity", "pmvc_db_pool_capacity", "gauge", "Pool size plus max overflow (absent when unbounded)."),
+    )
+    lines: List[str] = []
+    for key, metric, kind, description in metrics:
+        samples = [(engine, values[key]) for engine, values in sorted(stats.items()) if values.get(key) is not None]
+        if not samples:
+            continue
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{engine="{engine}",pid="{os.getpid()}"}} {value}' for engine, value in samples]
+    return lines
+
+
+def mount_metrics(app: Any, config: Optional[dict] = None) -> MetricsRegistry:
+    """Record request metrics for ``app`` and serve them at ``config["path"]``.
+
+    Call after the other middleware is added so the timing covers the whole stack.
+    """
+    from .model import pool_metrics
+
+    registry = MetricsRegistry.from_config(config)
+    path = {**DEFAULT_METRICS_CONFIG, **(config or {})}["path"]
+
+    async def metrics(_: Request) -> Response:
+        return Response(registry.render(pool_lines(pool_metrics())), media_type=CONTENT_TYPE)
+
+    app.router.routes.append(Route(path, metrics, methods=["GET"], name="metrics"))
+    app.add_middleware(MetricsMiddleware, registry=registry, application=app)
+    app.state.metrics = registry
+    return registry
+
+
+def _read(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _add_routes(total: Dict[str, Any], routes: Dict[str, Any]) -> None:
+    for name, stats in routes.items():
+        merged = total.setdefault(name, {"counts": [0] * len(stats["counts"]), "sum": 0.0, "statuses": {}})
+        merged["counts"] = [a + b for a, b in zip(merged["counts"], stats["counts"])]
+        merged["sum"] += stats["sum"]
+        for status_class, value in stats["statuses"].items():
+            merged["statuses"][status_class] = merged["statuses"].get(status_class, 0) + value
+
+
+@contextlib.contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    with open(path, "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # pragma: no cover - exists, owned by someone else
+        return True
+    return True
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -3,14 +3,52 @@
 from __future__ import annotations
 
 import os
-from typing import Optional
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
-from sqlalchemy import DateTime, create_engine, func
-from sqlalchemy.engine import Engine
+from sqlalchemy import DateTime, create_engine, func, insert, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.sql import ColumnElement, Select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from . import query_cache, replicas
+from .pool import PoolMetrics, instrumented_pool_class
+
+DEFAULT_DATABASE_URL = "sqlite:///db/app.db"
+
+# keyset_page(): rows per page by default, and the most a client may ask for.
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Async drivers used when DATABASE_URL names a sync dialect/driver.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+asyncmy",
+    "mariadb": "mariadb+asyncmy",
+}
+
+# `DATABASE_POOL` keys mapped to create_engine() arguments.
+POOL_OPTIONS = {
+    "size": "pool_size",
+    "max_overflow": "max_overflow",
+    "timeout": "pool_timeout",
+    "recycle": "pool_recycle",
+    "pre_ping": "pool_pre_ping",
+}
+QUEUE_POOL_OPTIONS = {"pool_size", "max_overflow", "pool_timeout"}
 
 _engine: Engine | None = None
 _SessionFactory: sessionmaker[Session] | None = None
+_async_engine: AsyncEngine | None = None
+_AsyncSessionFactory: async_sessionmaker[AsyncSession] | None = None
+_replica_set: replicas.ReplicaSet | None = None
+_async_replica_set: replicas.ReplicaSet | None = None
+_database_url: Optional[str] = None
+_pool_options: Dict[str, Any] = {}
+_pool_metrics: Dict[str, PoolMetrics] = {}
 
 
 class Base(DeclarativeBase):
@@ -36,19 +74,323 @@ class BaseModel(Base):
     def engine(cls) -> Engine:
         global _engine
         if _engine is None:
-            url = os.getenv("DATABASE_URL", "sqlite:///db/app.db")
-            _engine = create_engine(url, echo=False, future=True)
+            url = database_url()
+            _engine = create_engine(url, echo=False, future=True, **_engine_options(url, "sync"))
         return _engine
 
+    @classmethod
+    def async_engine(cls) -> AsyncEngine:
+        global _async_engine
+        if _async_engine is None:
+            url = os.getenv("DATABASE_ASYNC_URL") or async_database_url(database_url())
+            _async_engine = create_async_engine(url, echo=False, **_engine_options(url, "async"))
+        return _async_engine
+
+    @classmethod
+    def replica_set(cls) -> Optional[replicas.ReplicaSet]:
+        """Engines for ``DATABASE_REPLICA_URLS``, or None when no replica is configured."""
+        global _replica_set
+        if _replica_set is None and replicas.urls():
+            engines = [
+                (create_engine(url, echo=False, future=True, **_engine_options(url, f"replica{number}")), weight)
+                for number, (url, weight) in enumerate(replicas.urls())
+            ]
+            _replica_set = replicas.ReplicaSet(engines, retry_after=replicas.retry_after())
+        return _replica_set
+
+    @classmethod
+    def async_replica_set(cls) -> Optional[replicas.ReplicaSet]:
+        global _async_replica_set
+        if _async_replica_set is None and replicas.urls():
+            engines = []
+            for number, (url, weight) in enumerate(replicas.urls()):
+                url = async_database_url(url)
+                engine = create_async_engine(url, echo=False, **_engine_options(url, f"async_replica{number}"))
+                engines.append((engine.sync_engine, weight))
+            _async_replica_set = replicas.ReplicaSet(engines, retry_after=replicas.retry_after())
+        return _async_replica_set
+
     @classmethod
     def create_all(cls) -> None:
         cls.metadata.create_all(cls.engine())
 
+    @classmethod
+    def bulk_insert(cls, rows: Iterable[Mapping[str, Any]], batch_size: int = 1000) -> int:
+        """Insert plain dicts in executemany batches, one transaction per batch.
+
+        Skips the ORM unit of work entirely; returns the number of rows written.
+        """
+        return _execute_batches(cls.engine(), insert(cls.__table__), rows, batch_size)
+
+    @classmethod
+    def upsert(
+        cls,
+        rows: Iterable[Mapping[str, Any]],
+        conflict_cols: Sequence[str],
+        update_cols: Optional[Sequence[str]] = None,
+        batch_size: int = 1000,
+    ) -> int:
+        """Insert rows, updating ``update_cols`` where ``conflict_cols`` already exist.
+
+        Uses ``ON CONFLICT (conflict_cols) DO UPDATE`` on Postgres/SQLite. MySQL/MariaDB
+        have no conflict target: ``ON DUPLICATE KEY UPDATE`` fires on a clash with *any*
+        unique key or the primary key, so there ``conflict_cols`` only decides the default
+        ``update_cols``; make sure the row cannot collide on another unique key. Other
+        dialects raise ``ValueError``. ``update_cols`` defaults to every other column
+        except the key and ``created_at``.
+        """
+        if not conflict_cols:
+            raise ValueError("upsert needs at least one conflict column")
+        table = cls.__table__
+        if update_cols is None:
+            skip = set(conflict_cols) | {column.name for column in table.primary_key} | {"created_at"}
+            update_cols = [column.name for column in table.columns if column.name not in skip]
+
+        engine = cls.engine()
+        dialect = engine.dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            base = dialect_insert(table)
+            changes = {name: base.excluded[name] for name in update_cols}
+            if changes and "updated_at" in table.c and "updated_at" not in changes:
+                changes["updated_at"] = func.now()
+            statement = (
+                base.on_conflict_do_update(index_elements=list(conflict_cols), set_=changes)
+                if changes
+                else base.on_conflict_do_nothing(index_elements=list(conflict_cols))
+            )
+        elif dialect in ("mysql", "mariadb"):
+            from sqlalchemy.dialects.mysql import insert as dialect_insert
+
+            base = dialect_insert(table)
+            # With nothing to update, re-assigning a conflict column keeps the existing row.
+            key = conflict_cols[0]
+            changes = {name: base.inserted[name] for name in update_cols} or {key: base.inserted[key]}
+            if "updated_at" in table.c and "updated_at" not in changes:
+                changes["updated_at"] = func.now()
+            statement = base.on_duplicate_key_update(changes)
+        else:
+            raise ValueError(f"upsert is not supported for the {dialect!r} dialect")
+
+        return _execute_batches(engine, statement, rows, batch_size)
+
+    @classmethod
+    def iter_batches(
+        cls,
+        where: Optional[ColumnElement[bool]] = None,
+        size: int = 1000,
+    ) -> Iterator[List[Any]]:
+        """Walk the table in primary-key order, ``size`` instances per batch.
+
+        Each batch is fetched with a keyset predicate (``id > last_id``) and the session
+        is cleared between batches, so memory stays flat however large the table is.
+        """
+        last_id: Optional[int] = None
+        with db_session() as session:
+            while True:
+                statement = select(cls).order_by(cls.id).limit(size).execution_options(yield_per=size)
+                if where is not None:
+                    statement = statement.where(where)
+                if last_id is not None:
+                    statement = statement.where(cls.id > last_id)
+                batch = list(session.scalars(statement))
+                if not batch:
+                    return
+                last_id = batch[-1].id
+                yield batch
+                session.expunge_all()
+                if len(batch) < size:
+                    return
+
+
+def configure(settings: Any) -> None:
+    """Read ``DATABASE_URL`` and ``DATABASE_POOL`` from the app settings.
+
+    ``DATABASE_POOL`` accepts ``size``, ``max_overflow``, ``timeout``, ``recycle`` and
+    ``pre_ping``. The ``DATABASE_URL`` environment variable still takes precedence so
+    deployments can point a shared settings module at another database.
+    """
+    global _database_url, _pool_options
+    pool: Mapping[str, Any] = getattr(settings, "DATABASE_POOL", None) or {}
+    unknown = set(pool) - set(POOL_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown DATABASE_POOL option(s): {', '.join(sorted(unknown))}")
+    _database_url = getattr(settings, "DATABASE_URL", None)
+    _pool_options = {POOL_OPTIONS[key]: value for key, value in pool.items()}
+    dispose_engines()
+
+
+def database_url() -> str:
+    return os.getenv("DATABASE_URL") or _database_url or DEFAULT_DATABASE_URL
+
+
+def dispose_engines(close: bool = True) -> None:
+    """Drop the configured engines so the next call rebuilds them with fresh pools.
+
+    Pass ``close=False`` in a forked child: the pooled connections belong to the parent,
+    so they are abandoned rather than closed (closing would end the parent's sessions).
+    """
+    global _engine, _SessionFactory, _async_engine, _AsyncSessionFactory, _replica_set, _async_replica_set
+    if _engine is not None:
+        _engine.dispose(close=close)
+    if _replica_set is not None:
+        _replica_set.dispose(close=close)
+    # Closing asyncio connections needs a running loop; let them be garbage collected.
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+    if _async_replica_set is not None:
+        _async_replica_set.dispose(close=False)
+    _engine = _SessionFactory = _async_engine = _AsyncSessionFactory = None
+    _replica_set = _async_replica_set = None
+
+
+def _after_fork_in_child() -> None:
+    dispose_engines(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    # Pre-forked workers (`pmvc server --preload`, multiprocessing) never share sockets.
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Checkout wait and saturation figures for each engine created so far."""
+    engines = {"sync": _engine, "async": _async_engine.sync_engine if _async_engine else None}
+    for prefix, replica_set in (("replica", _replica_set), ("async_replica", _async_replica_set)):
+        for number, replica in enumerate(replica_set.replicas if replica_set else ()):
+            engines[f"{prefix}{number}"] = replica.engine
+    return {
+        name: _pool_metrics[name].snapshot(engine.pool)
+        for name, engine in engines.items()
+        if engine is not None and name in _pool_metrics
+    }
+
+
+def _engine_options(url: str, name: str) -> Dict[str, Any]:
+    metrics = _pool_metrics[name] = PoolMetrics()
+    poolclass = instrumented_pool_class(url, metrics)
+    options: Dict[str, Any] = {"poolclass": poolclass}
+    for key, value in _pool_options.items():
+        if key in QUEUE_POOL_OPTIONS and not issubclass(poolclass, QueuePool):
+            continue
+        options[key] = value
+    return options
+
 
 def db_session() -> Session:
-    """Return a new SQLAlchemy Session bound to the configured engine."""
+    """Return a new SQLAlchemy Session bound to the configured engine.
+
+    With ``DATABASE_REPLICA_URLS`` set it is a :class:`~PythonMVC.replicas.RoutingSession`
+    that sends reads to the replicas.
+    """
     global _SessionFactory
     if _SessionFactory is None:
-        _SessionFactory = sessionmaker(bind=BaseModel.engine(), class_=Session, expire_on_commit=False)
+        replica_set = BaseModel.replica_set()
+        if replica_set is None:
+            _SessionFactory = sessionmaker(bind=BaseModel.engine(), class_=Session, expire_on_commit=False)
+        else:
+            _SessionFactory = sessionmaker(
+                class_=replicas.RoutingSession,
+                primary=BaseModel.engine(),
+                replicas=replica_set,
+                expire_on_commit=False,
+            )
     return _SessionFactory()
 
+
+def async_db_session() -> AsyncSession:
+    """Return a new AsyncSession bound to the async engine; use as ``async with``."""
+    global _AsyncSessionFactory
+    if _AsyncSessionFactory is None:
+        replica_set = BaseModel.async_replica_set()
+        if replica_set is None:
+            _AsyncSessionFactory = async_sessionmaker(bind=BaseModel.async_engine(), expire_on_commit=False)
+        else:
+            _AsyncSessionFactory = async_sessionmaker(
+                sync_session_class=replicas.RoutingSession,
+                primary=BaseModel.async_engine().sync_engine,
+                replicas=replica_set,
+                expire_on_commit=False,
+            )
+    return _AsyncSessionFactory()
+
+
+async def stream_query(statement: Select[Any], yield_per: int = 500) -> AsyncIterator[Any]:
+    """Yield ORM rows from a server-side cursor, ``yield_per`` at a time.
+
+    The generator owns its session, so it stays valid for as long as a streaming response
+    is still iterating and releases the connection as soon as iteration stops.
+    """
+    async with async_db_session() as session:
+        result = await session.stream_scalars(statement.execution_options(yield_per=yield_per))
+        try:
+            async for row in result:
+                yield row
+        finally:
+            await result.close()
+
+
+async def keyset_page(
+    statement: Select[Any],
+    key: Any,
+    after: Any = None,
+    per_page: int = DEFAULT_PAGE_SIZE,
+    descending: bool = True,
+) -> Tuple[List[Any], Any]:
+    """One page of ORM rows ordered by the unique column ``key``, starting past ``after``.
+
+    Returns the rows and the cursor for the next page (``None`` on the last one). The
+    database seeks ``key``'s index instead of skipping rows, so page 1000 costs what page
+    1 does. ``per_page`` is capped at :data:`MAX_PAGE_SIZE`.
+    """
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+    if after is not None:
+        statement = statement.where(key < after if descending else key > after)
+    statement = statement.order_by(key.desc() if descending else key.asc()).limit(per_page + 1)
+    async with async_db_session() as session:
+        # unique(): joined eager loads of collections repeat the parent row.
+        rows = list((await session.scalars(statement)).unique().all())
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, getattr(rows[-1], key.key)
+
+
+def _execute_batches(engine: Engine, statement: Any, rows: Iterable[Mapping[str, Any]], batch_size: int) -> int:
+    # executemany per batch: SQLAlchemy 2.x turns it into multi-row VALUES where supported.
+    total = 0
+    with engine.connect() as connection:
+        for batch in _chunks(rows, batch_size):
+            connection.execute(statement, batch)
+            connection.commit()
+            total += len(batch)
+            # These writes bypass the Session, so its commit hooks never see them.
+            query_cache.invalidate(statement.table.name)
+            replicas.record_write()
+    return total
+
+
+def _chunks(rows: Iterable[Mapping[str, Any]], size: int) -> Iterator[List[Mapping[str, Any]]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def async_database_url(url: str) -> str:
+    """Swap the driver in a sync ``DATABASE_URL`` for its asyncio counterpart.
+
+    ``postgresql+psycopg://...`` becomes ``postgresql+asyncpg://...``; URLs that already
+    name an async driver are returned unchanged.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_dialect().is_async or backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
@@ -0,0 +1,81 @@
+"""Connection pool instrumentation."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Type
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import Pool
+
+
+class PoolMetrics:
+    """Checkout wait time and timeout counters shared by a pool and its recreations."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            if waited > self.wait_seconds_max:
+                self.wait_seconds_max = waited
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool: Any) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "pool": type(pool).__name__,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+        if hasattr(pool, "checkedout") and hasattr(pool, "overflow"):
+            size = pool.size()
+            max_overflow = getattr(pool, "_max_overflow", 0)
+            # A negative max_overflow (-1) lets the pool grow without limit: no capacity to saturate.
+            capacity = size + max_overflow if max_overflow >= 0 else None
+            checked_out = pool.checkedout()
+            stats.update(
+                size=size,
+                capacity=capacity,
+                checked_out=checked_out,
+                overflow=pool.overflow(),
+                saturation=checked_out / capacity if capacity else 0.0,
+            )
+        return stats
+
+
+def instrumented_pool_class(url: str, metrics: PoolMetrics) -> Type[Pool]:
+    """Subclass the dialect's default pool so every checkout is timed.
+
+    SQLAlchemy has no "checkout requested" event (``checkout`` fires only once a
+    connection has been handed over), so the private ``Pool._do_get`` (where callers
+    block when the pool is exhausted) is overridden. Its signature is unchanged from
+    SQLAlchemy 1.4 through 2.1; the ``SQLAlchemy>=2.0`` requirement covers it.
+    Subclassing keeps the timing in place when ``engine.dispose()`` recreates the pool.
+    """
+    parsed = make_url(url)
+    base = parsed.get_dialect().get_pool_class(parsed)
+
+    def _do_get(self: Pool) -> Any:
+        started = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except exc.TimeoutError:
+            metrics.record_timeout()
+            raise
+        metrics.record(time.perf_counter() - started)
+        return connection
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
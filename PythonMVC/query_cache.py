@@ -0,0 +1,240 @@
+"""Opt-in ORM query result cache with table-level invalidation on commit."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import pickle
+import threading
+from typing import Any, Dict, Iterable, List, MutableMapping, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy import util as sa_util
+from sqlalchemy.engine import FrozenResult
+from sqlalchemy.orm import ORMExecuteState, Session, loading
+from sqlalchemy.sql.util import find_tables
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+from .cache import Cache, LRUCache
+
+logger = logging.getLogger(__name__)
+
+VERSION_PREFIX = "pmvc:qc:table:"
+RESULT_PREFIX = "pmvc:qc:result:"
+# session.info key holding the tables written in the current transaction.
+WRITTEN_TABLES = "pmvc_query_cache_written"
+# Distinct statements whose rendered SQL is kept for building keys (least recently used go).
+SQL_CACHE_SIZE = 500
+
+
+class MemoryQueryCacheBackend:
+    """Per-process results (byte-bounded LRU) and table versions.
+
+    Each result is round-tripped through pickle once when stored, which gives the LRU a
+    copy detached from the loading session plus its size in bytes. The LRU keeps that
+    unpickled ``FrozenResult``, so a hit is a dict lookup with no deserialization.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.results = LRUCache(max_bytes)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def versions(self, tables: List[str]) -> List[int]:
+        return [self._versions.get(name, 0) for name in tables]
+
+    def bump(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            for name in tables:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def get(self, key: str) -> Optional[FrozenResult]:
+        return self.results.get(key)
+
+    def set(self, key: str, value: FrozenResult, ttl: float) -> None:
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self.results.set(key, pickle.loads(blob), ttl, size=len(blob))
+
+
+class RedisQueryCacheBackend:
+    """Shared results and table versions in the Redis behind a :class:`Cache`.
+
+    Session events are synchronous. Under an ``AsyncSession`` they run inside
+    SQLAlchemy's greenlet, so calls go through the cache's asyncio client with
+    ``await_only`` and the event loop keeps serving other requests meanwhile; plain
+    ``Session`` use falls back to a blocking client on the same URL. Each lookup is one
+    ``MGET`` for the versions plus one ``GET``.
+    """
+
+    def __init__(self, cache: Optional[Cache] = None) -> None:
+        import redis
+
+        self.cache = cache or Cache()
+        self.sync_client = redis.Redis.from_url(self.cache.url)
+
+    def versions(self, tables: List[str]) -> List[int]:
+        values = self._call("mget", [VERSION_PREFIX + name for name in tables])
+        return [int(value or 0) for value in values]
+
+    def bump(self, tables: Iterable[str]) -> None:
+        names = [VERSION_PREFIX + name for name in tables]
+        if in_greenlet():
+            pipeline = await_only(self.cache.client()).pipeline(transaction=False)
+            for name in names:
+                pipeline.incr(name)
+            await_only(pipeline.execute())
+        else:
+            pipeline = self.sync_client.pipeline(transaction=False)
+            for name in names:
+                pipeline.incr(name)
+            pipeline.execute()
+
+    def get(self, key: str) -> Optional[FrozenResult]:
+        blob = self._call("get", key)
+        return pickle.loads(blob) if blob is not None else None
+
+    def set(self, key: str, value: FrozenResult, ttl: float) -> None:
+        self._call("set", key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=int(ttl * 1000))
+
+    def _call(self, command: str, *args: Any, **kwargs: Any) -> Any:
+        if in_greenlet():
+            client = await_only(self.cache.client())
+            return await_only(getattr(client, command)(*args, **kwargs))
+        return getattr(self.sync_client, command)(*args, **kwargs)
+
+
+class QueryCache:
+    """Serve repeated SELECTs from a backend until a commit touches one of their tables.
+
+    Statements opt in with ``.execution_options(query_cache=True)`` (or every SELECT when
+    ``cache_all`` is set; ``query_cache=False`` opts out). Keys combine SQLAlchemy's
+    statement cache key (so SQL is not recompiled per lookup), the bound parameters and
+    the current version of every table the statement reads. Committing a
+    session bumps the versions of the tables it flushed, so stale entries are simply
+    never looked up again.
+    """
+
+    def __init__(self, backend: Any = None, ttl: float = 300, cache_all: bool = False) -> None:
+        self.backend = backend or MemoryQueryCacheBackend()
+        self.ttl = ttl
+        self.cache_all = cache_all
+        self.hits = 0
+        self.misses = 0
+        # Cache key -> rendered SQL, shared across lookups like the engine's compiled cache.
+        self._sql: MutableMapping[Any, str] = sa_util.LRUCache(SQL_CACHE_SIZE)
+
+    def install(self) -> None:
+        event.listen(Session, "do_orm_execute", self._on_execute)
+        event.listen(Session, "after_flush", self._on_flush)
+        event.listen(Session, "after_commit", self._on_commit)
+        event.listen(Session, "after_rollback", self._on_rollback)
+
+    def uninstall(self) -> None:
+        event.remove(Session, "do_orm_execute", self._on_execute)
+        event.remove(Session, "after_flush", self._on_flush)
+        event.remove(Session, "after_commit", self._on_commit)
+        event.remove(Session, "after_rollback", self._on_rollback)
+
+    def invalidate(self, *tables: str) -> None:
+        """Retire cached results for ``tables`` (for writes made outside a Session)."""
+        if tables:
+            self.backend.bump(tables)
+
+    def _on_execute(self, state: ORMExecuteState) -> Any:
+        if state.is_insert or state.is_update or state.is_delete:
+            written = _written(state.session)
+            written.update(table.name for table in find_tables(state.statement, include_crud=True))
+            return None
+
+        if not state.is_select or state.is_column_load or state.is_relationship_load:
+            return None
+        enabled = state.execution_options.get("query_cache", self.cache_all)
+        if not enabled:
+            return None
+
+        tables = sorted(
+            {table.name for table in find_tables(state.statement, include_aliases=True, include_joins=True)}
+        )
+        # Results that could include this transaction's uncommitted writes are never shared.
+        if not tables or _written(state.session).intersection(tables):
+            return None
+
+        cache_key = state.statement._generate_cache_key()
+        if cache_key is None:
+            return None
+        try:
+            statement = cache_key.to_offline_string(self._sql, state.statement, state.parameters or {})
+            versions = self.backend.versions(tables)
+            key = RESULT_PREFIX + hashlib.sha1(repr((statement, tables, versions)).encode()).hexdigest()
+            frozen = self.backend.get(key)
+        except Exception:  # pragma: no cover - a broken cache must not break queries
+            logger.warning("Query cache lookup failed; querying the database", exc_info=True)
+            return None
+
+        if frozen is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            frozen = state.invoke_statement().freeze()
+            try:
+                self.backend.set(key, frozen, state.execution_options.get("query_cache_ttl", self.ttl))
+            except Exception:  # pragma: no cover
+                logger.warning("Query cache store failed", exc_info=True)
+        # Copies the cached rows into this session without emitting any SQL.
+        return loading.merge_frozen_result(state.session, state.statement, frozen, load=False)()
+
+    def _on_flush(self, session: Session, flush_context: Any) -> None:
+        written = _written(session)
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            mapper = getattr(instance, "__mapper__", None)
+            if mapper is not None:
+                written.update(table.name for table in mapper.tables)
+
+    def _on_commit(self, session: Session) -> None:
+        written = session.info.pop(WRITTEN_TABLES, None)
+        if written:
+            self.invalidate(*written)
+
+    def _on_rollback(self, session: Session) -> None:
+        session.info.pop(WRITTEN_TABLES, None)
+
+
+def _written(session: Session) -> Set[str]:
+    return session.info.setdefault(WRITTEN_TABLES, set())
+
+
+_active: Optional[QueryCache] = None
+
+
+def configure(settings: Any) -> Optional[QueryCache]:
+    """Install the cache described by ``QUERY_CACHE`` (or remove it when unset).
+
+    ``QUERY_CACHE = {"backend": "memory" | "redis", "ttl": 300, "all": False}``; the
+    Redis backend connects to ``CACHE_URL``.
+    """
+    global _active
+    if _active is not None:
+        _active.uninstall()
+        _active = None
+    options = getattr(settings, "QUERY_CACHE", None)
+    if not options:
+        return None
+    kind = options.get("backend", "memory")
+    if kind == "memory":
+        backend: Any = MemoryQueryCacheBackend(options.get("max_bytes", 32 * 1024 * 1024))
+    elif kind == "redis":
+        backend = RedisQueryCacheBackend(Cache(getattr(settings, "CACHE_URL", None)))
+    else:
+        backend = kind
+    _active = QueryCache(backend, ttl=options.get("ttl", 300), cache_all=options.get("all", False))
+    _active.install()
+    return _active
+
+
+def active() -> Optional[QueryCache]:
+    return _active
+
+
+def invalidate(*tables: str) -> None:
+    if _active is not None:
+        _active.invalidate(*tables)
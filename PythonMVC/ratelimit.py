@@ -0,0 +1,184 @@
+"""Sliding-window rate limiting with pluggable storage backends."""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+from .cache import Cache
+
+logger = logging.getLogger(__name__)
+
+# Sliding-window counter: the previous window's count is weighted by how much of it still
+# overlaps the trailing window, so bursts at window edges cannot double the limit.
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local weight = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * weight + current + 1 > limit then
+  return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], window * 2)
+return 1
+"""
+
+
+class RateLimitBackend:
+    """Storage interface for sliding-window counters."""
+
+    async def hit(self, key: str, limit: int, window: int) -> bool:
+        """Record a request for ``key`` and return ``True`` if it is allowed."""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """In-process backend bounded to ``max_keys`` entries.
+
+    Entries are kept in least-recently-used order; expired windows are pruned from the
+    cold end on every hit, and the coldest key is evicted once the table is full.
+    """
+
+    def __init__(self, max_keys: int = 10_000, clock: Callable[[], float] = time.time) -> None:
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> [window length, window index, count in window, count in previous window]
+        self._entries: "OrderedDict[str, List[int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def hit(self, key: str, limit: int, window: int) -> bool:
+        now = self.clock()
+        index = int(now // window)
+        self._prune(now)
+
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < index - 1:
+            current, previous = 0, 0
+        elif entry[1] == index - 1:
+            current, previous = 0, entry[2]
+        else:
+            current, previous = entry[2], entry[3]
+
+        weight = 1 - (now % window) / window
+        if previous * weight + current + 1 > limit:
+            self._entries[key] = [window, index, current, previous]
+            self._entries.move_to_end(key)
+            return False
+
+        self._entries[key] = [window, index, current + 1, previous]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+        return True
+
+    def _prune(self, now: float) -> None:
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[1] >= int(now // entry[0]) - 1:
+                break
+            del self._entries[key]
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Shared backend so limits hold across workers and nodes.
+
+    Each hit runs a single Lua script, so the read-compare-increment is atomic on the server.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[Cache] = None,
+        prefix: str = "pmvc:ratelimit:",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.cache = cache or Cache()
+        self.prefix = prefix
+        self.clock = clock
+        self._script: Any = None
+
+    async def hit(self, key: str, limit: int, window: int) -> bool:
+        if self._script is None:
+            client = await self.cache.client()
+            self._script = client.register_script(SLIDING_WINDOW_LUA)
+
+        now = self.clock()
+        index = int(now // window)
+        weight = 1 - (now % window) / window
+        # Hash tag keeps both windows of a key in the same Redis Cluster slot.
+        base = f"{self.prefix}{{{key}}}"
+        try:
+            allowed = await self._script(keys=[f"{base}:{index}", f"{base}:{index - 1}"], args=[limit, window, weight])
+        except Exception:  # pragma: no cover - fail open when Redis is unavailable
+            logger.warning("Rate limit backend unavailable; allowing request", exc_info=True)
+            return True
+        return bool(allowed)
+
+
+def build_backend(config: Mapping[str, Any]) -> RateLimitBackend:
+    """Resolve ``rate_limit_backend`` from the security config."""
+    backend = config.get("rate_limit_backend", "memory")
+    if isinstance(backend, RateLimitBackend):
+        return backend
+    if backend == "memory":
+        return MemoryRateLimitBackend(max_keys=config.get("rate_limit_max_keys", 10_000))
+    if backend == "redis":
+        return RedisRateLimitBackend(Cache(config.get("cache_url")))
+    raise ValueError(f"Unknown rate limit backend {backend!r}; use 'memory', 'redis' or a RateLimitBackend")
+
+
+class RateLimiter:
+    """Match requests to per-route limits and consult the backend.
+
+    ``routes`` maps ``"/prefix"`` or ``"METHOD /prefix"`` to a request count per window;
+    the longest matching prefix wins and falls back to ``default_limit``.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        default_limit: Optional[int],
+        window: int = 60,
+        routes: Optional[Mapping[str, int]] = None,
+    ) -> None:
+        self.backend = backend
+        self.default_limit = default_limit
+        self.window = window
+        self.rules: List[Tuple[Optional[str], str, int]] = []
+        for pattern, limit in (routes or {}).items():
+            method, _, prefix = pattern.rpartition(" ")
+            self.rules.append((method.upper() or None, prefix, limit))
+        self.rules.sort(key=lambda rule: (len(rule[1]), rule[0] is not None), reverse=True)
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "RateLimiter":
+        return cls(
+            build_backend(config),
+            default_limit=config.get("rate_limit"),
+            window=config.get("rate_limit_window", 60),
+            routes=config.get("rate_limit_routes"),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.default_limit or self.rules)
+
+    def match(self, method: str, path: str) -> Tuple[str, Optional[int]]:
+        for rule_method, prefix, limit in self.rules:
+            if rule_method and rule_method != method:
+                continue
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return f"{rule_method or '*'} {prefix}", limit
+        return "*", self.default_limit
+
+    async def limited(self, client: str, method: str, path: str) -> bool:
+        scope, limit = self.match(method, path)
+        if not limit:
+            return False
+        return not await self.backend.hit(f"{client}|{scope}", limit, self.window)
+
@@ -0,0 +1,267 @@
+"""Read-replica routing: reads go to replicas, writes (and what follows them) to the primary."""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger("PythonMVC.replicas")
+
+DEFAULT_REPLICA_CONFIG = {
+    # Seconds after a commit during which the same client keeps reading from the primary,
+    # so a redirect after a POST shows what was just written despite replication lag.
+    "read_your_writes": 2.0,
+    # Seconds a failed replica is skipped before it is health-checked and tried again.
+    "retry_after": 30.0,
+}
+
+# Cookie in which DBSessionMiddleware carries the client's last write time.
+LAST_WRITE_COOKIE = "pmvc_last_write"
+
+_config: Dict[str, Any] = dict(DEFAULT_REPLICA_CONFIG)
+_urls: List[Tuple[str, int]] = []
+_pinned: ContextVar[bool] = ContextVar("pmvc_replicas_pinned", default=False)
+_last_write: ContextVar[float] = ContextVar("pmvc_replicas_last_write", default=0.0)
+
+
+class Replica:
+    def __init__(self, engine: Engine, weight: int) -> None:
+        self.engine = engine
+        self.weight = weight
+        self.current = 0
+        self.down_until = 0.0
+
+
+class ReplicaSet:
+    """Weighted round-robin over replica engines that skips the ones that failed.
+
+    Selection is smooth weighted round-robin (as in nginx): weights 3 and 1 give
+    ``a a b a`` rather than ``a a a b``. A replica whose connection fails is taken out
+    for ``retry_after`` seconds; when that has passed it answers ``SELECT 1`` before
+    it is handed out again.
+    """
+
+    def __init__(self, replicas: Sequence[Tuple[Engine, int]], retry_after: float = 30.0) -> None:
+        self.replicas = [Replica(engine, weight) for engine, weight in replicas]
+        self.retry_after = retry_after
+        # Connection attempts that failed outright; the session retries those reads.
+        self.connect_failures = 0
+        self._lock = threading.Lock()
+        for replica in self.replicas:
+            event.listen(replica.engine, "handle_error", functools.partial(self._on_error, replica))
+
+    def choose(self) -> Optional[Engine]:
+        """The next replica to read from, or None when every one is down."""
+        now = time.monotonic()
+        with self._lock:
+            due = [replica for replica in self.replicas if replica.down_until <= now]
+        available = [replica for replica in due if not replica.down_until or self._healthy(replica)]
+        with self._lock:
+            if not available:
+                return None
+            total = 0
+            for replica in available:
+                replica.current += replica.weight
+                total += replica.weight
+            chosen = max(available, key=lambda replica: replica.current)
+            chosen.current -= total
+            return chosen.engine
+
+    def mark_down(self, replica: Replica) -> None:
+        with self._lock:
+            replica.down_until = time.monotonic() + self.retry_after
+        logger.warning("Replica %s failed; skipping it for %.0fs", replica.engine.url, self.retry_after)
+
+    def dispose(self, close: bool = True) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose(close=close)
+
+    def _healthy(self, replica: Replica) -> bool:
+        try:
+            with replica.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except exc.DBAPIError:
+            return False  # _on_error already pushed down_until forward
+        with self._lock:
+            replica.down_until = 0.0
+        logger.info("Replica %s is back", replica.engine.url)
+        return True
+
+    def _on_error(self, replica: Replica, context: Any) -> None:
+        if context.connection is None:
+            with self._lock:
+                self.connect_failures += 1
+            self.mark_down(replica)
+        elif context.is_disconnect:
+            self.mark_down(replica)
+
+
+class RoutingSession(Session):
+    """Session that picks an engine per statement.
+
+    ``SELECT`` goes to a replica unless the block is pinned with :func:`use_primary`,
+    the statement locks rows (``FOR UPDATE``), this session has already written in the
+    current transaction, or the client committed within the read-your-writes window.
+    Flushes, DML, raw ``text()`` and ``Session.connection()`` always use the primary, but
+    only flushes and DML count as a write for read-your-writes.
+    """
+
+    def __init__(self, *args: Any, primary: Engine, replicas: Optional[ReplicaSet] = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replicas = replicas
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, bind: Any = None, **kwargs: Any) -> Any:
+        if bind is not None:
+            return bind
+        if self.replicas is None:
+            return self.primary
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.info["pmvc_replicas_wrote"] = True
+            return self.primary
+        if not isinstance(clause, Select):
+            # text() and Session.connection() may write, so they run on the primary, but
+            # only a flush or DML opens the read-your-writes window.
+            return self.primary
+        if self._reads_from_replica(clause):
+            engine = self.replicas.choose()
+            if engine is not None:
+                return engine
+        return self.primary
+
+    def _reads_from_replica(self, statement: Select) -> bool:
+        if _pinned.get() or statement._for_update_arg is not None or self.info.get("pmvc_replicas_wrote"):
+            return False
+        return time.time() - _last_write.get() >= _config["read_your_writes"]
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _retry_unreachable_replica(state: ORMExecuteState) -> Any:
+    # A replica that cannot be reached is marked down by its handle_error hook; rerunning
+    # the read lets get_bind pick another replica (or the primary) instead of failing.
+    replicas = state.session.replicas
+    if replicas is None or not state.is_select:
+        return None
+    while True:
+        failures = replicas.connect_failures
+        try:
+            return state.invoke_statement()
+        except exc.DBAPIError:
+            if replicas.connect_failures == failures:
+                raise
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _after_commit(session: Session) -> None:
+    if session.info.pop("pmvc_replicas_wrote", False):
+        record_write()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("pmvc_replicas_wrote", None)
+
+
+class use_primary:
+    """Pin reads to the primary: ``with use_primary():``, ``async with`` or as a decorator.
+
+    Works on plain and ``async def`` functions (controller actions included); nested
+    and concurrent uses are independent because the pin lives in a context variable.
+    """
+
+    def __init__(self) -> None:
+        self._tokens: List[Token] = []
+
+    def __enter__(self) -> "use_primary":
+        self._tokens.append(_pinned.set(True))
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        _pinned.reset(self._tokens.pop())
+
+    async def __aenter__(self) -> "use_primary":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.__exit__(*exc_info)
+
+    def __call__(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def pinned_async(*args: Any, **kwargs: Any) -> Any:
+                with use_primary():
+                    return await function(*args, **kwargs)
+
+            return pinned_async
+
+        @functools.wraps(function)
+        def pinned(*args: Any, **kwargs: Any) -> Any:
+            with use_primary():
+                return function(*args, **kwargs)
+
+        return pinned
+
+
+def configure(settings: Any) -> None:
+    """Read ``DATABASE_REPLICA_URLS`` and ``DATABASE_REPLICAS`` from the app settings.
+
+    ``DATABASE_REPLICA_URLS`` is a list of URLs or a ``{url: weight}`` dict; the
+    ``DATABASE_REPLICA_URLS`` environment variable (comma separated) takes precedence.
+    ``DATABASE_REPLICAS`` accepts ``read_your_writes`` and ``retry_after`` (seconds).
+    """
+    global _urls
+    options: Mapping[str, Any] = getattr(settings, "DATABASE_REPLICAS", None) or {}
+    unknown = set(options) - set(DEFAULT_REPLICA_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown DATABASE_REPLICAS option(s): {', '.join(sorted(unknown))}")
+    _config.clear()
+    _config.update(DEFAULT_REPLICA_CONFIG)
+    _config.update(options)
+    environment = os.getenv("DATABASE_REPLICA_URLS")
+    _urls = _parse_urls(
+        [url.strip() for url in environment.split(",") if url.strip()]
+        if environment
+        else getattr(settings, "DATABASE_REPLICA_URLS", None) or []
+    )
+
+
+def urls() -> List[Tuple[str, int]]:
+    """Configured ``(url, weight)`` pairs; empty when replicas are off."""
+    return list(_urls)
+
+
+def retry_after() -> float:
+    return float(_config["retry_after"])
+
+
+def read_your_writes() -> float:
+    return float(_config["read_your_writes"])
+
+
+def record_write(at: Optional[float] = None) -> None:
+    """Start the read-your-writes window for the current context."""
+    _last_write.set(time.time() if at is None else at)
+
+
+def last_write() -> float:
+    return _last_write.get()
+
+
+def _parse_urls(value: Union[Sequence[str], Mapping[str, int]]) -> List[Tuple[str, int]]:
+    pairs = list(value.items()) if isinstance(value, Mapping) else [(url, 1) for url in value]
+    for url, weight in pairs:
+        if int(weight) < 1:
+            raise ValueError(f"Replica weight must be at least 1 (got {weight!r} for {url})")
+    return [(url, int(weight)) for url, weight in pairs]
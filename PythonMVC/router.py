@@ -2,9 +2,22 @@
 
 from __future__ import annotations
 
-from typing import List, Type
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
 
-from starlette.routing import Route
+from starlette.datastructures import URL, URLPath
+from starlette.requests import Request
+from starlette.responses import RedirectResponse, Response
+from starlette.routing import BaseRoute, Match, NoMatchFound, Route, Router, WebSocketRoute
+from starlette.types import Receive, Scope, Send
+
+from .api import HTML, negotiate
+
+# A whole-segment parameter such as ``{id}`` or ``{id:int}`` (``:path`` spans segments).
+PARAM_SEGMENT = re.compile(r"^\{[a-zA-Z_][a-zA-Z0-9_]*(:(?!path\})[a-zA-Z_]+)?\}$")
+
+IndexedRoute = Tuple[int, BaseRoute]
+Endpoint = Callable[[Request], Awaitable[Response]]
 
 
 class ControllerFactoryError(RuntimeError):
@@ -18,12 +31,22 @@ def resource(name: str, controller_cls: Type) -> List[Route]:
     except Exception as exc:  # pragma: no cover - defensive guard
         raise ControllerFactoryError(f"Could not instantiate controller {controller_cls!r}") from exc
 
+    index, show = controller.index, controller.show
+    if getattr(controller, "model", None) is not None:
+        if not getattr(controller, "api_fields", None):
+            raise ControllerFactoryError(
+                f"{controller_cls.__name__} sets model but not api_fields; list the columns its JSON API may expose"
+            )
+        # JSON API mode: the same URLs answer JSON/NDJSON to clients that ask for it.
+        index = _negotiated(controller.index, controller.api_index)
+        show = _negotiated(controller.show, controller.api_show)
+
     base = f"/{name}"
     return [
-        Route(base, controller.index, methods=["GET"], name=f"{name}.index"),
+        Route(base, index, methods=["GET"], name=f"{name}.index"),
         Route(f"{base}/new", controller.new, methods=["GET"], name=f"{name}.new"),
         Route(base, controller.create, methods=["POST"], name=f"{name}.create"),
-        Route(f"{base}/{{id}}", controller.show, methods=["GET"], name=f"{name}.show"),
+        Route(f"{base}/{{id}}", show, methods=["GET"], name=f"{name}.show"),
         Route(f"{base}/{{id}}/edit", controller.edit, methods=["GET"], name=f"{name}.edit"),
         Route(
             f"{base}/{{id}}",
@@ -33,3 +56,228 @@ def resource(name: str, controller_cls: Type) -> List[Route]:
         ),
         Route(f"{base}/{{id}}", controller.destroy, methods=["DELETE"], name=f"{name}.destroy"),
     ]
+
+
+def _negotiated(html: Endpoint, api: Endpoint) -> Endpoint:
+    async def endpoint(request: Request) -> Response:
+        response = await (html if negotiate(request) == HTML else api)(request)
+        response.headers.add_vary_header("Accept")
+        return response
+
+    return endpoint
+
+
+class _RouteList(list):
+    """A ``list`` that counts its in-place changes, so the router knows when to recompile."""
+
+    __slots__ = ("version",)
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.version = 0
+
+
+def _counting(name: str) -> Callable[..., Any]:
+    method = getattr(list, name)
+
+    def mutate(self: _RouteList, *args: Any, **kwargs: Any) -> Any:
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    mutate.__name__ = name
+    return mutate
+
+
+_MUTATORS = ("append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse")
+for _name in (*_MUTATORS, "__setitem__", "__delitem__", "__iadd__", "__imul__"):
+    setattr(_RouteList, _name, _counting(_name))
+
+
+class _Node:
+    __slots__ = ("static", "param", "routes")
+
+    def __init__(self) -> None:
+        self.static: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        self.routes: List[IndexedRoute] = []
+
+
+class CompiledRouter(Router):
+    """Router that finds candidate routes through a segment trie instead of a linear scan.
+
+    ``Route``/``WebSocketRoute`` paths made of static segments and whole-segment
+    parameters go into the trie; anything else (mounts, hosts, ``{x:path}`` or mixed
+    segments) is kept in a short fallback list. A request only runs ``matches()`` on
+    the routes the trie reaches plus the fallbacks, in registration order, so the
+    first-match-wins semantics, 405 handling and slash redirects of Starlette's
+    ``Router`` are unchanged. Routes whose methods exclude the request method are
+    only matched if nothing else does. The trie is rebuilt whenever ``routes`` is
+    reassigned or changed in place (appended to, or an item replaced or removed).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._root = _Node()
+        self._fallback: List[IndexedRoute] = []
+        self._by_name: Dict[str, List[IndexedRoute]] = {}
+        self._unnamed: List[IndexedRoute] = []
+        self._signature: Optional[Tuple[int, int]] = None
+
+    @property  # type: ignore[override]
+    def routes(self) -> List[BaseRoute]:
+        return self._routes
+
+    @routes.setter
+    def routes(self, routes: List[BaseRoute]) -> None:
+        self._routes = _RouteList(routes)
+
+    @classmethod
+    def from_router(cls, router: Router) -> "CompiledRouter":
+        compiled = cls(routes=router.routes, redirect_slashes=router.redirect_slashes, default=router.default)
+        compiled.lifespan_context = router.lifespan_context
+        return compiled
+
+    def compile(self) -> None:
+        root, fallback = _Node(), []
+        by_name: Dict[str, List[IndexedRoute]] = {}
+        unnamed: List[IndexedRoute] = []
+        for index, route in enumerate(self.routes):
+            entry = (index, route)
+            segments = _segments(route)
+            if segments is None:
+                fallback.append(entry)
+            else:
+                node = root
+                for segment in segments:
+                    if PARAM_SEGMENT.match(segment):
+                        node.param = node.param or _Node()
+                        node = node.param
+                    else:
+                        node = node.static.setdefault(segment, _Node())
+                node.routes.append(entry)
+            if isinstance(route, (Route, WebSocketRoute)):
+                by_name.setdefault(route.name, []).append(entry)
+            else:
+                unnamed.append(entry)
+        self._root, self._fallback, self._by_name, self._unnamed = root, fallback, by_name, unnamed
+        self._signature = self._current_signature()
+
+    def candidates(self, path: str) -> List[BaseRoute]:
+        """Routes that could match ``path``, in registration order."""
+        if self._signature != self._current_signature():
+            self.compile()
+        found: List[IndexedRoute] = []
+        if path.startswith("/"):
+            _collect(self._root, path[1:].split("/"), 0, found)
+        if self._fallback:
+            found.extend(self._fallback)
+        if len(found) > 1:
+            found.sort(key=lambda entry: entry[0])
+        return [route for _, route in found]
+
+    def url_path_for(self, name: str, /, **path_params: Any) -> URLPath:
+        if self._signature != self._current_signature():
+            self.compile()
+        entries = self._by_name.get(name, [])
+        if self._unnamed:
+            entries = sorted(entries + self._unnamed, key=lambda entry: entry[0])
+        for _, route in entries:
+            try:
+                return route.url_path_for(name, **path_params)
+            except NoMatchFound:
+                pass
+        raise NoMatchFound(name, path_params)
+
+    async def app(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await super().app(scope, receive, send)
+            return
+        if "router" not in scope:
+            scope["router"] = self
+
+        route_path = _route_path(scope)
+        if await self._dispatch(scope, receive, send, self.candidates(route_path)):
+            return
+
+        if scope["type"] == "http" and self.redirect_slashes and route_path != "/":
+            redirect_scope = dict(scope)
+            if route_path.endswith("/"):
+                redirect_scope["path"] = redirect_scope["path"].rstrip("/")
+                redirect_path = route_path.rstrip("/")
+            else:
+                redirect_scope["path"] = redirect_scope["path"] + "/"
+                redirect_path = route_path + "/"
+            for route in self.candidates(redirect_path):
+                match, _ = route.matches(redirect_scope)
+                if match != Match.NONE:
+                    await RedirectResponse(url=str(URL(scope=redirect_scope)))(scope, receive, send)
+                    return
+
+        await self.default(scope, receive, send)
+
+    async def _dispatch(self, scope: Scope, receive: Receive, send: Send, candidates: List[BaseRoute]) -> bool:
+        method = scope.get("method")
+        # (route, child scope or None when the path has not been checked yet)
+        partials: List[Tuple[BaseRoute, Optional[Scope]]] = []
+        for route in candidates:
+            methods = getattr(route, "methods", None)
+            if method and methods and method not in methods and isinstance(route, Route):
+                partials.append((route, None))
+                continue
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope["route"] = route
+                scope.update(child_scope)
+                await route.handle(scope, receive, send)
+                return True
+            if match == Match.PARTIAL:
+                partials.append((route, child_scope))
+
+        for route, child_scope in partials:
+            if child_scope is None:
+                match, child_scope = route.matches(scope)
+                if match == Match.NONE:
+                    continue
+            scope["route"] = route
+            scope.update(child_scope)
+            await route.handle(scope, receive, send)
+            return True
+        return False
+
+    def _current_signature(self) -> Tuple[int, int]:
+        return id(self._routes), self._routes.version
+
+
+def _route_path(scope: Scope) -> str:
+    """``scope["path"]`` without the ``root_path`` prefix a mounting app added."""
+    path: str = scope["path"]
+    root_path = scope.get("root_path", "")
+    if not root_path or not path.startswith(root_path):
+        return path
+    if path == root_path:
+        return ""
+    if path[len(root_path)] == "/":
+        return path[len(root_path):]
+    return path
+
+
+def _segments(route: BaseRoute) -> Optional[List[str]]:
+    if not isinstance(route, (Route, WebSocketRoute)) or not route.path.startswith("/"):
+        return None
+    segments = route.path[1:].split("/")
+    for segment in segments:
+        if ("{" in segment or "}" in segment) and not PARAM_SEGMENT.match(segment):
+            return None
+    return segments
+
+
+def _collect(node: _Node, segments: List[str], depth: int, found: List[IndexedRoute]) -> None:
+    if depth == len(segments):
+        found.extend(node.routes)
+        return
+    segment = segments[depth]
+    child = node.static.get(segment)
+    if child is not None:
+        _collect(child, segments, depth + 1, found)
+    if node.param is not None and segment:
+        _collect(node.param, segments, depth + 1, found)
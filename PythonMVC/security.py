@@ -1,14 +1,19 @@
-"""Security middleware: headers, CSRF and naive rate limiting."""
+"""Security middleware: headers, CSRF and rate limiting."""
 
 from __future__ import annotations
 
-import time
-from typing import MutableMapping, Optional, Tuple
+import hmac
+from http.cookies import SimpleCookie
+from typing import Any, List, Optional, Tuple
 
 from itsdangerous import URLSafeSerializer
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import PlainTextResponse, Response
+from starlette.datastructures import Headers
+from starlette.requests import cookie_parser
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .body import FORM_CONTENT_TYPES, preload_form
+from .ratelimit import RateLimiter
 
 DEFAULT_SECURITY_CONFIG = {
     "hsts": True,
@@ -16,81 +21,121 @@ DEFAULT_SECURITY_CONFIG = {
     "xss_protect": True,
     "csrf": True,
     "rate_limit": 60,
+    "rate_limit_window": 60,
+    "rate_limit_backend": "memory",
+    "rate_limit_routes": {},
     "secret": "change-me",
 }
 
+STATE_CHANGING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+RawHeaders = List[Tuple[bytes, bytes]]
 
-MutableBucket = MutableMapping[Tuple[str, int], int]
 
+class SecurityMiddleware:
+    """Apply lightweight security controls for every request.
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Apply lightweight security controls for every request."""
+    Implemented as raw ASGI middleware: header pairs are computed once at construction and
+    injected into ``http.response.start``, and response bodies pass through untouched so
+    streaming and file responses keep streaming.
+    """
 
-    def __init__(self, app, config: Optional[dict] = None) -> None:
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, config: Optional[dict] = None) -> None:
+        self.app = app
         merged = DEFAULT_SECURITY_CONFIG.copy()
         if config:
             merged.update(config)
         self.config = merged
         self.signer = URLSafeSerializer(self.config["secret"]) if self.config.get("csrf") else None
-        self.bucket: MutableBucket = {}
-
-    async def dispatch(self, request: Request, call_next):
-        rate_limit = self.config.get("rate_limit")
-        if rate_limit and self._rate_limited(request, rate_limit):
-            return PlainTextResponse("Too Many Requests", status_code=429)
-
-        if self.config.get("csrf") and self._is_state_changing(request):
-            if not await self._validate_csrf(request):
-                return PlainTextResponse("CSRF Failed", status_code=403)
-
-        response: Response = await call_next(request)
-        self._apply_security_headers(response)
+        self.limiter = RateLimiter.from_config(self.config)
+        # The token is deterministic for a given secret, so it (and its cookie) is built once.
+        self.csrf_token = self.signer.dumps("csrf") if self.signer else None
+        self.security_headers = self._build_security_headers()
+        self.csrf_headers = self._build_csrf_headers()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        if self.config.get("csrf"):
-            self._ensure_csrf_cookie(request, response)
+        if self.limiter.enabled and await self._rate_limited(scope):
+            await PlainTextResponse("Too Many Requests", status_code=429)(scope, receive, send)
+            return
 
-        return response
+        headers = Headers(scope=scope)
+        cookies = cookie_parser(headers.get("cookie", ""))
+        if self.csrf_token:
+            # Templates embed it in forms as `request.state.csrf_token`.
+            scope.setdefault("state", {})["csrf_token"] = self.csrf_token
 
-    @staticmethod
-    def _is_state_changing(request: Request) -> bool:
-        return request.method in {"POST", "PUT", "PATCH", "DELETE"}
+        if self.signer and scope["method"] in STATE_CHANGING_METHODS:
+            valid, receive = await self._validate_csrf(scope, headers, cookies, receive)
+            if not valid:
+                await PlainTextResponse("CSRF Failed", status_code=403)(scope, receive, send)
+                return
 
-    def _rate_limited(self, request: Request, limit: int) -> bool:
-        now = int(time.time() // 60)
-        key = (request.client.host if request.client else "anonymous", now)
-        self.bucket[key] = self.bucket.get(key, 0) + 1
-        return self.bucket[key] > limit
+        extra_headers = self.security_headers
+        if self.csrf_headers and not cookies.get("csrf"):
+            extra_headers = extra_headers + self.csrf_headers
 
-    async def _validate_csrf(self, request: Request) -> bool:
-        if not self.signer:
-            return True
+        if not extra_headers:
+            await self.app(scope, receive, send)
+            return
 
-        token = request.headers.get("x-csrf-token")
-        if not token and request.headers.get("content-type", "").startswith("application/x-www-form-urlencoded"):
-            form = await request.form()
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                raw = list(message.get("headers", ()))
+                present = {name.lower() for name, _ in raw}
+                raw.extend(pair for pair in extra_headers if pair[0] not in present or pair[0] == b"set-cookie")
+                message["headers"] = raw
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    async def _rate_limited(self, scope: Scope) -> bool:
+        client = scope.get("client")
+        host = client[0] if client else "anonymous"
+        return await self.limiter.limited(host, scope["method"], scope["path"])
+
+    async def _validate_csrf(
+        self, scope: Scope, headers: Headers, cookies: dict, receive: Receive
+    ) -> Tuple[bool, Receive]:
+        # The header wins, so API and XHR requests never have their body touched here.
+        token: Any = headers.get("x-csrf-token")
+        if not token and headers.get("content-type", "").startswith(FORM_CONTENT_TYPES):
+            # Parsed once; controllers get the same FormData from `body.read_form`.
+            form, receive = await preload_form(scope, receive)
             token = form.get("_csrf")
 
-        cookie = request.cookies.get("csrf")
+        cookie = cookies.get("csrf")
+        if not (isinstance(token, str) and token and cookie and hmac.compare_digest(token, cookie)):
+            return False, receive
         try:
-            return bool(token and cookie and self.signer.loads(token) == cookie)
+            return self.signer.loads(cookie) == "csrf", receive
         except Exception:  # pragma: no cover - signer failures surface as False
-            return False
+            return False, receive
 
-    def _apply_security_headers(self, response: Response) -> None:
+    def _build_security_headers(self) -> RawHeaders:
+        headers: RawHeaders = []
         if self.config.get("hsts"):
-            response.headers.setdefault("Strict-Transport-Security", "max-age=63072000; includeSubDomains; preload")
+            headers.append((b"strict-transport-security", b"max-age=63072000; includeSubDomains; preload"))
         if self.config.get("frame_deny"):
-            response.headers.setdefault("X-Frame-Options", "DENY")
+            headers.append((b"x-frame-options", b"DENY"))
         if self.config.get("xss_protect"):
-            response.headers.setdefault("X-Content-Type-Options", "nosniff")
-            response.headers.setdefault("X-XSS-Protection", "0")
+            headers.append((b"x-content-type-options", b"nosniff"))
+            headers.append((b"x-xss-protection", b"0"))
+        return headers
+
+    def _build_csrf_headers(self) -> RawHeaders:
+        if not self.csrf_token:
+            return []
+        token = self.csrf_token
+        cookie: SimpleCookie = SimpleCookie()
+        cookie["csrf"] = token
+        cookie["csrf"]["path"] = "/"
+        cookie["csrf"]["samesite"] = "lax"
+        return [
+            (b"set-cookie", cookie.output(header="").strip().encode("latin-1")),
+            (b"x-csrf-token", token.encode("latin-1")),
+        ]
 
-    def _ensure_csrf_cookie(self, request: Request, response: Response) -> None:
-        if not self.signer:
-            return
-        if request.cookies.get("csrf"):
-            return
-        token = self.signer.dumps("csrf")
-        response.set_cookie("csrf", token, samesite="lax", httponly=False)
-        response.headers.setdefault("X-CSRF-Token", token)
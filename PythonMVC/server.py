@@ -0,0 +1,293 @@
+"""Pre-forking production server: N uvicorn workers sharing one listening socket."""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import random
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger("PythonMVC.server")
+
+# A worker that dies sooner than this after starting is respawned with a delay.
+CRASH_BACKOFF_SECONDS = 1.0
+# How long a stopping worker keeps serving connections it had just accepted.
+ACCEPT_DRAIN_SECONDS = 0.2
+
+
+class PreforkServer:
+    """Master process that forks, supervises and recycles uvicorn workers.
+
+    The master binds the socket once and every worker accepts on it, so connections keep
+    being served while workers come and go. With ``preload`` the app is imported before
+    forking and its pages are shared copy-on-write; SQLAlchemy engines are dropped in
+    each child by :func:`PythonMVC.model.dispose_engines` (registered at fork).
+
+    Signals: ``SIGTERM``/``SIGINT`` stop gracefully; ``SIGHUP`` starts a fresh set of
+    workers, waits until they are accepting and only then retires the old ones (as with
+    gunicorn, a preloaded app is not re-imported: restart the master to deploy new code);
+    ``SIGTTIN``/``SIGTTOU`` add or remove a worker. Workers exit on their own after
+    ``max_requests`` (plus jitter) and are replaced, which caps memory growth.
+
+    Workers merge their ``METRICS`` through ``metrics_dir`` (else ``PMVC_METRICS_DIR``),
+    which the master empties on start; without either it uses a private temporary
+    directory that is removed when the master stops.
+    """
+
+    def __init__(
+        self,
+        app: str = "app.main:app",
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        workers: int = 2,
+        preload: bool = False,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: float = 30.0,
+        uvicorn_options: Optional[Dict[str, Any]] = None,
+        metrics_dir: Optional[str] = None,
+    ) -> None:
+        self.app_path = app
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.preload = preload
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.uvicorn_options = uvicorn_options or {}
+        self.metrics_dir = metrics_dir or os.environ.get("PMVC_METRICS_DIR")
+        self._owns_metrics_dir = False
+        self.socket: Optional[socket.socket] = None
+        self.app: Any = None
+        self.children: Dict[int, float] = {}
+        self.retiring: Dict[int, float] = {}
+        self._signals: List[int] = []
+        # Workers write their pid here once uvicorn is accepting connections.
+        self._ready_read, self._ready_write = -1, -1
+
+    def run(self) -> None:
+        if not hasattr(os, "fork"):
+            raise RuntimeError("pmvc server --workers needs a platform with fork()")
+        self._prepare_metrics_dir()
+        if os.getcwd() not in sys.path:
+            sys.path.insert(0, os.getcwd())
+        self.socket = self._bind()
+        self._ready_read, self._ready_write = os.pipe()
+        os.set_blocking(self._ready_read, False)
+        if self.preload:
+            self.app = self._load_app()
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGCHLD):
+            signal.signal(signum, self._on_signal)
+
+        logger.info("Master %d listening on %s:%d with %d workers", os.getpid(), self.host, self.port, self.workers)
+        self._spawn_missing()
+        try:
+            while True:
+                if self._handle_signals():
+                    break
+                self._reap()
+                self._spawn_missing()
+                self._kill_overdue()
+                self._ready_pids(timeout=0.1)
+        finally:
+            self._stop()
+            self.socket.close()
+            os.close(self._ready_read)
+            os.close(self._ready_write)
+            if self._owns_metrics_dir:
+                shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+    # -- master ------------------------------------------------------------------------
+
+    def _on_signal(self, signum: int, frame: Any) -> None:
+        self._signals.append(signum)
+
+    def _handle_signals(self) -> bool:
+        """Act on queued signals; True means shut down."""
+        while self._signals:
+            signum = self._signals.pop(0)
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                return True
+            if signum == signal.SIGHUP:
+                self._reload()
+            elif signum == signal.SIGTTIN:
+                self.workers += 1
+            elif signum == signal.SIGTTOU and self.workers > 1:
+                self.workers -= 1
+                self._retire(list(self.children)[:1])
+        return False
+
+    def _reload(self) -> None:
+        logger.info("Reloading: starting %d new workers", self.workers)
+        old = list(self.children)
+        self.children.clear()
+        self._spawn_missing()
+        self._wait_ready(set(self.children))
+        # Old workers stop accepting and finish in-flight requests; the socket stays open,
+        # so connections arriving meanwhile queue for the new workers instead of failing.
+        self._retire(old)
+
+    def _wait_ready(self, pids: Set[int]) -> None:
+        deadline = time.monotonic() + self.graceful_timeout
+        pending = set(pids)
+        while pending and time.monotonic() < deadline:
+            pending -= self._ready_pids(timeout=0.1)
+            self._reap()
+            pending &= set(self.children)
+
+    def _ready_pids(self, timeout: float) -> Set[int]:
+        """Drain the readiness pipe (waiting up to ``timeout``) and return the pids read."""
+        readable, _, _ = select.select([self._ready_read], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._ready_read, 65536)
+        except BlockingIOError:
+            return set()
+        return {int(pid) for pid in data.split()}
+
+    def _retire(self, pids: List[int]) -> None:
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            self.children.pop(pid, None)
+            self.retiring[pid] = deadline
+            _signal(pid, signal.SIGTERM)
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.retiring.pop(pid, None) is not None:
+                continue
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status) if hasattr(os, "waitstatus_to_exitcode") else status
+            if code != 0:
+                logger.warning("Worker %d exited with status %s; restarting", pid, code)
+                if time.monotonic() - started < CRASH_BACKOFF_SECONDS:
+                    time.sleep(CRASH_BACKOFF_SECONDS)
+
+    def _spawn_missing(self) -> None:
+        while len(self.children) < self.workers:
+            pid = os.fork()
+            if pid == 0:  # pragma: no cover - runs in the child
+                self._run_worker()
+            self.children[pid] = time.monotonic()
+
+    def _kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now > deadline:
+                logger.warning("Worker %d did not stop within %.0fs; killing it", pid, self.graceful_timeout)
+                _signal(pid, signal.SIGKILL)
+                self.retiring[pid] = float("inf")
+
+    def _stop(self) -> None:
+        self._retire(list(self.children))
+        while self.retiring:
+            self._reap_retiring()
+            self._kill_overdue()
+            time.sleep(0.1)
+
+    def _reap_retiring(self) -> None:
+        for pid in list(self.retiring):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self.retiring.pop(pid, None)
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.uvicorn_options.get("backlog", 2048))
+        sock.set_inheritable(True)
+        return sock
+
+    def _load_app(self) -> Any:
+        module_name, _, attribute = self.app_path.partition(":")
+        return getattr(importlib.import_module(module_name), attribute or "app")
+
+    def _prepare_metrics_dir(self) -> None:
+        # Workers merge their METRICS through a shared directory; start it empty so
+        # snapshots left by a previous master are not counted (or folded) again.
+        if self.metrics_dir:
+            directory = Path(self.metrics_dir)
+            directory.mkdir(parents=True, exist_ok=True)
+            for stale in (*directory.glob("*.json"), *directory.glob("*.tmp")):
+                stale.unlink()
+        else:
+            directory = Path(tempfile.mkdtemp(prefix="pmvc-metrics-"))
+            self._owns_metrics_dir = True
+        self.metrics_dir = str(directory.resolve())
+        os.environ["PMVC_METRICS_DIR"] = self.metrics_dir
+
+    # -- worker ------------------------------------------------------------------------
+
+    def _run_worker(self) -> None:  # pragma: no cover - runs in the child
+        import asyncio
+
+        import uvicorn
+
+        code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            app = self.app if self.app is not None else self.app_path
+            options = {"log_level": "info", **self.uvicorn_options}
+            options.pop("backlog", None)
+            # Jitter keeps workers started together from recycling at the same moment.
+            max_requests = self.max_requests + random.randint(0, self.max_requests_jitter) if self.max_requests else None
+            config = uvicorn.Config(
+                app,
+                limit_max_requests=max_requests,
+                timeout_graceful_shutdown=self.graceful_timeout,
+                **options,
+            )
+            ready = self._ready_write
+
+            class Worker(uvicorn.Server):
+                async def startup(self, sockets: Any = None) -> None:
+                    await super().startup(sockets=sockets)
+                    os.write(ready, f"{os.getpid()}\n".encode())
+
+                async def shutdown(self, sockets: Any = None) -> None:
+                    # Stop accepting first, then give connections accepted a moment ago
+                    # time to send their request; uvicorn closes idle ones outright.
+                    for server in self.servers:
+                        server.close()
+                    await asyncio.sleep(ACCEPT_DRAIN_SECONDS)
+                    await super().shutdown(sockets=sockets)
+
+            Worker(config).run(sockets=[self.socket])
+        except BaseException:
+            logger.exception("Worker %d failed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+
+
+def _signal(pid: int, signum: int) -> None:
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
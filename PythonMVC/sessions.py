@@ -0,0 +1,266 @@
+"""Server-side sessions: the cookie carries an opaque id, the data lives in a cache backend."""
+
+from __future__ import annotations
+
+import json
+import re
+import secrets
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache import Cache, MemoryCache
+
+DEFAULT_SESSION_CONFIG = {
+    # "cookie" keeps Starlette's signed-cookie sessions; "memory" or "redis" (CACHE_URL) store them server-side.
+    "backend": "cookie",
+    "cookie_name": "session",
+    # Idle lifetime: a session unused this long expires in the store and in the browser.
+    "max_age": 14 * 24 * 3600,
+    # A session that is read but not changed has its TTL and cookie renewed at most this often.
+    "refresh_interval": 300.0,
+    "same_site": "lax",
+    "https_only": False,
+    "key_prefix": "pmvc:session:",
+}
+
+# token_urlsafe(32): 43 characters of [A-Za-z0-9_-].
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{43}$")
+
+_config: Dict[str, Any] = dict(DEFAULT_SESSION_CONFIG)
+
+
+class SessionNotLoaded(RuntimeError):
+    """A server-side session was used before ``await load_session(request)``."""
+
+
+def configure(settings: Any) -> None:
+    """Read ``SESSIONS`` (keys of :data:`DEFAULT_SESSION_CONFIG`) from the app settings."""
+    options = getattr(settings, "SESSIONS", None) or {}
+    unknown = set(options) - set(DEFAULT_SESSION_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown SESSIONS option(s): {', '.join(sorted(unknown))}")
+    _config.clear()
+    _config.update(DEFAULT_SESSION_CONFIG)
+    _config.update(options)
+    _config["cache_url"] = getattr(settings, "CACHE_URL", None)
+
+
+def server_side() -> bool:
+    return _config["backend"] != "cookie"
+
+
+def middleware_options() -> Dict[str, Any]:
+    """:class:`ServerSessionMiddleware` keyword arguments for the configured backend."""
+    kind = _config["backend"]
+    if kind == "memory":
+        store: Any = MemoryCache()
+    elif kind == "redis":
+        store = Cache(_config.get("cache_url"))
+    else:
+        raise ValueError(f"Unknown SESSIONS backend {kind!r}; use 'cookie', 'memory' or 'redis'")
+    names = ("cookie_name", "max_age", "refresh_interval", "same_site", "https_only", "key_prefix")
+    return {"store": store, **{name: _config[name] for name in names}}
+
+
+class ServerSession:
+    """Dict-like session data fetched from the store on :meth:`load`, not on every request.
+
+    Reading before loading raises :class:`SessionNotLoaded`; requests without a session
+    cookie load instantly, since there is nothing to fetch. Changes are tracked so the
+    store is only written when the data changed (or its TTL is due for renewal).
+    Mutating a stored value in place is not seen: assign it back, or set ``dirty``.
+    """
+
+    def __init__(self, store: Any, session_id: Optional[str], key_prefix: str, refresh_interval: float) -> None:
+        self.store = store
+        self.session_id = session_id
+        self.key_prefix = key_prefix
+        self.refresh_interval = refresh_interval
+        self.loaded = session_id is None
+        self.dirty = False
+        self._data: Dict[str, Any] = {}
+        self._refreshed_at = 0.0
+        self._stale_id: Optional[str] = None
+        # The browser holds an id that no longer names stored data.
+        self._cookie_stale = False
+
+    async def load(self) -> "ServerSession":
+        if not self.loaded:
+            raw = await self.store.get(self.key_prefix + self.session_id)
+            if raw is None:
+                # Expired or forged: start over under a fresh id.
+                self.session_id = None
+                self._cookie_stale = True
+            else:
+                stored = json.loads(raw)
+                self._data = stored["data"]
+                self._refreshed_at = stored["refreshed_at"]
+            self.loaded = True
+        return self
+
+    def regenerate(self) -> None:
+        """Move the data to a new id, e.g. on login, so a planted id becomes useless."""
+        self._require_loaded()
+        if self.session_id is not None:
+            self._stale_id = self.session_id
+        self.session_id = None
+        self.dirty = True
+
+    @property
+    def due_for_refresh(self) -> bool:
+        return self.loaded and self.session_id is not None and time.time() - self._refreshed_at >= self.refresh_interval
+
+    async def save(self, max_age: float) -> Optional[str]:
+        """Write the session back if needed; returns the cookie value to set, ``""`` to clear it."""
+        if self._stale_id is not None:
+            await self.store.delete(self.key_prefix + self._stale_id)
+            self._stale_id = None
+            self._cookie_stale = True
+        if not self.loaded:
+            return None
+        if not self._data:
+            if self.session_id is not None and self.dirty:
+                await self.store.delete(self.key_prefix + self.session_id)
+                self.session_id = None
+                self._cookie_stale = True
+            return "" if self._cookie_stale else None
+        if not (self.dirty or self.due_for_refresh):
+            return None
+        self.session_id = self.session_id or secrets.token_urlsafe(32)
+        self._refreshed_at = time.time()
+        payload = json.dumps({"data": self._data, "refreshed_at": self._refreshed_at}).encode()
+        await self.store.set(self.key_prefix + self.session_id, payload, ttl=max_age)
+        self.dirty = False
+        return self.session_id
+
+    def _require_loaded(self) -> None:
+        if not self.loaded:
+            raise SessionNotLoaded("Server-side sessions load lazily: `await load_session(request)` first")
+
+    def __getitem__(self, key: str) -> Any:
+        self._require_loaded()
+        return self._data[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._require_loaded()
+        self._data[key] = value
+        self.dirty = True
+
+    def __delitem__(self, key: str) -> None:
+        self._require_loaded()
+        del self._data[key]
+        self.dirty = True
+
+    def __contains__(self, key: object) -> bool:
+        self._require_loaded()
+        return key in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        self._require_loaded()
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        self._require_loaded()
+        return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self._require_loaded()
+        return self._data.get(key, default)
+
+    def pop(self, key: str, *default: Any) -> Any:
+        self._require_loaded()
+        self.dirty = self.dirty or key in self._data
+        return self._data.pop(key, *default)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self._data[key]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self._require_loaded()
+        self._data.update(*args, **kwargs)
+        self.dirty = True
+
+    def clear(self) -> None:
+        self._require_loaded()
+        self.dirty = self.dirty or bool(self._data)
+        self._data.clear()
+
+    def keys(self) -> Any:
+        self._require_loaded()
+        return self._data.keys()
+
+    def items(self) -> Any:
+        self._require_loaded()
+        return self._data.items()
+
+    def values(self) -> Any:
+        self._require_loaded()
+        return self._data.values()
+
+
+class ServerSessionMiddleware:
+    """Drop-in for Starlette's ``SessionMiddleware`` that keeps only an id in the cookie.
+
+    ``scope["session"]`` is a :class:`ServerSession`; nothing is fetched until a handler
+    awaits :func:`load_session`. When the response starts, the session is written back
+    only if it changed, or if it was read and its sliding TTL is older than
+    ``refresh_interval``; only then is a ``Set-Cookie`` sent.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: Any,
+        cookie_name: str = "session",
+        max_age: int = 14 * 24 * 3600,
+        refresh_interval: float = 300.0,
+        same_site: str = "lax",
+        https_only: bool = False,
+        key_prefix: str = "pmvc:session:",
+        path: str = "/",
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.cookie_name = cookie_name
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self.key_prefix = key_prefix
+        flags = f"path={path}; httponly; samesite={same_site}"
+        self.security_flags = flags + ("; secure" if https_only else "")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        session_id = HTTPConnection(scope).cookies.get(self.cookie_name)
+        if session_id is not None and not _SESSION_ID.match(session_id):
+            session_id = None
+        session = ServerSession(self.store, session_id, self.key_prefix, self.refresh_interval)
+        scope["session"] = session
+
+        async def send_with_session(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                value = await session.save(self.max_age)
+                if value is not None:
+                    headers = MutableHeaders(scope=message)
+                    max_age = f"Max-Age={self.max_age}" if value else "expires=Thu, 01 Jan 1970 00:00:00 GMT"
+                    cookie = f"{self.cookie_name}={value or 'null'}; {max_age}; {self.security_flags}"
+                    headers.append("Set-Cookie", cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_with_session)
+
+
+async def load_session(connection: HTTPConnection) -> Any:
+    """The request's session, fetched from the store on first use (cookie sessions as they are)."""
+    session = connection.scope["session"]
+    if isinstance(session, ServerSession):
+        await session.load()
+    return session
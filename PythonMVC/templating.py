@@ -0,0 +1,95 @@
+"""Shared, app-scoped Jinja environments."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from starlette.templating import Jinja2Templates
+
+from .assets import asset_url
+
+DEFAULT_TEMPLATES_DIR = "app/views"
+DEFAULT_TEMPLATE_CACHE_DIR = "tmp/templates"
+
+# Until create_app configures them, environments reload templates and skip the bytecode cache.
+_options: Dict[str, Any] = {"cache_dir": None, "auto_reload": True}
+_templates: Dict[str, Jinja2Templates] = {}
+_async_environments: Dict[str, Environment] = {}
+
+
+def configure(settings: Any) -> None:
+    """Apply ``TEMPLATE_CACHE_DIR`` and ``DEBUG`` to every environment built from now on.
+
+    With ``DEBUG`` off, templates are never re-stat'ed once loaded.
+    """
+    _options["cache_dir"] = getattr(settings, "TEMPLATE_CACHE_DIR", DEFAULT_TEMPLATE_CACHE_DIR)
+    _options["auto_reload"] = bool(getattr(settings, "DEBUG", False))
+    _templates.clear()
+    _async_environments.clear()
+
+
+def build_environment(
+    directory: str = DEFAULT_TEMPLATES_DIR,
+    cache_dir: Optional[str] = None,
+    auto_reload: bool = True,
+    enable_async: bool = False,
+) -> Environment:
+    bytecode_cache = None
+    if cache_dir:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    return Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=True,
+        auto_reload=auto_reload,
+        bytecode_cache=bytecode_cache,
+        cache_size=-1,
+        enable_async=enable_async,
+    )
+
+
+def get_templates(directory: str = DEFAULT_TEMPLATES_DIR) -> Jinja2Templates:
+    """Return the process-wide templates object for ``directory``, creating it once."""
+    templates = _templates.get(directory)
+    if templates is None:
+        env = build_environment(directory, _options["cache_dir"], _options["auto_reload"])
+        env.globals["asset_url"] = asset_url
+        templates = _templates[directory] = Jinja2Templates(env=env)
+    return templates
+
+
+def get_async_environment(directory: str = DEFAULT_TEMPLATES_DIR) -> Environment:
+    """Async-enabled twin of :func:`get_templates` used for streaming renders.
+
+    It shares globals and filters with the sync environment, so ``url_for`` and any
+    helpers registered there are available to streamed templates too.
+    """
+    env = _async_environments.get(directory)
+    if env is None:
+        sync_env = get_templates(directory).env
+        env = build_environment(directory, _async_cache_dir(_options["cache_dir"]), _options["auto_reload"], enable_async=True)
+        env.globals = sync_env.globals
+        env.filters = sync_env.filters
+        _async_environments[directory] = env
+    return env
+
+
+def compile_templates(directory: str = DEFAULT_TEMPLATES_DIR, cache_dir: str = DEFAULT_TEMPLATE_CACHE_DIR) -> int:
+    """Load every template under ``directory`` so its bytecode lands in ``cache_dir``.
+
+    Both the sync and the streaming (async) variants are compiled.
+    """
+    sync_env = build_environment(directory, cache_dir, auto_reload=False)
+    async_env = build_environment(directory, _async_cache_dir(cache_dir), auto_reload=False, enable_async=True)
+    names = sync_env.list_templates()
+    for name in names:
+        sync_env.get_template(name)
+        async_env.get_template(name)
+    return len(names)
+
+
+def _async_cache_dir(cache_dir: Optional[str]) -> Optional[str]:
+    # Async templates compile to different code, so they need their own bytecode files.
+    return str(Path(cache_dir) / "async") if cache_dir else None
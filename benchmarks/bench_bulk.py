@@ -0,0 +1,71 @@
+"""Bulk write and batched-iteration APIs against the row-at-a-time baseline on SQLite.
+
+Run with ``python benchmarks/bench_bulk.py [rows]``.
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from PythonMVC import model
+from PythonMVC.model import BaseModel, db_session
+
+
+class Item(BaseModel):
+    __tablename__ = "bench_items"
+    code: Mapped[str] = mapped_column(String(32), unique=True)
+    qty: Mapped[int] = mapped_column()
+
+
+def timed(label: str, fn) -> None:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<38} {elapsed:8.3f}s")
+
+
+def main(rows: int) -> None:
+    workdir = Path(tempfile.mkdtemp())
+
+    class Settings:
+        DATABASE_URL = f"sqlite:///{workdir / 'bench.db'}"
+
+    model.configure(Settings())
+    engine = BaseModel.engine()
+
+    def reset() -> None:
+        Item.__table__.drop(engine, checkfirst=True)
+        Item.__table__.create(engine)
+
+    def row_at_a_time() -> None:
+        with db_session() as session:
+            for i in range(rows):
+                session.add(Item(code=f"c{i}", qty=i))
+                session.commit()
+
+    def orm_single_commit() -> None:
+        with db_session() as session:
+            for i in range(rows):
+                session.add(Item(code=f"c{i}", qty=i))
+            session.commit()
+
+    data = [{"code": f"c{i}", "qty": i} for i in range(rows)]
+
+    reset()
+    timed(f"session.add + commit per row ({rows})", row_at_a_time)
+    reset()
+    timed(f"session.add, one commit ({rows})", orm_single_commit)
+    reset()
+    timed(f"bulk_insert ({rows})", lambda: Item.bulk_insert(data))
+    timed(f"upsert, all conflicting ({rows})", lambda: Item.upsert(data, conflict_cols=["code"]))
+    timed(f"iter_batches ({rows})", lambda: sum(len(batch) for batch in Item.iter_batches(size=1000)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000)
@@ -0,0 +1,39 @@
+"""Requests per second through the default ``create_app`` middleware stack.
+
+Run with ``python benchmarks/bench_middleware.py [requests]``; the app is driven in-process
+through an ASGI transport so the numbers reflect framework overhead only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+
+import httpx
+
+from PythonMVC import create_app
+
+
+class Settings:
+    DEBUG = False
+    SECRET_KEY = "bench"
+    SECURITY = {"rate_limit": 0}
+
+
+async def run(requests: int) -> float:
+    app = create_app(Settings())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get("/health")
+        started = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/health")
+        elapsed = time.perf_counter() - started
+    return requests / elapsed
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    print(f"GET /health: {asyncio.run(run(total)):.0f} req/s over {total} requests")
@@ -0,0 +1,59 @@
+"""Dispatch cost of Starlette's linear ``Router`` against ``CompiledRouter`` as resources grow.
+
+Run with ``python benchmarks/bench_routing.py [iterations]``. Each request goes straight to
+the router (no middleware); endpoints return a prebuilt response, so the numbers are
+route resolution plus a minimal ASGI response.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+
+from starlette.responses import PlainTextResponse
+from starlette.routing import Router
+
+from PythonMVC.router import CompiledRouter, resource
+
+RESPONSE = PlainTextResponse("ok")
+
+
+class Controller:
+    def __getattr__(self, action: str):
+        async def endpoint(request):
+            return RESPONSE
+
+        return endpoint
+
+
+async def dispatch(router: Router, method: str, path: str, iterations: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        scope = {"type": "http", "method": method, "path": path, "root_path": "", "query_string": b"", "headers": []}
+        await router(scope, receive, send)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main(iterations: int) -> None:
+    print(f"{'resources':>9} {'request':<28} {'linear':>10} {'compiled':>10}")
+    for count in (10, 50, 150, 300):
+        routes = []
+        for number in range(count):
+            routes += resource(f"things{number}", Controller)
+        linear, compiled = Router(routes), CompiledRouter(routes)
+        last = f"things{count - 1}"
+        for method, path in (("GET", "/things0/1"), ("DELETE", f"/{last}/1"), ("GET", "/missing/1")):
+            before = await dispatch(linear, method, path, iterations)
+            after = await dispatch(compiled, method, path, iterations)
+            print(f"{count:>9} {method + ' ' + path:<28} {before:>8.1f}us {after:>8.1f}us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000))
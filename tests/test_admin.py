@@ -0,0 +1,113 @@
+import re
+
+import pytest
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+from starlette.testclient import TestClient
+
+from PythonMVC import create_app, model, templating
+from PythonMVC.cli._utils import write_files
+from PythonMVC.cli.scaffold_templates import POSTS_VIEWS, PROJECT_SKELETON
+from PythonMVC.model import BaseModel, db_session
+
+
+class Widget(BaseModel):
+    __tablename__ = "admin_test_widgets"
+    name: Mapped[str] = mapped_column(String(50), index=True)
+    notes: Mapped[str] = mapped_column(String(255))
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_files(tmp_path, {**PROJECT_SKELETON, **POSTS_VIEWS})
+
+    class Settings:
+        SECRET_KEY = "test"
+        DATABASE_URL = f"sqlite:///{tmp_path / 'admin.db'}"
+        TEMPLATE_CACHE_DIR = str(tmp_path / "templates")
+        ADMIN = {"authorize": lambda request: request.headers.get("x-admin") == "yes"}
+        SECURITY = {"rate_limit": 0}
+
+    app = create_app(Settings())
+    BaseModel.metadata.create_all(model.BaseModel.engine(), tables=[Widget.__table__])
+    with db_session() as session:
+        session.add_all([Widget(name=f"w{i:03}", notes="n") for i in range(120)])
+        session.commit()
+    yield TestClient(app, headers={"x-admin": "yes"})
+    model.configure(object())
+    templating.configure(type("Defaults", (), {"DEBUG": True, "TEMPLATE_CACHE_DIR": None})())
+
+
+def test_keyset_pages_walk_the_table(client) -> None:
+    seen = []
+    url = "/admin/admin_test_widgets?sort=name&dir=asc"
+    while url:
+        page = client.get(url)
+        assert page.status_code == 200
+        assert "<td>n</td>" not in page.text  # only key + indexed columns are projected
+        seen += re.findall(r"<td>(w\d+)</td>", page.text)
+        cursor = re.search(r'after=([\w-]+)"', page.text)
+        url = f"/admin/admin_test_widgets?sort=name&dir=asc&after={cursor.group(1)}" if cursor else None
+    assert seen == [f"w{i:03}" for i in range(120)]
+
+
+def test_export_streams_every_row(client) -> None:
+    csv_body = client.get("/admin/admin_test_widgets/export.csv").text.splitlines()
+    assert "name" in csv_body[0].split(",")
+    assert len(csv_body) == 121
+    ndjson = client.get("/admin/admin_test_widgets/export.ndjson").text.splitlines()
+    assert len(ndjson) == 120
+
+
+def test_unindexed_sort_is_rejected(client) -> None:
+    assert client.get("/admin/admin_test_widgets?sort=notes").status_code == 400
+
+
+def test_admin_is_opt_in_and_refuses_without_authorization(client, tmp_path) -> None:
+    anonymous = TestClient(client.app)
+    assert anonymous.get("/admin/admin_test_widgets").status_code == 403
+    assert anonymous.get("/admin/admin_test_widgets/export.csv").status_code == 403
+    assert anonymous.post("/admin/admin_test_widgets/1/delete").status_code == 403
+
+    class Settings:
+        SECRET_KEY = "test"
+        DATABASE_URL = f"sqlite:///{tmp_path / 'admin.db'}"
+        TEMPLATE_CACHE_DIR = str(tmp_path / "templates")
+        SECURITY = {"rate_limit": 0}
+
+    assert TestClient(create_app(Settings())).get("/admin").status_code == 404
+    Settings.ADMIN = True  # enabled, but no authorize callable: nobody gets in
+    assert TestClient(create_app(Settings())).get("/admin/admin_test_widgets").status_code == 403
+    Settings.ADMIN = {"auth": None}
+    with pytest.raises(ValueError):
+        create_app(Settings())
+
+
+def test_authorize_can_read_server_side_sessions(client, tmp_path) -> None:
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+
+    from PythonMVC import sessions
+    from PythonMVC.sessions import load_session
+
+    async def login(request):
+        (await load_session(request))["is_admin"] = True
+        return PlainTextResponse("ok")
+
+    class Settings:
+        SECRET_KEY = "test"
+        DATABASE_URL = f"sqlite:///{tmp_path / 'admin.db'}"
+        TEMPLATE_CACHE_DIR = str(tmp_path / "templates")
+        SECURITY = {"rate_limit": 0}
+        SESSIONS = {"backend": "memory"}
+        ADMIN = {"authorize": lambda request: request.session.get("is_admin")}
+        ROUTES = [Route("/login", login)]
+
+    try:
+        browser = TestClient(create_app(Settings()))
+        assert browser.get("/admin/admin_test_widgets").status_code == 403
+        browser.get("/login")
+        assert browser.get("/admin/admin_test_widgets").status_code == 200
+    finally:
+        sessions.configure(object())
@@ -0,0 +1,127 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Date, Numeric, String, Text, event
+from sqlalchemy.orm import Mapped, mapped_column
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.testclient import TestClient
+
+from PythonMVC import model, templating
+from PythonMVC.api import serializer_for
+from PythonMVC.cli._utils import write_files
+from PythonMVC.cli.scaffold_templates import POSTS_VIEWS, PROJECT_SKELETON
+from PythonMVC.controller import BaseController
+from PythonMVC.model import BaseModel, db_session
+from PythonMVC.router import ControllerFactoryError, resource
+
+
+class Gadget(BaseModel):
+    __tablename__ = "api_test_gadgets"
+    name: Mapped[str] = mapped_column(String(50))
+    price: Mapped[Decimal] = mapped_column(Numeric(10, 2))
+    released: Mapped[date] = mapped_column(Date())
+    manual: Mapped[str] = mapped_column(Text())
+
+
+class GadgetsController(BaseController):
+    model = Gadget
+    api_fields = ["id", "name", "price", "released", "manual"]
+
+    async def index(self, request):
+        return self.render(request, "shared/placeholder.html", {"action": "index"})
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_files(tmp_path, {**PROJECT_SKELETON, **POSTS_VIEWS})
+
+    class Settings:
+        DATABASE_URL = f"sqlite:///{tmp_path / 'api.db'}"
+
+    model.configure(Settings())
+    BaseModel.metadata.create_all(BaseModel.engine(), tables=[Gadget.__table__])
+    with db_session() as session:
+        session.add_all(
+            Gadget(name=f"g{number}", price=Decimal("9.99"), released=date(2024, 1, number + 1), manual="m" * 500)
+            for number in range(5)
+        )
+        session.commit()
+    yield TestClient(Starlette(routes=resource("gadgets", GadgetsController)))
+    model.configure(object())
+    templating.configure(type("Defaults", (), {"DEBUG": True, "TEMPLATE_CACHE_DIR": None})())
+
+
+def test_accept_header_picks_html_json_or_ndjson(client) -> None:
+    browser = client.get("/gadgets", headers={"accept": "text/html,application/xhtml+xml,*/*;q=0.8"})
+    assert browser.headers["content-type"].startswith("text/html")
+    assert browser.headers["vary"] == "Accept"
+    assert client.get("/gadgets", headers={"accept": "*/*"}).headers["content-type"].startswith("text/html")
+
+    response = client.get("/gadgets", headers={"accept": "application/json"})
+    assert response.headers["content-type"] == "application/json"
+    rows = response.json()
+    assert [row["name"] for row in rows] == ["g0", "g1", "g2", "g3", "g4"]
+    assert rows[0] == {"id": 1, "name": "g0", "price": "9.99", "released": "2024-01-01", "manual": "m" * 500}
+
+    lines = client.get("/gadgets", headers={"accept": "application/x-ndjson"}).text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3, 4, 5]
+
+    assert client.get("/gadgets/2", headers={"accept": "application/json"}).json()["name"] == "g1"
+    assert client.get("/gadgets/99", headers={"accept": "application/json"}).status_code == 404
+
+
+def test_fields_are_projected_in_sql(client) -> None:
+    statements = []
+    engine = BaseModel.async_engine().sync_engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        rows = client.get("/gadgets?fields=name", headers={"accept": "application/json"}).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert rows[0] == {"id": 1, "name": "g0"}
+    assert "manual" not in statements[-1] and "price" not in statements[-1]
+
+    unknown = client.get("/gadgets?fields=name,created_at", headers={"accept": "application/json"})
+    assert unknown.status_code == 400
+    assert serializer_for(Gadget, ["id", "name"]) is serializer_for(Gadget, ["id", "name"])
+
+
+def test_collection_is_served_in_keyset_pages(client) -> None:
+    GadgetsController.api_per_page = 2
+    try:
+        first = client.get("/gadgets?fields=name", headers={"accept": "application/json"})
+        assert [row["id"] for row in first.json()] == [1, 2]
+        assert first.headers["link"] == '<http://testserver/gadgets?fields=name&after=2>; rel="next"'
+        lines = client.get("/gadgets?after=2", headers={"accept": "application/x-ndjson"}).text.splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [3, 4]
+        last = client.get("/gadgets?after=2&per_page=10", headers={"accept": "application/json"})
+        assert [row["id"] for row in last.json()] == [3, 4, 5] and "link" not in last.headers
+        assert client.get("/gadgets?per_page=x", headers={"accept": "application/json"}).status_code == 400
+    finally:
+        del GadgetsController.api_per_page
+
+
+def test_api_needs_its_fields_listed_and_runs_through_api_statement(client) -> None:
+    class Unlisted(BaseController):
+        model = Gadget
+
+    with pytest.raises(ControllerFactoryError):
+        resource("unlisted", Unlisted)
+    assert Unlisted()._exposed_fields() == ["id"]
+
+    class Scoped(GadgetsController):
+        async def api_statement(self, request, statement):
+            if request.headers.get("x-user") is None:
+                raise HTTPException(status_code=403)
+            return statement.where(Gadget.name != "g1")
+
+    scoped = TestClient(Starlette(routes=resource("gadgets", Scoped)))
+    headers = {"accept": "application/json", "x-user": "ada"}
+    assert [row["name"] for row in scoped.get("/gadgets", headers=headers).json()] == ["g0", "g2", "g3", "g4"]
+    assert scoped.get("/gadgets/2", headers=headers).status_code == 404
+    assert scoped.get("/gadgets/1", headers={"accept": "application/json"}).status_code == 403
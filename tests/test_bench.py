@@ -0,0 +1,44 @@
+import os
+
+from PythonMVC.cli.bench import compare, percentile, run_suite
+
+
+def test_percentile_is_nearest_rank() -> None:
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 0.50) == 50.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_compare_flags_slower_scenarios() -> None:
+    baseline = {"scenarios": {"show": {"rps": 1000.0, "p95_ms": 2.0, "errors": 0}}}
+    faster = {"scenarios": {"show": {"rps": 950.0, "p95_ms": 2.1, "errors": 0}}}
+    slower = {"scenarios": {"show": {"rps": 700.0, "p95_ms": 3.0, "errors": 1}}}
+    assert compare(faster, baseline, threshold=0.1) == []
+    assert len(compare(slower, baseline, threshold=0.1)) == 3
+
+
+def test_run_suite_against_generated_app(tmp_path, monkeypatch) -> None:
+    from sqlalchemy import create_engine, inspect
+
+    from PythonMVC import instrumentation, model, query_cache, templating
+
+    # Exported database settings must not send the throwaway app's writes elsewhere.
+    production = tmp_path / "production.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{production}")
+    monkeypatch.setenv("DATABASE_ASYNC_URL", f"sqlite+aiosqlite:///{production}")
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", f"sqlite:///{tmp_path / 'replica.db'}")
+    try:
+        results = run_suite(requests=5, concurrency=2, seed=5, scenarios=("show", "create"))
+    finally:
+        # The generated app configured the process-wide engine and hooks.
+        for module in (instrumentation, query_cache, model):
+            module.configure(object())
+        templating.configure(type("Defaults", (), {"DEBUG": True, "TEMPLATE_CACHE_DIR": None})())
+    assert list(results["scenarios"]) == ["show", "create"]
+    for stats in results["scenarios"].values():
+        assert stats["errors"] == 0
+        assert stats["rps"] > 0
+    assert os.environ["DATABASE_URL"] == f"sqlite:///{production}"
+    assert not production.exists() or inspect(create_engine(f"sqlite:///{production}")).get_table_names() == []
+    assert not (tmp_path / "replica.db").exists()
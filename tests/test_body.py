@@ -0,0 +1,105 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from PythonMVC import body
+from PythonMVC.body import RequestBodyMiddleware, read_form, read_json
+from PythonMVC.security import SecurityMiddleware
+
+
+async def echo(request: Request) -> JSONResponse:
+    if request.headers.get("content-type", "").startswith("application/json"):
+        return JSONResponse(await read_json(request))
+    form = await read_form(request)
+    upload = form.get("upload")
+    return JSONResponse(
+        {
+            "title": form.get("title"),
+            "size": len(await upload.read()) if upload else None,
+            "on_disk": upload.file._rolled if upload else None,
+            "same": form is await read_form(Request(request.scope, request.receive)),
+        }
+    )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    class Settings:
+        REQUEST_BODY = {"max_body_size": 64 * 1024, "max_field_size": 1024, "spool_max_size": 4096}
+
+    body.configure(Settings())
+    parses = []
+    parse_form = body._parse_form
+
+    async def counted(headers, stream):
+        parses.append(headers.get("content-type"))
+        return await parse_form(headers, stream)
+
+    monkeypatch.setattr(body, "_parse_form", counted)
+    app = Starlette(routes=[Route("/echo", echo, methods=["GET", "POST"])])
+    app.add_middleware(SecurityMiddleware, config={"secret": "s", "rate_limit": 0})
+    app.add_middleware(RequestBodyMiddleware)
+    test_client = TestClient(app)
+    test_client.token = test_client.get("/echo").headers["x-csrf-token"]
+    parses.clear()
+    test_client.parses = parses
+    yield test_client
+    body.configure(object())
+
+
+def test_csrf_and_controller_share_one_parse(client) -> None:
+    response = client.post("/echo", data={"title": "hi", "_csrf": client.token})
+    assert response.json() == {"title": "hi", "size": None, "on_disk": None, "same": True}
+    assert len(client.parses) == 1
+
+
+def test_multipart_uploads_spool_to_disk(client) -> None:
+    files = {"upload": ("big.bin", b"x" * 10_000, "application/octet-stream")}
+    response = client.post("/echo", data={"title": "file", "_csrf": client.token}, files=files)
+    assert response.json() == {"title": "file", "size": 10_000, "on_disk": True, "same": True}
+    assert len(client.parses) == 1
+
+
+def test_header_token_leaves_body_to_the_controller(client) -> None:
+    response = client.post("/echo", json={"a": 1}, headers={"x-csrf-token": client.token})
+    assert response.json() == {"a": 1}
+    response = client.post("/echo", data={"title": "t"}, headers={"x-csrf-token": client.token})
+    assert response.json()["title"] == "t"
+    assert len(client.parses) == 1
+
+
+def test_size_limits(client) -> None:
+    too_big = b"x" * (65 * 1024)
+    assert client.post("/echo", content=too_big, headers={"x-csrf-token": client.token}).status_code == 413
+
+    def chunked():
+        for _ in range(65):
+            yield b"x" * 1024
+
+    response = client.post(
+        "/echo",
+        content=chunked(),
+        headers={"x-csrf-token": client.token, "content-type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 413
+    # Same, but read by the CSRF check rather than the controller.
+    response = client.post("/echo", content=chunked(), headers={"content-type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 413
+    response = client.post("/echo", data={"title": "x" * 2048, "_csrf": client.token})
+    assert response.status_code == 400
+
+
+def test_urlencoded_limits_without_parser_support(client, monkeypatch) -> None:
+    # Older Starlette releases construct FormParser(headers, stream) only.
+    parser_class = body.FormParser
+    monkeypatch.setattr(body, "_FORM_PARSER_LIMITS", False)
+    monkeypatch.setattr(body, "FormParser", lambda headers, stream: parser_class(headers, stream))
+    response = client.post("/echo", data={"title": "t", "_csrf": client.token})
+    assert response.status_code == 200 and response.json()["title"] == "t"
+    assert client.post("/echo", data={"title": "x" * 2048, "_csrf": client.token}).status_code == 400
+    monkeypatch.setitem(body._config, "max_fields", 3)
+    fields = {f"f{number}": "v" for number in range(3)}
+    assert client.post("/echo", data={**fields, "_csrf": client.token}).status_code == 400
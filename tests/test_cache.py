@@ -0,0 +1,136 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from PythonMVC.cache import MemoryCache, Uncacheable, cached, get_or_compute, invalidate
+
+
+def test_cached_function_single_flight() -> None:
+    backend = MemoryCache()
+    calls = []
+
+    @cached(ttl=30, namespace="users", backend=backend)
+    async def load(user_id: int) -> dict:
+        calls.append(user_id)
+        await asyncio.sleep(0.01)
+        return {"id": user_id}
+
+    async def run() -> list:
+        results = await asyncio.gather(*(load(1) for _ in range(50)))
+        await load(1)
+        await invalidate("users", backend)
+        await load(1)
+        return results
+
+    results = asyncio.run(run())
+    assert all(result == {"id": 1} for result in results)
+    assert calls == [1, 1]
+
+
+def test_cached_action_keys_on_path_and_selected_query() -> None:
+    backend = MemoryCache()
+    calls = []
+
+    class PostsController:
+        @cached(ttl=30, namespace="posts", query=["page"], backend=backend)
+        async def show(self, request: Request) -> PlainTextResponse:
+            calls.append(dict(request.query_params))
+            return PlainTextResponse(f"post {request.path_params['id']}")
+
+    controller = PostsController()
+    client = TestClient(Starlette(routes=[Route("/posts/{id}", controller.show, name="posts.show")]))
+    assert client.get("/posts/1?page=1&utm=a").text == "post 1"
+    assert client.get("/posts/1?page=1&utm=b").text == "post 1"
+    assert client.get("/posts/2?page=1").text == "post 2"
+    assert len(calls) == 2
+
+
+def test_uncacheable_results_are_not_shared_with_waiters() -> None:
+    backend = MemoryCache()
+    calls = []
+
+    async def compute() -> object:
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        raise Uncacheable(object())
+
+    async def call() -> object:
+        try:
+            return await get_or_compute(backend, "error-page", compute, ttl=30)
+        except Uncacheable as exc:
+            return exc.value
+
+    async def run() -> list:
+        return await asyncio.gather(*(call() for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 5
+    assert len({id(result) for result in results}) == 5
+    assert backend._data == {}
+
+
+def test_lock_is_released_only_by_its_owner() -> None:
+    backend = MemoryCache()
+    now = [0.0]
+    backend.clock = lambda: now[0]
+
+    async def slow() -> str:
+        now[0] += 20  # outlives lock_timeout; another process takes the lock meanwhile
+        await backend.set("report:lock", b"other", ttl=10, nx=True)
+        return "value"
+
+    assert asyncio.run(get_or_compute(backend, "report", slow, ttl=60, lock_timeout=10)) == "value"
+    assert asyncio.run(backend.get("report:lock")) == b"other"
+
+
+def test_tiered_cache_serves_l1_and_invalidates_peers() -> None:
+    from PythonMVC.cache import TieredCache
+
+    async def run() -> None:
+        shared = MemoryCache()
+        worker_a, worker_b = TieredCache(shared), TieredCache(shared)
+        await worker_a.set("menu", b"v1", ttl=60)
+        assert await worker_b.get("menu") == b"v1"
+        assert await worker_b.get("menu") == b"v1"
+        assert worker_b.stats()["l1"]["hits"] == 1
+        assert worker_b.stats()["l2"]["hits"] == 1
+        await asyncio.sleep(0)  # let the listeners subscribe
+
+        await worker_a.set("menu", b"v2", ttl=60)
+        await asyncio.sleep(0)
+        assert await worker_b.get("menu") == b"v2"
+        await worker_a.close()
+        await worker_b.close()
+
+    asyncio.run(run())
+
+
+def test_lru_cache_is_bounded_by_bytes() -> None:
+    from PythonMVC.cache import LRUCache
+
+    lru = LRUCache(max_bytes=100)
+    for i in range(10):
+        lru.set(f"k{i}", b"x" * 20, ttl=60)
+    assert lru.size <= 100
+    assert lru.get("k0") is None
+    assert lru.get("k9") == b"x" * 20
+    assert lru.stats()["evictions"] == 6
+
+
+def test_memory_cache_sweeps_keys_nobody_reads_again() -> None:
+    now = [0.0]
+    cache = MemoryCache(clock=lambda: now[0], sweep_interval=10)
+
+    async def run() -> None:
+        for number in range(100):
+            await cache.set(f"session:{number}", b"data", ttl=5)
+        await cache.set("kept", b"data")
+        now[0] = 11
+        await cache.set("fresh", b"data", ttl=5)
+
+    asyncio.run(run())
+    assert sorted(cache._data) == ["fresh", "kept"]
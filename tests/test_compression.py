@@ -0,0 +1,108 @@
+import gzip
+import json
+import zlib
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+from PythonMVC import assets
+from PythonMVC.assets import PrecompressedStaticFiles, asset_url, precompile
+from PythonMVC.compression import CompressionMiddleware
+
+PAGE = "<p>hello</p>" * 200
+
+
+async def page(request: Request) -> Response:
+    return Response(PAGE, media_type="text/html", headers={"etag": '"abc"'})
+
+
+async def tiny(request: Request) -> PlainTextResponse:
+    return PlainTextResponse("short")
+
+
+async def image(request: Request) -> Response:
+    return Response(b"\x89PNG" * 500, media_type="image/png")
+
+
+async def stream(request: Request) -> StreamingResponse:
+    async def rows():
+        for number in range(3):
+            yield json.dumps({"n": number}) + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+def make_client(static_dir=None) -> TestClient:
+    routes = [Route("/page", page), Route("/tiny", tiny), Route("/image", image), Route("/stream", stream)]
+    if static_dir:
+        routes.append(Mount("/static", PrecompressedStaticFiles(directory=static_dir), name="static"))
+    app = Starlette(routes=routes)
+    app.add_middleware(CompressionMiddleware, brotli=False)
+    return TestClient(app)
+
+
+def test_compresses_allowlisted_responses_above_minimum_size() -> None:
+    client = make_client()
+    response = client.get("/page", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert int(response.headers["content-length"]) < len(PAGE) / 10
+    assert response.text == PAGE
+
+    assert "content-encoding" not in client.get("/tiny", headers={"accept-encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/image", headers={"accept-encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/page", headers={"accept-encoding": "gzip;q=0, identity"}).headers
+
+
+def test_streaming_responses_are_flushed_chunk_by_chunk() -> None:
+    client = make_client()
+    with client.stream("GET", "/stream", headers={"accept-encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    # Each chunk ends in a sync flush, so the first row decodes without the rest.
+    first_chunk = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(raw[: raw.index(b"\x00\x00\xff\xff") + 4])
+    assert first_chunk == b'{"n": 0}\n'
+    assert gzip.decompress(raw).count(b"\n") == 3
+
+
+def test_precompiled_assets_are_fingerprinted_and_served_precompressed(tmp_path) -> None:
+    static = tmp_path / "public"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "app.css").write_text("body { color: red; }\n" * 100)
+    (static / "logo.png").write_bytes(b"\x89PNG")
+
+    manifest = precompile(str(static))
+    fingerprinted = manifest["css/app.css"]
+    assert fingerprinted.startswith("css/app-") and fingerprinted.endswith(".css")
+    assert (static / "assets" / (fingerprinted + ".gz")).exists()
+    assert not (static / "assets" / (manifest["logo.png"] + ".gz")).exists()
+    assert precompile(str(static)) == manifest
+
+    class Settings:
+        STATIC_DIR = str(static)
+
+    assets.configure(Settings())
+    try:
+        url = asset_url("css/app.css")
+        assert url == f"/static/assets/{fingerprinted}"
+        assert asset_url("missing.js") == "/static/missing.js"
+
+        client = make_client(str(static))
+        response = client.get(url, headers={"accept-encoding": "gzip, br"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-type"].startswith("text/css")
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert response.text == (static / "css" / "app.css").read_text()
+        assert client.get(url, headers={"if-none-match": response.headers["etag"]}).status_code == 304
+
+        plain = client.get(url, headers={"accept-encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert "immutable" not in client.get("/static/css/app.css").headers.get("cache-control", "")
+    finally:
+        assets.configure(object())
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from PythonMVC.conditional import cache_control
+from PythonMVC.controller import BaseController
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Article(Base):
+    __tablename__ = "articles"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    title: Mapped[str] = mapped_column(String(50))
+    updated_at: Mapped[datetime] = mapped_column(DateTime())
+
+
+def make_client(tmp_path, article: Article, renders: list) -> TestClient:
+    (tmp_path / "show.html").write_text("{{ tick() }}{{ article.title }}")
+
+    class ArticlesController(BaseController):
+        @cache_control(private=True, max_age=0)
+        async def show(self, request: Request):
+            return self.render(request, "show.html", {"article": article}, fresh_when=article)
+
+    controller = ArticlesController(templates_dir=str(tmp_path))
+    controller.templates.env.globals["tick"] = lambda: renders.append(1) or ""
+    return TestClient(Starlette(routes=[Route("/a", controller.show)]))
+
+
+def test_matching_etag_returns_304_without_rendering(tmp_path) -> None:
+    article = Article(id=1, title="Hello", updated_at=datetime(2024, 5, 1, 12, 0, 0))
+    renders: list = []
+    client = make_client(tmp_path, article, renders)
+
+    first = client.get("/a")
+    assert first.status_code == 200
+    assert first.headers["last-modified"] == "Wed, 01 May 2024 12:00:00 GMT"
+    assert first.headers["cache-control"] == "private, max-age=0"
+
+    second = client.get("/a", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
+    assert second.headers["cache-control"] == "private, max-age=0"
+    assert len(renders) == 1
+
+    since = client.get("/a", headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert since.status_code == 304
+
+    article.title = "Changed"
+    assert client.get("/a", headers={"If-None-Match": first.headers["etag"]}).status_code == 200
@@ -0,0 +1,57 @@
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from PythonMVC.db import DBSessionMiddleware
+
+
+class FakeSession:
+    def __init__(self, log: list) -> None:
+        self.log = log
+
+    async def execute(self, statement):
+        self.log.append("execute")
+
+    async def commit(self) -> None:
+        self.log.append("commit")
+
+    async def rollback(self) -> None:
+        self.log.append("rollback")
+
+    async def close(self) -> None:
+        self.log.append("close")
+
+
+def make_client(log: list) -> TestClient:
+    async def touch(request: Request) -> PlainTextResponse:
+        await request.state.db.execute(text("select 1"))
+        await request.state.db.execute(text("select 1"))
+        return PlainTextResponse("ok", status_code=int(request.query_params.get("status", 200)))
+
+    async def idle(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/touch", touch), Route("/idle", idle)])
+    app.add_middleware(DBSessionMiddleware, factory=lambda: FakeSession(log))
+    return TestClient(app)
+
+
+def test_session_is_shared_and_committed() -> None:
+    log: list = []
+    make_client(log).get("/touch")
+    assert log == ["execute", "execute", "commit", "close"]
+
+
+def test_error_status_rolls_back() -> None:
+    log: list = []
+    make_client(log).get("/touch?status=422")
+    assert log == ["execute", "execute", "rollback", "close"]
+
+
+def test_session_not_opened_when_unused() -> None:
+    log: list = []
+    make_client(log).get("/idle")
+    assert log == []
@@ -0,0 +1,97 @@
+import importlib
+import sys
+
+import pytest
+import typer
+from sqlalchemy import event, inspect
+from starlette.testclient import TestClient
+
+from PythonMVC import create_app, model, templating
+from PythonMVC.cli._utils import write_files
+from PythonMVC.cli.generate import generate
+from PythonMVC.cli.scaffold_templates import POSTS_VIEWS, PROJECT_SKELETON
+from PythonMVC.model import BaseModel, db_session
+from PythonMVC.router import resource
+
+
+@pytest.fixture()
+def generated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    write_files(tmp_path, {**PROJECT_SKELETON, **POSTS_VIEWS})
+    generate("scaffold", "GenWriter", "name:str:unique bio:text")
+    generate("scaffold", "GenBook", "title:str:index blurb:text pages:int gen_writer:references")
+    before = set(sys.modules)
+    yield tmp_path
+    for name in set(sys.modules) - before:
+        if name == "app" or name.startswith("app."):
+            del sys.modules[name]
+    model.configure(object())
+    templating.configure(type("Defaults", (), {"DEBUG": True, "TEMPLATE_CACHE_DIR": None})())
+
+
+def test_scaffold_emits_indexes_foreign_keys_and_paginated_eager_index(generated) -> None:
+    writer = importlib.import_module("app.models.gen_writer").GenWriter
+    book = importlib.import_module("app.models.gen_book").GenBook
+    controller = importlib.import_module("app.controllers.gen_books_controller").GenBooksController
+
+    table = book.__table__
+    assert table.c.title.index and table.c.gen_writer_id.index
+    assert [fk.target_fullname for fk in table.c.gen_writer_id.foreign_keys] == ["gen_writers.id"]
+    assert writer.__table__.c.name.unique
+
+    class Settings:
+        SECRET_KEY = "test"
+        DATABASE_URL = f"sqlite:///{generated / 'generated.db'}"
+        TEMPLATE_CACHE_DIR = str(generated / "templates")
+        SECURITY = {"rate_limit": 0}
+        ROUTES = resource("gen_books", controller)
+
+    client = TestClient(create_app(Settings()))
+    BaseModel.metadata.create_all(BaseModel.engine(), tables=[writer.__table__, book.__table__])
+    assert {"ix_gen_books_title", "ix_gen_books_gen_writer_id"} <= {
+        index["name"] for index in inspect(BaseModel.engine()).get_indexes("gen_books")
+    }
+    with db_session() as session:
+        writers = [writer(name=f"writer {number}", bio="...") for number in range(3)]
+        session.add_all(writers)
+        session.flush()
+        session.add_all(
+            book(title=f"Book {number}", blurb="x" * 1000, pages=number, gen_writer_id=writers[number % 3].id)
+            for number in range(30)
+        )
+        session.commit()
+
+    statements = []
+    engine = BaseModel.async_engine().sync_engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        first = client.get("/gen_books")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert first.status_code == 200
+    assert first.text.count("<li>") == 25
+    assert "Book 29" in first.text and "GenWriter #" in first.text
+    # One query for the page, writers joined in, blurbs never selected.
+    assert len(statements) == 1
+    assert "JOIN gen_writers" in statements[0] and "blurb" not in statements[0]
+
+    assert 'href="?after=6"' in first.text
+    last = client.get("/gen_books", params={"after": 6})
+    assert last.text.count("<li>") == 5 and "Next" not in last.text
+    assert client.get("/gen_books", params={"per_page": 1000}).text.count("<li>") == 30
+    assert client.get("/gen_books", params={"after": "x"}).status_code == 400
+    assert client.get("/gen_books/3", headers={"accept": "application/json"}).json()["pages"] == 2
+    assert controller.api_fields == ["id", "title", "blurb", "pages", "gen_writer_id"]
+    page = client.get("/gen_books", headers={"accept": "application/json"})
+    assert len(page.json()) == 25 and page.headers["link"].endswith('?after=25>; rel="next"')
+
+
+def test_unknown_types_and_modifiers_are_rejected(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(typer.BadParameter):
+        generate("model", "Thing", "title:blob")
+    with pytest.raises(typer.BadParameter):
+        generate("model", "Thing", "title:str:primary")
+    assert not (tmp_path / "app").exists()
@@ -2,3 +2,41 @@
 
 def test_temp() -> None:
     assert "test" == "test"
+
+
+HEAVY_MODULES = ("sqlalchemy", "starlette", "jinja2", "httpx", "redis")
+# Cumulative microseconds for `import PythonMVC.cli`, Typer included (~0.1s locally;
+# the eager package took ~1.3s).
+CLI_IMPORT_BUDGET_US = 500_000
+
+
+def _import_times(statement: str) -> dict:
+    import subprocess
+    import sys
+
+    command = [sys.executable, "-X", "importtime", "-c", statement]
+    subprocess.run(command, check=True, capture_output=True)  # warm the bytecode cache
+    stderr = subprocess.run(command, check=True, capture_output=True, text=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_stays_light() -> None:
+    times = _import_times("import PythonMVC.cli")
+    assert not [name for name in HEAVY_MODULES if name in times]
+    assert times["PythonMVC.cli"] < CLI_IMPORT_BUDGET_US
+
+
+def test_package_attributes_load_lazily() -> None:
+    times = _import_times("import PythonMVC")
+    assert not [name for name in HEAVY_MODULES if name in times]
+
+    import PythonMVC
+
+    assert PythonMVC.create_app.__module__ == "PythonMVC.app"
+    assert set(PythonMVC.__all__) <= set(dir(PythonMVC))
@@ -0,0 +1,47 @@
+import logging
+
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from PythonMVC import instrumentation, model
+from PythonMVC.db import DBSessionMiddleware
+from PythonMVC.instrumentation import SQLInstrumentationMiddleware
+
+
+def test_server_timing_and_n_plus_one(tmp_path, caplog) -> None:
+    class Settings:
+        DATABASE_URL = f"sqlite:///{tmp_path / 'sql.db'}"
+        SQL_INSTRUMENTATION = {"enabled": True, "slow_ms": 0, "n_plus_one": 3, "top": 2}
+
+    async def loop(request: Request) -> PlainTextResponse:
+        for number in range(4):
+            await request.state.db.execute(text("select :n"), {"n": number})
+        return PlainTextResponse("ok")
+
+    model.configure(Settings())
+    instrumentation.configure(Settings())
+    try:
+        app = Starlette(routes=[Route("/loop", loop)])
+        app.add_middleware(DBSessionMiddleware)
+        app.add_middleware(SQLInstrumentationMiddleware)
+        with caplog.at_level(logging.WARNING, logger="PythonMVC.sql"):
+            response = TestClient(app).get("/loop")
+
+        assert response.headers["server-timing"].startswith("db;dur=")
+        assert response.headers["server-timing"].endswith('desc="4 queries"')
+        messages = [record.getMessage() for record in caplog.records]
+        assert sum(message.startswith("Slow query") for message in messages) == 2
+        assert any(message.startswith("Possible N+1: 4 executions") for message in messages)
+
+        with instrumentation.track() as log:
+            with model.db_session() as session:
+                session.execute(text("select 1"))
+        assert log.count == 1
+    finally:
+        instrumentation.configure(object())
+        model.configure(object())
+    assert not instrumentation.enabled()
@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from PythonMVC import jobs
+from PythonMVC.jobs import DatabaseJobBackend, Worker, enqueue
+
+calls = []
+
+
+def record(name, pause=0.0):
+    time.sleep(pause)
+    calls.append(name)
+
+
+async def record_async(name):
+    await asyncio.sleep(0)
+    calls.append(name)
+
+
+def explode():
+    calls.append("boom")
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    class Settings:
+        JOBS = {"poll_interval": 0.01, "backoff": 0.01, "max_backoff": 0.05}
+
+    jobs.configure(Settings())
+    backend = DatabaseJobBackend(create_engine(f"sqlite:///{tmp_path / 'jobs.db'}"))
+    jobs._backend = backend
+    calls.clear()
+    yield backend
+    jobs.configure(object())
+    backend.engine.dispose()
+
+
+def test_jobs_run_by_priority_then_due_time(queue) -> None:
+    async def run():
+        await enqueue(record, "low")
+        await enqueue(record_async, "high", priority=10)
+        await enqueue(record, name="later", delay=60)
+        await enqueue(record, "normal", priority=5)
+        worker = Worker(queue, concurrency=1)
+        await worker.run(burst=True)
+        return worker
+
+    worker = asyncio.run(run())
+    assert calls == ["high", "normal", "low"]
+    assert worker.processed == 3
+    assert asyncio.run(queue.size()) == 1
+
+
+def test_failing_jobs_back_off_then_are_kept_as_failed(queue) -> None:
+    async def run():
+        await enqueue(explode, max_attempts=3)
+        worker = Worker(queue)
+        for _ in range(50):
+            await worker.run(burst=True)
+            if worker.failed:
+                return worker
+            await asyncio.sleep(0.02)
+
+    worker = asyncio.run(run())
+    assert calls == ["boom"] * 3
+    assert worker.failed == 1
+    with queue.engine.connect() as connection:
+        row = connection.execute(select(queue.table)).one()
+    assert row.failed == 1 and row.attempts == 3
+    assert row.last_error == "RuntimeError: boom"
+
+
+def test_reserved_jobs_reappear_after_the_visibility_timeout(queue) -> None:
+    async def run():
+        await enqueue(record, "once")
+        first = await queue.reserve(10, visibility_timeout=0.05)
+        hidden = await queue.reserve(10, visibility_timeout=0.05)
+        await asyncio.sleep(0.1)
+        again = await queue.reserve(10, visibility_timeout=0.05)
+        return first, hidden, again
+
+    first, hidden, again = asyncio.run(run())
+    assert [job.args for job in first] == [("once",)]
+    assert hidden == []
+    assert [job.id for job in again] == [first[0].id]
+
+
+def test_concurrent_jobs_overlap_and_locals_are_rejected(queue) -> None:
+    async def run():
+        for number in range(4):
+            await enqueue(record, number, pause=0.2)
+        started = time.perf_counter()
+        await Worker(queue, concurrency=4, batch_size=4).run(burst=True)
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 0.6
+    assert sorted(calls) == [0, 1, 2, 3]
+    with pytest.raises(ValueError):
+        asyncio.run(enqueue(lambda: None))
+
+
+def test_enqueue_after_a_write_joins_the_request_transaction(tmp_path) -> None:
+    from sqlalchemy import String
+    from sqlalchemy.orm import Mapped, mapped_column
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+    from starlette.testclient import TestClient
+
+    from PythonMVC import model
+    from PythonMVC.db import DBSessionMiddleware
+    from PythonMVC.model import BaseModel
+
+    class Note(BaseModel):
+        __tablename__ = "job_test_notes"
+        body: Mapped[str] = mapped_column(String(20))
+
+    class Settings:
+        DATABASE_URL = f"sqlite:///{tmp_path / 'app.db'}"
+        JOBS = {"poll_interval": 0.01}
+
+    async def create(request: Request) -> PlainTextResponse:
+        request.state.db.add(Note(body=request.path_params["body"]))
+        await request.state.db.flush()
+        await enqueue(record, request.path_params["body"])
+        return PlainTextResponse("created", status_code=int(request.query_params.get("status", 201)))
+
+    model.configure(Settings())
+    jobs.configure(Settings())
+    calls.clear()
+    try:
+        Note.__table__.create(BaseModel.engine())
+        app = Starlette(routes=[Route("/notes/{body}", create, methods=["POST"])])
+        app.add_middleware(DBSessionMiddleware)
+        client = TestClient(app)
+        assert client.post("/notes/kept").status_code == 201
+        # A rolled-back request takes its job with it.
+        assert client.post("/notes/dropped?status=422").status_code == 422
+
+        asyncio.run(Worker(concurrency=1).run(burst=True))
+        assert calls == ["kept"]
+        with BaseModel.engine().connect() as connection:
+            assert connection.execute(select(Note.body)).scalars().all() == ["kept"]
+    finally:
+        jobs.configure(object())
+        model.configure(object())
@@ -0,0 +1,93 @@
+import json
+import os
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+from PythonMVC.metrics import MetricsRegistry, mount_metrics, resolve_route
+
+
+def make_app(config: dict) -> Starlette:
+    async def show(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("post", status_code=int(request.query_params.get("status", 200)))
+
+    app = Starlette(routes=[Route("/posts/{id}", show, name="posts.show")])
+    mount_metrics(app, config)
+    return app
+
+
+def test_per_route_histograms_and_status_classes() -> None:
+    client = TestClient(make_app({"path": "/_metrics", "buckets": (0.5, 5.0)}))
+    client.get("/posts/1")
+    client.get("/posts/2")
+    client.get("/posts/3?status=404")
+    client.get("/nowhere")
+
+    body = client.get("/_metrics").text
+    assert 'pmvc_http_requests_total{route="posts.show",status="2xx"} 2' in body
+    assert 'pmvc_http_requests_total{route="posts.show",status="4xx"} 1' in body
+    assert 'pmvc_http_requests_total{route="unmatched",status="4xx"} 1' in body
+    assert 'pmvc_http_request_duration_seconds_bucket{route="posts.show",le="0.5"} 3' in body
+    assert 'pmvc_http_request_duration_seconds_bucket{route="posts.show",le="+Inf"} 3' in body
+    assert 'pmvc_http_request_duration_seconds_count{route="posts.show"} 3' in body
+    # The scrape itself is in flight while it renders.
+    assert 'pmvc_http_requests_in_flight{route="metrics"} 1' in body
+
+
+def test_multiprocess_snapshots_are_merged(tmp_path) -> None:
+    other = MetricsRegistry(buckets=(0.5, 5.0)).snapshot()
+    other.update(
+        pid=2**22 + 1,  # beyond pid_max on most systems: an exited worker
+        routes={"posts.show": {"counts": [4, 1, 0], "sum": 1.5, "statuses": {"2xx": 5}}},
+        in_flight={"posts.show": 3},
+    )
+    (tmp_path / f"{other['pid']}.json").write_text(json.dumps(other))
+
+    client = TestClient(make_app({"buckets": (0.5, 5.0), "multiprocess_dir": str(tmp_path)}))
+    client.get("/posts/1")
+
+    body = client.get("/metrics").text
+    assert 'pmvc_http_requests_total{route="posts.show",status="2xx"} 6' in body
+    assert 'pmvc_http_request_duration_seconds_bucket{route="posts.show",le="0.5"} 5' in body
+    assert 'pmvc_http_requests_in_flight{route="posts.show"}' not in body
+
+    # The exited worker was folded into one aggregate file, and still counts.
+    assert sorted(path.name for path in tmp_path.glob("*.json")) == sorted([f"{os.getpid()}.json", "exited.json"])
+    assert 'pmvc_http_requests_total{route="posts.show",status="2xx"} 6' in client.get("/metrics").text
+
+
+def test_recycled_pid_keeps_the_dead_workers_counts_and_shutdown_flushes(tmp_path) -> None:
+    stale = MetricsRegistry(buckets=(0.5, 5.0)).snapshot()
+    stale.update(instance="an-exited-worker", routes={"posts.show": {"counts": [2, 0, 0], "sum": 0.2, "statuses": {"2xx": 2}}})
+    (tmp_path / f"{os.getpid()}.json").write_text(json.dumps(stale))
+
+    app = make_app({"buckets": (0.5, 5.0), "multiprocess_dir": str(tmp_path), "flush_interval": 3600})
+    with TestClient(app) as client:
+        client.get("/posts/1")
+        assert 'pmvc_http_requests_total{route="posts.show",status="2xx"} 3' in client.get("/metrics").text
+        client.get("/posts/2")
+    # Lifespan shutdown flushed the request served after the last scrape.
+    own = json.loads((tmp_path / f"{os.getpid()}.json").read_text())
+    assert own["routes"]["posts.show"]["statuses"] == {"2xx": 2}
+    assert json.loads((tmp_path / "exited.json").read_text())["routes"]["posts.show"]["statuses"] == {"2xx": 2}
+
+
+def test_routes_are_resolved_without_the_router_recording_them() -> None:
+    # Starlette releases before scope["route"] existed only leave the endpoint behind.
+    async def endpoint(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("")
+
+    routes = [
+        Route("/posts/{id}", endpoint, name="posts.show"),
+        Mount("/api", routes=[Route("/items", endpoint, methods=["POST"], name="api.items")]),
+    ]
+
+    def scope(method: str, path: str) -> dict:
+        return {"type": "http", "method": method, "path": path, "root_path": "", "headers": []}
+
+    assert resolve_route(routes, scope("GET", "/posts/1")).name == "posts.show"
+    assert resolve_route(routes, scope("GET", "/api/items")).name == "api.items"  # 405, still that route
+    assert resolve_route(routes, scope("GET", "/nowhere")) is None
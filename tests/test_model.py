@@ -0,0 +1,94 @@
+import pytest
+
+from PythonMVC.model import async_database_url
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("sqlite:///db/app.db", "sqlite+aiosqlite:///db/app.db"),
+        ("postgresql+psycopg://u:p@localhost:5432/blog", "postgresql+asyncpg://u:p@localhost:5432/blog"),
+        ("mysql+pymysql://u:p@localhost:3306/blog", "mysql+asyncmy://u:p@localhost:3306/blog"),
+        ("postgresql+asyncpg://u:p@localhost/blog", "postgresql+asyncpg://u:p@localhost/blog"),
+    ],
+)
+def test_async_database_url(url: str, expected: str) -> None:
+    assert async_database_url(url) == expected
+
+
+def test_configure_applies_pool_settings(tmp_path) -> None:
+    from PythonMVC import model
+
+    class Settings:
+        DATABASE_URL = f"sqlite:///{tmp_path / 'pool.db'}"
+        DATABASE_POOL = {"size": 2, "max_overflow": 1, "pre_ping": True}
+
+    model.configure(Settings())
+    try:
+        engine = model.BaseModel.engine()
+        assert engine.pool.size() == 2
+        with engine.connect():
+            stats = model.pool_metrics()["sync"]
+        assert stats["checkouts"] == 1
+        assert stats["capacity"] == 3
+    finally:
+        model.configure(object())
+
+
+def test_unbounded_overflow_has_no_capacity() -> None:
+    import sqlite3
+
+    from sqlalchemy.pool import QueuePool
+
+    from PythonMVC.pool import PoolMetrics
+
+    pool = QueuePool(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=-1)
+    connections = [pool.connect() for _ in range(3)]
+    stats = PoolMetrics().snapshot(pool)
+    assert stats["capacity"] is None and stats["saturation"] == 0.0
+    assert stats["checked_out"] == 3
+    for connection in connections:
+        connection.close()
+
+
+def test_configure_rejects_unknown_pool_option() -> None:
+    from PythonMVC import model
+
+    class Settings:
+        DATABASE_POOL = {"pool_size": 2}
+
+    with pytest.raises(ValueError):
+        model.configure(Settings())
+
+
+def test_bulk_insert_upsert_and_iter_batches(tmp_path) -> None:
+    from sqlalchemy import String, select
+    from sqlalchemy.orm import Mapped, mapped_column
+
+    from PythonMVC import model
+    from PythonMVC.model import BaseModel, db_session
+
+    class Sku(BaseModel):
+        __tablename__ = "model_test_skus"
+        code: Mapped[str] = mapped_column(String(20), unique=True)
+        price: Mapped[int] = mapped_column()
+
+    class Settings:
+        DATABASE_URL = f"sqlite:///{tmp_path / 'bulk.db'}"
+
+    model.configure(Settings())
+    try:
+        BaseModel.metadata.create_all(BaseModel.engine(), tables=[Sku.__table__])
+        assert Sku.bulk_insert(({"code": f"c{i}", "price": i} for i in range(2500)), batch_size=1000) == 2500
+        Sku.upsert([{"code": "c1", "price": 999}, {"code": "new", "price": 5}], conflict_cols=["code"])
+        with pytest.raises(ValueError):
+            Sku.upsert([{"code": "c2", "price": 1}], conflict_cols=[])
+
+        with db_session() as session:
+            assert session.scalar(select(Sku.price).where(Sku.code == "c1")) == 999
+            assert session.scalar(select(Sku.price).where(Sku.code == "new")) == 5
+
+        sizes = [len(batch) for batch in Sku.iter_batches(Sku.price < 2000, size=700)]
+        assert sizes == [700, 700, 601]
+    finally:
+        model.configure(object())
@@ -0,0 +1,127 @@
+import asyncio
+
+from sqlalchemy import String, event, select
+from sqlalchemy.orm import Mapped, mapped_column
+
+from PythonMVC.model import BaseModel
+
+
+# Module level so cached results (pickled ORM instances) can be loaded back.
+class Note(BaseModel):
+    __tablename__ = "query_cache_test_notes"
+    title: Mapped[str] = mapped_column(String(50))
+
+
+def test_query_cache_serves_hits_and_invalidates_on_commit(tmp_path) -> None:
+    from PythonMVC import model, query_cache
+    from PythonMVC.model import db_session
+
+    class Settings:
+        DATABASE_URL = f"sqlite:///{tmp_path / 'qc.db'}"
+        QUERY_CACHE = {"backend": "memory", "ttl": 60}
+
+    model.configure(Settings())
+    qc = query_cache.configure(Settings())
+    selects = []
+    try:
+        engine = BaseModel.engine()
+        Note.__table__.create(engine)
+        event.listen(engine, "before_cursor_execute", lambda *args: selects.append(args[2]))
+        statement = select(Note).order_by(Note.id).execution_options(query_cache=True)
+
+        with db_session() as session, session.begin():
+            session.add(Note(title="first"))
+        selects.clear()
+
+        for _ in range(3):
+            with db_session() as session:
+                assert [note.title for note in session.scalars(statement)] == ["first"]
+        assert len(selects) == 1
+        assert (qc.hits, qc.misses) == (2, 1)
+
+        with db_session() as session, session.begin():
+            session.add(Note(title="second"))
+            session.flush()
+            # Uncommitted writes to the table bypass the cache.
+            assert len(session.scalars(statement).all()) == 2
+        with db_session() as session:
+            assert [note.title for note in session.scalars(statement)] == ["first", "second"]
+
+        Note.bulk_insert([{"title": "third"}])
+        with db_session() as session:
+            assert len(session.scalars(statement).all()) == 3
+        # Statements that did not opt in are never cached.
+        with db_session() as session:
+            session.scalars(select(Note)).all()
+        assert qc.hits == 2
+    finally:
+        query_cache.configure(object())
+        model.configure(object())
+
+
+class FakeRedis:
+    """Records which client (blocking or asyncio) served each command."""
+
+    def __init__(self, calls: list, kind: str) -> None:
+        self.calls = calls
+        self.kind = kind
+        self.data: dict = {}
+
+    def _run(self, command, *args, **kwargs):
+        self.calls.append((self.kind, command))
+        if command == "mget":
+            return [self.data.get(key) for key in args[0]]
+        if command == "get":
+            return self.data.get(args[0])
+        self.data[args[0]] = args[1]
+        return True
+
+    def __getattr__(self, command):
+        if self.kind == "sync":
+            return lambda *args, **kwargs: self._run(command, *args, **kwargs)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0)  # a real round trip yields to the event loop
+            return self._run(command, *args, **kwargs)
+
+        return call
+
+
+def test_redis_backend_does_not_block_async_sessions(tmp_path) -> None:
+    from PythonMVC import model, query_cache
+    from PythonMVC.cache import Cache
+    from PythonMVC.model import async_db_session
+
+    class Settings:
+        DATABASE_URL = f"sqlite:///{tmp_path / 'qc_redis.db'}"
+
+    calls: list = []
+    backend = query_cache.RedisQueryCacheBackend(Cache("redis://localhost:6379/15"))
+    backend.sync_client = FakeRedis(calls, "sync")
+    async_client = FakeRedis(calls, "async")
+    async_client.data = backend.sync_client.data
+
+    async def client():
+        return async_client
+
+    backend.cache.client = client
+    model.configure(Settings())
+    qc = query_cache.QueryCache(backend, ttl=60)
+    qc.install()
+    try:
+        Note.__table__.create(BaseModel.engine())
+        statement = select(Note.title).execution_options(query_cache=True)
+
+        async def run() -> list:
+            titles = []
+            for _ in range(2):
+                async with async_db_session() as session:
+                    titles.append((await session.scalars(statement)).all())
+            return titles
+
+        assert asyncio.run(run()) == [[], []]
+        assert (qc.hits, qc.misses) == (1, 1)
+        assert calls and all(kind == "async" for kind, _ in calls)
+    finally:
+        qc.uninstall()
+        model.configure(object())
@@ -0,0 +1,46 @@
+import asyncio
+
+from PythonMVC.ratelimit import MemoryRateLimitBackend, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_020.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sliding_window_blocks_and_recovers() -> None:
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(clock=clock)
+
+    async def run() -> list:
+        results = [await backend.hit("ip", 3, 60) for _ in range(4)]
+        clock.now += 120
+        results.append(await backend.hit("ip", 3, 60))
+        return results
+
+    assert asyncio.run(run()) == [True, True, True, False, True]
+
+
+def test_memory_backend_stays_bounded() -> None:
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(max_keys=100, clock=clock)
+
+    async def run() -> None:
+        for i in range(1_000):
+            await backend.hit(f"ip-{i}", 10, 60)
+        assert len(backend) == 100
+        clock.now += 180
+        await backend.hit("fresh", 10, 60)
+
+    asyncio.run(run())
+    assert len(backend) == 1
+
+
+def test_route_limits_use_longest_prefix() -> None:
+    limiter = RateLimiter(MemoryRateLimitBackend(), 100, routes={"/posts": 10, "POST /posts": 2})
+    assert limiter.match("POST", "/posts/1")[1] == 2
+    assert limiter.match("GET", "/posts")[1] == 10
+    assert limiter.match("GET", "/postscript")[1] == 100
@@ -0,0 +1,199 @@
+import time
+
+import pytest
+from sqlalchemy import String, create_engine, select
+from sqlalchemy.orm import Mapped, mapped_column
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from PythonMVC.model import BaseModel
+
+
+class Server(BaseModel):
+    __tablename__ = "replica_test_servers"
+    name: Mapped[str] = mapped_column(String(20))
+
+
+def make_database(path, name: str) -> str:
+    """A SQLite file whose single row names the "server" a read came from."""
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Server.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(Server.__table__.insert(), [{"name": name}])
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def databases(tmp_path):
+    from PythonMVC import model, replicas
+
+    def setup(read_your_writes: float = 2.0, retry_after: float = 30.0, down: bool = False):
+        class Settings:
+            DATABASE_URL = make_database(tmp_path / "primary.db", "primary")
+            DATABASE_REPLICA_URLS = {
+                make_database(tmp_path / "a.db", "a"): 2,
+                make_database(tmp_path / "b.db", "b"): 1,
+            }
+            DATABASE_REPLICAS = {"read_your_writes": read_your_writes, "retry_after": retry_after}
+
+        if down:
+            # The directory does not exist yet, so connecting to this "server" fails.
+            Settings.DATABASE_REPLICA_URLS = {f"sqlite:///{tmp_path / 'down' / 'c.db'}": 1, **Settings.DATABASE_REPLICA_URLS}
+        replicas.configure(Settings())
+        model.configure(Settings())
+        replicas.record_write(0.0)
+        return Settings
+
+    yield setup
+    replicas.configure(object())
+    model.configure(object())
+
+
+def read_from(session) -> str:
+    return session.scalars(select(Server.name)).first()
+
+
+def test_reads_rotate_over_weighted_replicas(databases) -> None:
+    from PythonMVC.model import db_session
+
+    databases()
+    with db_session() as session:
+        assert [read_from(session) for _ in range(6)] == ["a", "b", "a", "a", "b", "a"]
+
+
+def test_writes_and_what_follows_them_use_the_primary(databases) -> None:
+    from PythonMVC import replicas
+    from PythonMVC.model import db_session
+
+    databases(read_your_writes=60)
+    with db_session() as session, session.begin():
+        assert read_from(session) == "a"
+        session.add(Server(name="new"))
+        session.flush()
+        # Reads after a write in the same transaction see it.
+        assert session.scalars(select(Server.name).order_by(Server.id.desc())).first() == "new"
+        assert session.scalars(select(Server.name).with_for_update()).first() == "primary"
+
+    with db_session() as session:
+        assert read_from(session) == "primary"  # read-your-writes window
+    replicas.record_write(time.time() - 120)
+    with db_session() as session:
+        assert read_from(session) == "b"
+        with replicas.use_primary():
+            assert read_from(session) == "primary"
+
+        @replicas.use_primary()
+        def pinned() -> str:
+            return read_from(session)
+
+        assert pinned() == "primary"
+        assert read_from(session) == "a"
+
+
+def test_raw_sql_uses_the_primary_without_counting_as_a_write(databases) -> None:
+    from sqlalchemy import text, update
+
+    from PythonMVC import replicas
+    from PythonMVC.model import db_session
+
+    databases(read_your_writes=60)
+    with db_session() as session:
+        assert session.execute(text("SELECT name FROM replica_test_servers")).scalar() == "primary"
+        assert read_from(session) == "a"
+        session.commit()
+    assert replicas.last_write() == 0.0
+
+    with db_session() as session:
+        session.execute(update(Server).values(name="primary"))
+        assert read_from(session) == "primary"
+        session.commit()
+    assert replicas.last_write() > 0.0
+
+
+def test_unreachable_replica_is_skipped_then_health_checked(databases, tmp_path) -> None:
+    from PythonMVC.model import BaseModel, db_session
+
+    databases(retry_after=0.2, down=True)
+    with db_session() as session:
+        assert {read_from(session) for _ in range(6)} == {"a", "b"}
+    down = BaseModel.replica_set().replicas[0]
+    assert down.down_until > 0
+
+    (tmp_path / "down").mkdir()
+    make_database(tmp_path / "down" / "c.db", "c")
+    time.sleep(0.25)
+    with db_session() as session:
+        assert "c" in {read_from(session) for _ in range(6)}
+    assert down.down_until == 0
+
+
+def test_async_sessions_and_cookie_carry_read_your_writes(databases) -> None:
+    from PythonMVC.cache import MemoryCache
+    from PythonMVC.db import DBSessionMiddleware
+    from PythonMVC.replicas import LAST_WRITE_COOKIE, use_primary
+    from PythonMVC.sessions import ServerSessionMiddleware, load_session
+
+    class CountingStore(MemoryCache):
+        reads = 0
+
+        async def get(self, key):
+            CountingStore.reads += 1
+            return await super().get(key)
+
+    databases(read_your_writes=60)
+
+    async def show(request: Request) -> PlainTextResponse:
+        return PlainTextResponse((await request.state.db.scalars(select(Server.name))).first())
+
+    pinned = use_primary()(show)
+
+    async def create(request: Request) -> PlainTextResponse:
+        request.state.db.add(Server(name="posted"))
+        return PlainTextResponse("created")
+
+    async def login(request: Request) -> PlainTextResponse:
+        (await load_session(request))["user"] = "ada"
+        return PlainTextResponse("ok")
+
+    app = Starlette(
+        routes=[Route("/", show), Route("/", create, methods=["POST"]), Route("/pinned", pinned), Route("/login", login)],
+        middleware=[Middleware(ServerSessionMiddleware, store=CountingStore()), Middleware(DBSessionMiddleware)],
+    )
+    with TestClient(app) as client:
+        client.get("/login")
+        reads = CountingStore.reads
+        assert client.get("/pinned").text == "primary"
+        assert client.get("/").text == "a"
+        assert client.post("/").text == "created"
+        assert LAST_WRITE_COOKIE in client.cookies
+        assert client.get("/").text == "primary"
+        # The window travels in its own cookie; the server-side session is never fetched.
+        assert CountingStore.reads == reads
+        # Another client has not written anything, so it still reads from a replica.
+        with TestClient(app) as other:
+            assert other.get("/").text == "b"
+        client.cookies.set(LAST_WRITE_COOKIE, "nonsense")
+        assert client.get("/").text == "a"
+
+
+def test_replica_settings_are_validated() -> None:
+    from PythonMVC import replicas
+
+    class Settings:
+        DATABASE_REPLICAS = {"lag": 1}
+
+    with pytest.raises(ValueError):
+        replicas.configure(Settings())
+
+    class Weights:
+        DATABASE_REPLICA_URLS = {"sqlite://": 0}
+
+    with pytest.raises(ValueError):
+        replicas.configure(Weights())
+    replicas.configure(object())
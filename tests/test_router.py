@@ -0,0 +1,102 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+from PythonMVC.router import CompiledRouter, resource
+
+
+class ItemsController:
+    def __getattr__(self, action: str):
+        async def endpoint(request: Request) -> PlainTextResponse:
+            return PlainTextResponse(f"{action} {dict(request.path_params)}")
+
+        return endpoint
+
+
+def make_app(compiled: bool) -> Starlette:
+    async def file(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(f"file {request.path_params['rest']}")
+
+    async def numbered(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(f"numbered {request.path_params.get('number')}")
+
+    routes = [Route("/numbers/{number:int}", numbered, name="numbers")]
+    for name in ("posts", "users", "tags"):
+        routes += resource(name, ItemsController)
+    routes += [
+        Route("/files/{rest:path}", file, name="files"),
+        Mount("/static", routes=[Route("/app.css", numbered, name="css")], name="static"),
+    ]
+    app = Starlette(routes=routes)
+    if compiled:
+        app.router = CompiledRouter.from_router(app.router)
+    return app
+
+
+REQUESTS = [
+    ("GET", "/posts"),
+    ("GET", "/users/7"),
+    ("GET", "/users/new"),
+    ("PATCH", "/tags/3"),
+    ("DELETE", "/tags/3"),
+    ("PUT", "/posts"),
+    ("GET", "/posts/"),
+    ("GET", "/numbers/12"),
+    ("GET", "/numbers/twelve"),
+    ("GET", "/files/a/b.txt"),
+    ("GET", "/static/app.css"),
+    ("GET", "/nowhere/at/all"),
+]
+
+
+@pytest.mark.parametrize("method, path", REQUESTS)
+def test_compiled_router_matches_starlette(method: str, path: str) -> None:
+    expected = TestClient(make_app(compiled=False)).request(method, path, follow_redirects=False)
+    actual = TestClient(make_app(compiled=True)).request(method, path, follow_redirects=False)
+    assert (actual.status_code, actual.text, actual.headers.get("location")) == (
+        expected.status_code,
+        expected.text,
+        expected.headers.get("location"),
+    )
+
+
+def test_url_path_for_and_late_routes() -> None:
+    app = make_app(compiled=True)
+    assert app.url_path_for("posts.show", id=5) == "/posts/5"
+    assert app.url_path_for("static:css") == "/static/app.css"
+
+    async def late(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("late")
+
+    client = TestClient(app)
+    assert client.get("/late").status_code == 404
+    app.router.routes.append(Route("/late", late, name="late"))
+    assert client.get("/late").text == "late"
+    assert app.url_path_for("late") == "/late"
+
+
+def test_in_place_route_replacement_is_picked_up() -> None:
+    app = make_app(compiled=True)
+    client = TestClient(app)
+    assert client.get("/posts/1").status_code == 200
+
+    async def replaced(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("replaced")
+
+    index = next(i for i, route in enumerate(app.router.routes) if getattr(route, "name", "") == "posts.show")
+    app.router.routes[index] = Route("/articles/{id}", replaced, name="posts.show")
+    assert client.get("/articles/1").text == "replaced"
+    assert client.get("/posts/1").status_code == 405  # only update/destroy remain there
+    assert app.url_path_for("posts.show", id=2) == "/articles/2"
+
+
+def test_root_path_is_stripped_like_starlette() -> None:
+    from PythonMVC.router import _route_path
+
+    assert _route_path({"path": "/shop/posts/1", "root_path": "/shop"}) == "/posts/1"
+    assert _route_path({"path": "/shop", "root_path": "/shop"}) == ""
+    assert _route_path({"path": "/shopping", "root_path": "/shop"}) == "/shopping"
+    assert _route_path({"path": "/posts", "root_path": ""}) == "/posts"
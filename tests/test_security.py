@@ -0,0 +1,43 @@
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from PythonMVC.security import SecurityMiddleware
+
+
+async def echo(request: Request) -> PlainTextResponse:
+    form = await request.form()
+    return PlainTextResponse(form.get("title", ""))
+
+
+async def stream(_: Request) -> StreamingResponse:
+    async def chunks():
+        for part in (b"a", b"b", b"c"):
+            yield part
+
+    return StreamingResponse(chunks())
+
+
+def make_client() -> TestClient:
+    app = Starlette(routes=[Route("/echo", echo, methods=["GET", "POST"]), Route("/stream", stream)])
+    app.add_middleware(SecurityMiddleware, config={"secret": "s", "rate_limit": 0})
+    return TestClient(app)
+
+
+def test_headers_and_csrf_cookie_injected() -> None:
+    client = make_client()
+    response = client.get("/stream")
+    assert response.text == "abc"
+    assert response.headers["x-frame-options"] == "DENY"
+    assert response.headers["x-csrf-token"] == response.cookies["csrf"]
+
+
+def test_form_csrf_token_is_validated_and_body_replayed() -> None:
+    client = make_client()
+    token = client.get("/echo").headers["x-csrf-token"]
+    assert client.post("/echo", data={"title": "hi", "_csrf": "bogus"}).status_code == 403
+    response = client.post("/echo", data={"title": "hi", "_csrf": token})
+    assert response.status_code == 200
+    assert response.text == "hi"
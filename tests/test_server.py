@@ -0,0 +1,111 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-forking needs fork()")
+
+APP = """
+import os
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": str(os.getpid()).encode()})
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise AssertionError(f"{url} never came up")
+
+
+def test_prefork_workers_reload_without_errors(tmp_path) -> None:
+    (tmp_path / "pidapp.py").write_text(APP)
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/"
+    command = [sys.executable, "-m", "PythonMVC.cli", "server", "--port", str(port), "--workers", "2", "--app", "pidapp:app"]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([os.getcwd(), os.environ.get("PYTHONPATH", "")])}
+    master = subprocess.Popen(command, cwd=tmp_path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(url)
+        with httpx.Client() as client:
+            before = {client.get(url, headers={"connection": "close"}).text for _ in range(30)}
+            assert len(before) == 2
+
+            master.send_signal(signal.SIGHUP)
+            # Requests keep succeeding while the old workers hand over to new ones.
+            deadline = time.monotonic() + 15
+            served = before
+            while served <= before and time.monotonic() < deadline:
+                response = client.get(url, headers={"connection": "close"})
+                assert response.status_code == 200
+                served = served | {response.text}
+            assert served - before
+    finally:
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=15) == 0
+    # Worker metrics went to a private temporary directory, not the working directory.
+    assert not (tmp_path / "tmp").exists()
+
+
+def test_metrics_dir_is_configurable_and_emptied_on_start(tmp_path, monkeypatch) -> None:
+    from PythonMVC.server import PreforkServer
+
+    monkeypatch.delenv("PMVC_METRICS_DIR", raising=False)
+    directory = tmp_path / "metrics"
+    directory.mkdir()
+    for name in ("4242.json", "exited.json", "4243.tmp"):
+        (directory / name).write_text("{}")
+    server = PreforkServer(metrics_dir=str(directory))
+    server._prepare_metrics_dir()
+    assert list(directory.iterdir()) == []
+    assert os.environ["PMVC_METRICS_DIR"] == str(directory.resolve())
+
+    monkeypatch.delenv("PMVC_METRICS_DIR")
+    monkeypatch.chdir(tmp_path)
+    default = PreforkServer()
+    default._prepare_metrics_dir()
+    assert default._owns_metrics_dir and not default.metrics_dir.startswith(str(tmp_path))
+    os.rmdir(default.metrics_dir)
+
+
+def test_forked_child_gets_fresh_engine(tmp_path) -> None:
+    from PythonMVC import model
+
+    class Settings:
+        DATABASE_URL = f"sqlite:///{tmp_path / 'fork.db'}"
+
+    model.configure(Settings())
+    try:
+        parent = model.BaseModel.engine()
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - child
+            os.write(write, b"1" if model.BaseModel.engine() is not parent else b"0")
+            os._exit(0)
+        os.waitpid(pid, 0)
+        assert os.read(read, 1) == b"1"
+        os.close(read)
+        os.close(write)
+        assert model.BaseModel.engine() is parent
+    finally:
+        model.dispose_engines()
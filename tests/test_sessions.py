@@ -0,0 +1,109 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from PythonMVC.cache import MemoryCache
+from PythonMVC.sessions import ServerSessionMiddleware, SessionNotLoaded, load_session
+
+
+class CountingStore(MemoryCache):
+    def __init__(self) -> None:
+        super().__init__()
+        self.reads = 0
+        self.writes = 0
+
+    async def get(self, key):
+        self.reads += 1
+        return await super().get(key)
+
+    async def set(self, key, value, ttl=None, nx=False):
+        self.writes += 1
+        return await super().set(key, value, ttl=ttl, nx=nx)
+
+
+async def login(request: Request) -> PlainTextResponse:
+    session = await load_session(request)
+    session.regenerate()
+    session["user"] = request.query_params["user"]
+    return PlainTextResponse("ok")
+
+
+async def whoami(request: Request) -> JSONResponse:
+    session = await load_session(request)
+    return JSONResponse({"user": session.get("user")})
+
+
+async def logout(request: Request) -> PlainTextResponse:
+    (await load_session(request)).clear()
+    return PlainTextResponse("bye")
+
+
+async def untouched(request: Request) -> PlainTextResponse:
+    with pytest.raises(SessionNotLoaded):
+        request.session.get("user")
+    return PlainTextResponse("static")
+
+
+@pytest.fixture
+def setup():
+    def make(refresh_interval: float = 300.0):
+        store = CountingStore()
+        routes = [Route("/login", login), Route("/me", whoami), Route("/logout", logout), Route("/plain", untouched)]
+        middleware = [Middleware(ServerSessionMiddleware, store=store, refresh_interval=refresh_interval)]
+        return store, TestClient(Starlette(routes=routes, middleware=middleware))
+
+    return make
+
+
+def test_cookie_holds_only_an_id_and_data_is_written_only_when_changed(setup) -> None:
+    store, client = setup()
+    assert "set-cookie" not in client.get("/me").headers
+    assert store.reads == store.writes == 0
+
+    client.get("/login", params={"user": "ada" * 100})
+    session_id = client.cookies["session"]
+    assert len(session_id) == 43 and "ada" not in session_id
+    assert store.writes == 1
+
+    response = client.get("/me")
+    assert response.json() == {"user": "ada" * 100}
+    assert "set-cookie" not in response.headers
+    assert store.writes == 1
+
+    reads = store.reads
+    assert client.get("/plain").text == "static"
+    assert store.reads == reads
+
+
+def test_regenerate_and_clear_drop_the_old_id(setup) -> None:
+    store, client = setup()
+    client.get("/login", params={"user": "ada"})
+    first = client.cookies["session"]
+    client.get("/login", params={"user": "bob"})
+    second = client.cookies["session"]
+    assert first != second
+    assert len(store._data) == 1
+
+    response = client.get("/logout")
+    assert "expires=Thu, 01 Jan 1970" in response.headers["set-cookie"]
+    assert store._data == {}
+
+    client.cookies.set("session", second)
+    assert client.get("/me").json() == {"user": None}
+
+
+def test_reads_renew_the_ttl_at_most_once_per_refresh_interval(setup) -> None:
+    store, client = setup(refresh_interval=0.0)
+    client.get("/login", params={"user": "ada"})
+    response = client.get("/me")
+    assert "Max-Age=1209600" in response.headers["set-cookie"]
+    assert store.writes == 2
+
+    store, client = setup(refresh_interval=300.0)
+    client.get("/login", params={"user": "ada"})
+    client.get("/me")
+    assert store.writes == 1
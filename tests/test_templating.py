@@ -0,0 +1,51 @@
+from PythonMVC import templating
+from PythonMVC.controller import BaseController
+
+
+class Settings:
+    DEBUG = False
+
+
+def test_controllers_share_one_environment(tmp_path) -> None:
+    Settings.TEMPLATE_CACHE_DIR = str(tmp_path / "cache")
+    templating.configure(Settings())
+    try:
+        first = BaseController(templates_dir=str(tmp_path))
+        second = BaseController(templates_dir=str(tmp_path))
+        assert first.templates is second.templates
+        assert first.templates.env.auto_reload is False
+    finally:
+        templating.configure(type("Defaults", (), {"DEBUG": True, "TEMPLATE_CACHE_DIR": None})())
+
+
+def test_compile_templates_fills_bytecode_cache(tmp_path) -> None:
+    views = tmp_path / "views"
+    (views / "posts").mkdir(parents=True)
+    (views / "posts" / "index.html").write_text("{% for p in posts %}{{ p }}{% endfor %}")
+    (views / "layout.html").write_text("<main>{% block body %}{% endblock %}</main>")
+
+    assert templating.compile_templates(str(views), str(tmp_path / "cache")) == 2
+    assert len(list((tmp_path / "cache").glob("*.cache"))) == 2
+    assert len(list((tmp_path / "cache" / "async").glob("*.cache"))) == 2
+
+
+def test_render_stream_consumes_async_iterables(tmp_path) -> None:
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+    from starlette.testclient import TestClient
+
+    (tmp_path / "list.html").write_text("{% for row in rows %}<li>{{ row }}</li>{% endfor %}")
+
+    async def rows():
+        for i in range(1000):
+            yield i
+
+    class RowsController(BaseController):
+        async def index(self, request):
+            return self.render_stream(request, "list.html", {"rows": rows()}, chunk_size=512)
+
+    controller = RowsController(templates_dir=str(tmp_path))
+    response = TestClient(Starlette(routes=[Route("/", controller.index)])).get("/")
+    assert response.headers["content-type"].startswith("text/html")
+    assert response.text.count("<li>") == 1000
+    assert response.text.endswith("<li>999</li>")